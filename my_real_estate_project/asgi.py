@@ -5,6 +5,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'my_real_estate_project.settings
 
 django_asgi_app = get_asgi_application()
 
+# رفع صور العقارات اللي فضلت في الطابور من worker قديم (properties/image_queue.py)
+from properties.image_queue import uploader
+uploader.start()
+
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 
@@ -164,7 +164,7 @@ ACCOUNT_LOGOUT_ON_GET = True
 SOCIALACCOUNT_AUTO_SIGNUP = True
 SOCIALACCOUNT_LOGIN_ON_GET = True
 
-# Cache configuration
+# Cache configuration (محلياً بس؛ مع REDIS_URL الكاش بيبقى Redis مشترك، تحت)
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -251,6 +251,14 @@ if REDIS_URL:
             },
         },
     }
+    # الكاش لازم يبقى مشترك بين عمليات gunicorn: أجيال الكاش (نتائج البحث، الـ facets،
+    # بلاطات الخريطة) ومفضلة المستخدمين وفهرس المميزات بتتمسح من العملية اللي عملت التعديل بس
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
 else:
     # محليًا (من غير Redis)
     CHANNEL_LAYERS = {
@@ -258,3 +266,18 @@ else:
             'BACKEND': 'channels.layers.InMemoryChannelLayer',
         },
     }
+
+# طابور رفع صور العقارات في الخلفية (properties/image_queue.py): الملفات بتتحفظ هنا لحد ما تترفع
+PROPERTY_IMAGE_SPOOL_DIR = BASE_DIR / 'image_spool'
+# عدد الـ threads اللي بترفع صور الفورم على Cloudinary في نفس الوقت (لكل process)
+PROPERTY_IMAGE_UPLOAD_WORKERS = int(os.environ.get('PROPERTY_IMAGE_UPLOAD_WORKERS', 4))
+# مهمة فضلت في uploading/ أكتر من كده (ثانية) تبقى من worker اتقفل وهي بتترفع، فبترجع للطابور
+PROPERTY_IMAGE_STALE_AFTER = int(os.environ.get('PROPERTY_IMAGE_STALE_AFTER', 600))
+
+# مكان تخزين صور العقارات الجديدة: 'cloudinary' أو 'local' (properties/image_storage.py)
+PROPERTY_IMAGE_BACKEND = config('PROPERTY_IMAGE_BACKEND', default='cloudinary')
+# التخزين المحلي: الأصول ونسخ WebP/AVIF (بتتخدم من /images/ وبتتولد لو ناقصة)
+PROPERTY_IMAGE_LOCAL_ROOT = BASE_DIR / 'media' / 'images'
+PROPERTY_IMAGE_LOCAL_URL = '/images/'
+# عدد الـ processes اللي بتولد النسخ في نفس الوقت
+PROPERTY_IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('PROPERTY_IMAGE_DERIVATIVE_WORKERS', 2))
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'my_real_estate_project.settings')
 
 application = get_wsgi_application()
+
+# رفع صور العقارات اللي فضلت في الطابور من worker قديم (properties/image_queue.py)
+from properties.image_queue import uploader  # noqa: E402
+
+uploader.start()
@@ -53,6 +53,17 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'notification_count': event.get('notification_count', 0)
         }))
 
+    async def image_upload_progress(self, event):
+        # تقدم رفع صور العقار في الخلفية (properties/image_queue.py)
+        await self.send(text_data=json.dumps({
+            'type': 'image_upload_progress',
+            'property_id': event['property_id'],
+            'job_id': event['job_id'],
+            'succeeded': event['succeeded'],
+            'remaining': event['remaining'],
+            'failed': event['failed'],
+        }))
+
     @database_sync_to_async
     def get_unread_count(self):
         # استيراد النماذج داخل الدالة
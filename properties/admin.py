@@ -1,15 +1,29 @@
 # properties/admin.py
 
+from django import forms
 from django.contrib import admin
 from .models import Property, PropertyImage, Feature
+from .features import add_features
 
 # عشان نقدر نضيف صور العقارات مباشرة من صفحة العقار في لوحة الإدارة
 class PropertyImageInline(admin.TabularInline):
     model = PropertyImage
     extra = 1 # عدد الحقول الإضافية اللي هتظهر لرفع الصور
 
+class PropertyAdminForm(forms.ModelForm):
+    new_features = forms.CharField(
+        label='إضافة مميزات جديدة (افصل بينها بفاصلة)',
+        required=False,
+    )
+
+    class Meta:
+        model = Property
+        fields = '__all__'
+
+
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
+    form = PropertyAdminForm
     list_display = ('title', 'property_type', 'status', 'price', 'city', 'is_published', 'owner')
     list_filter = ('property_type', 'status', 'city', 'is_published')
     search_fields = ('title', 'description', 'location_address', 'city')
@@ -20,6 +34,11 @@ class PropertyAdmin(admin.ModelAdmin):
     ordering = ('-published_date',) # ترتيب افتراضي في لوحة الإدارة
     list_editable = ('is_published',) # عشان تقدر تعدل حالة النشر مباشرة من القائمة
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # بعد حفظ المميزات المختارة (save_m2m بيعمل set) عشان الجديدة ماتتمسحش
+        add_features(form.instance, form.cleaned_data.get('new_features'))
+
 @admin.register(Feature)
 class FeatureAdmin(admin.ModelAdmin):
     list_display = ('name',)
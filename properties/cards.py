@@ -0,0 +1,140 @@
+# properties/cards.py
+
+"""
+تحديث جدول ListingCard (كروت العقارات المجهزة للقراءة).
+
+- refresh_card: إعادة حساب كارت عقار واحد (بعد حفظ العقار).
+- refresh_cover: تحديث صورة الغلاف بس (بعد إضافة/حذف صورة).
+- refresh_favorites_count: تحديث عداد المفضلة بـ UPDATE واحد
+  (عداد المشاهدات بيتحدث على دفعات من view_counter.py).
+- rebuild_cards: إعادة بناء الجدول كله على دفعات (بيستخدمها أمر الإدارة).
+- serialize_card: تحويل الكارت لـ dict للـ JSON API.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .geo import encode_geohash
+from .models import FavoriteProperty, ListingCard, Property
+from .utils import get_cover_images
+
+
+def _favorites_count_subquery():
+    return Coalesce(Subquery(
+        FavoriteProperty.objects.filter(property_id=OuterRef('pk'))
+        .values('property_id').annotate(total=Count('pk')).values('total')[:1]
+    ), Value(0))
+
+
+def build_card(prop, cover_image=None, favorites_count=0):
+    card = ListingCard(
+        property_id=prop.pk,
+        cover_image_url=cover_image.get_delivery_url('card') if cover_image else '',
+        cover_placeholder=cover_image.placeholder if cover_image else '',
+        cover_color=cover_image.dominant_color if cover_image else '',
+        views_count=prop.views_count,
+        favorites_count=favorites_count,
+    )
+    for field in ListingCard.COPIED_FIELDS:
+        setattr(card, field, getattr(prop, field))
+    card.geohash = encode_geohash(prop.latitude, prop.longitude)
+    return card
+
+
+def _with_counts(queryset):
+    return queryset.annotate(card_favorites_count=_favorites_count_subquery())
+
+
+def refresh_card(property_id):
+    """إعادة حساب كارت عقار واحد من Property."""
+    prop = _with_counts(Property.objects.filter(pk=property_id)).first()
+    if prop is None:
+        return None
+    card = build_card(
+        prop,
+        cover_image=get_cover_images([prop]).get(prop.pk),
+        favorites_count=prop.card_favorites_count,
+    )
+    card.save()
+    return card
+
+
+def refresh_cover(property_id):
+    cover = get_cover_images([Property(pk=property_id)]).get(property_id)
+    ListingCard.objects.filter(pk=property_id).update(
+        cover_image_url=cover.get_delivery_url('card') if cover else '',
+        cover_placeholder=cover.placeholder if cover else '',
+        cover_color=cover.dominant_color if cover else '',
+    )
+
+
+def refresh_favorites_count(property_id):
+    ListingCard.objects.filter(pk=property_id).update(
+        favorites_count=FavoriteProperty.objects.filter(property_id=property_id).count()
+    )
+
+
+def adjust_favorites_count(property_id, delta):
+    """
+    زيادة/نقص عداد المفضلة في UPDATE واحد (favorites.toggle عارف التغيير بالظبط).
+    العداد مابينزلش تحت الصفر حتى لو كان متأخر عن الجدول (مفضلة اتضافت من غير signals).
+    """
+    ListingCard.objects.filter(pk=property_id).update(favorites_count=Greatest(F('favorites_count') + delta, 0))
+
+
+def rebuild_cards(batch_size=500):
+    """
+    إعادة بناء كل الكروت. كل دفعة = استعلام للعقارات مع العدادات + استعلام للصور + bulk_create.
+    بيرجع عدد الكروت.
+    """
+    total = 0
+    with transaction.atomic():
+        ListingCard.objects.all().delete()
+        batch = []
+        for prop in _with_counts(Property.objects.order_by('pk')).iterator(chunk_size=batch_size):
+            batch.append(prop)
+            if len(batch) >= batch_size:
+                total += _create_cards(batch)
+                batch = []
+        if batch:
+            total += _create_cards(batch)
+    return total
+
+
+def _create_cards(properties):
+    cover_images = get_cover_images(properties)
+    cards = [
+        build_card(
+            prop,
+            cover_image=cover_images.get(prop.pk),
+            favorites_count=prop.card_favorites_count,
+        )
+        for prop in properties
+    ]
+    ListingCard.objects.bulk_create(cards)
+    return len(cards)
+
+
+def serialize_card(card):
+    return {
+        'id': card.pk,
+        'slug': card.slug,
+        'url': card.get_absolute_url(),
+        'title': card.title,
+        'property_type': card.property_type,
+        'status': card.status,
+        'price': str(card.price),
+        'area': str(card.area),
+        'bedrooms': card.bedrooms,
+        'bathrooms': card.bathrooms,
+        'city': card.city,
+        'district': card.district,
+        'location_address': card.location_address,
+        'latitude': card.latitude,
+        'longitude': card.longitude,
+        'cover_image_url': card.cover_image_url or None,
+        'views_count': card.views_count,
+        'favorites_count': card.favorites_count,
+        'published_date': card.published_date.isoformat(),
+    }
@@ -0,0 +1,253 @@
+# properties/clusters.py
+
+"""
+تجميع علامات الخريطة على السيرفر (MapCluster).
+
+لكل مستوى تكبير من 0 لـ MAX_ZOOM الخريطة (Web Mercator) مقسومة لبلاطات (tiles) 256px،
+وكل بلاطة مقسومة لـ CELLS_PER_TILE × CELLS_PER_TILE خلية (~32px). كل عقار منشور له
+إحداثيات بيتحسب في خلية واحدة في كل مستوى، فالتجمعات محسوبة مسبقاً:
+
+- add_point / remove_point: تحديث تزايدي (عدد ثابت من الاستعلامات مهما كان عدد المستويات)
+  بيستخدمها signals.py لما عقار يتحفظ أو يتحذف.
+- add_points: إضافة دفعة عقارات مرة واحدة (الاستيراد بالجملة).
+- rebuild_clusters: إعادة بناء الجدول كله (أمر rebuild_map_clusters).
+- get_tiles: تجمعات بلاطات معينة، كل بلاطة متخزنة في الكاش بمفتاحها (z/x/y)
+  وبتتمسح من الكاش لما نقطة جواها تتغير.
+"""
+
+import math
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import ListingCard, MapCluster
+
+# أبعد من كده الخريطة بتعرض العلامات نفسها من api/map/listings/
+MAX_ZOOM = 16
+CELLS_PER_TILE = 8
+MAX_LATITUDE = 85.05112878
+
+# الجيل بيزيد مع إعادة البناء الكاملة بس، والتحديث التزايدي بيمسح بلاطاته بالظبط
+GENERATION_CACHE_KEY = 'properties:clusters:generation'
+TILE_CACHE_KEY = 'properties:clusters:{}:tile:{}:{}:{}'
+TILE_CACHE_TIMEOUT = 60 * 60
+# أقصى عدد بلاطات في طلب واحد
+MAX_TILES = 64
+
+
+def project(latitude, longitude):
+    """(x, y) في Web Mercator كنسبة من 0 لـ 1."""
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, float(latitude)))
+    x = (float(longitude) + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(latitude))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0), min(max(y, 0.0), 1.0)
+
+
+def _grid(value, size):
+    return min(int(value * size), size - 1)
+
+
+def point_cells(latitude, longitude):
+    """الخلية (zoom, cell_x, cell_y) للنقطة في كل مستوى تكبير."""
+    x, y = project(latitude, longitude)
+    cells = []
+    for zoom in range(MAX_ZOOM + 1):
+        size = (1 << zoom) * CELLS_PER_TILE
+        cells.append((zoom, _grid(x, size), _grid(y, size)))
+    return cells
+
+
+def tile_of(zoom, cell_x, cell_y):
+    return zoom, cell_x // CELLS_PER_TILE, cell_y // CELLS_PER_TILE
+
+
+def tile_cache_key(zoom, tile_x, tile_y, generation=None):
+    if generation is None:
+        generation = cache.get(GENERATION_CACHE_KEY, 0)
+    return TILE_CACHE_KEY.format(generation, zoom, tile_x, tile_y)
+
+
+def bbox_tiles(zoom, south, west, north, east, max_tiles=MAX_TILES):
+    """
+    البلاطات (x, y) اللي بتغطي المستطيل في المستوى ده، أو None لو عددها أكتر من max_tiles.
+    العدد بيتحسب من حدود المستطيل قبل ما أي بلاطة تتعمل (المستطيل الكبير على مستوى
+    تكبير عالي ممكن يبقى مليارات البلاطات).
+    """
+    size = 1 << zoom
+    left, top = project(north, west)
+    right, bottom = project(south, east)
+    columns = range(_grid(left, size), _grid(right, size) + 1)
+    rows = range(_grid(top, size), _grid(bottom, size) + 1)
+    if len(columns) * len(rows) > max_tiles:
+        return None
+    return [(tile_x, tile_y) for tile_x in columns for tile_y in rows]
+
+
+def _cells_condition(cells):
+    condition = Q()
+    for zoom, cell_x, cell_y in cells:
+        condition |= Q(zoom=zoom, cell_x=cell_x, cell_y=cell_y)
+    return condition
+
+
+def _forget_tiles(cells):
+    generation = cache.get(GENERATION_CACHE_KEY, 0)
+    cache.delete_many([tile_cache_key(*tile_of(*cell), generation=generation) for cell in cells])
+
+
+def add_point(latitude, longitude):
+    """إضافة عقار للتجمعات في كل المستويات: إنشاء الخلايا الناقصة + UPDATE واحد."""
+    cells = point_cells(latitude, longitude)
+    with transaction.atomic():
+        MapCluster.objects.bulk_create(
+            [MapCluster(zoom=zoom, cell_x=cell_x, cell_y=cell_y) for zoom, cell_x, cell_y in cells],
+            ignore_conflicts=True,
+        )
+        MapCluster.objects.filter(_cells_condition(cells)).update(
+            count=F('count') + 1,
+            latitude_sum=F('latitude_sum') + float(latitude),
+            longitude_sum=F('longitude_sum') + float(longitude),
+        )
+    _forget_tiles(cells)
+
+
+def add_points(points):
+    """
+    إضافة دفعة عقارات (latitude, longitude) مرة واحدة (للاستيراد بالجملة): الزيادات بتتجمع
+    لكل خلية، وبعدين قراءة الخلايا الموجودة + bulk_update + bulk_create.
+    """
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for latitude, longitude in points:
+        latitude, longitude = float(latitude), float(longitude)
+        for cell in point_cells(latitude, longitude):
+            delta = deltas[cell]
+            delta[0] += 1
+            delta[1] += latitude
+            delta[2] += longitude
+    if not deltas:
+        return
+
+    cells = list(deltas)
+    with transaction.atomic():
+        existing = {}
+        for start in range(0, len(cells), 500):
+            condition = _cells_condition(cells[start:start + 500])
+            for cluster in MapCluster.objects.select_for_update().filter(condition):
+                existing[(cluster.zoom, cluster.cell_x, cluster.cell_y)] = cluster
+        to_update, to_create = [], []
+        for cell, (count, latitude_sum, longitude_sum) in deltas.items():
+            cluster = existing.get(cell)
+            if cluster is None:
+                zoom, cell_x, cell_y = cell
+                to_create.append(MapCluster(zoom=zoom, cell_x=cell_x, cell_y=cell_y, count=count,
+                                            latitude_sum=latitude_sum, longitude_sum=longitude_sum))
+                continue
+            cluster.count += count
+            cluster.latitude_sum += latitude_sum
+            cluster.longitude_sum += longitude_sum
+            to_update.append(cluster)
+        MapCluster.objects.bulk_update(to_update, ['count', 'latitude_sum', 'longitude_sum'], batch_size=500)
+        MapCluster.objects.bulk_create(to_create, batch_size=500)
+    _forget_tiles(cells)
+
+
+def remove_point(latitude, longitude):
+    """شيل عقار من التجمعات في كل المستويات، والخلايا اللي فضيت بتتمسح."""
+    cells = point_cells(latitude, longitude)
+    condition = _cells_condition(cells)
+    with transaction.atomic():
+        MapCluster.objects.filter(condition).update(
+            count=F('count') - 1,
+            latitude_sum=F('latitude_sum') - float(latitude),
+            longitude_sum=F('longitude_sum') - float(longitude),
+        )
+        MapCluster.objects.filter(condition, count__lte=0).delete()
+    _forget_tiles(cells)
+
+
+def move_point(old, new):
+    """
+    تحديث التجمعات بعد حفظ عقار. old / new = (latitude, longitude) أو None
+    لو العقار مكانش/مبقاش ظاهر على الخريطة (مش منشور أو من غير إحداثيات).
+    """
+    old = tuple(map(float, old)) if old else None
+    new = tuple(map(float, new)) if new else None
+    if old == new:
+        return
+    if old:
+        remove_point(*old)
+    if new:
+        add_point(*new)
+
+
+def rebuild_clusters(batch_size=2000):
+    """إعادة حساب كل التجمعات من الكروت المنشورة اللي ليها إحداثيات. بيرجع عدد العقارات."""
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    points = (
+        ListingCard.objects.filter(is_published=True)
+        .exclude(latitude=None).exclude(longitude=None)
+        .values_list('latitude', 'longitude')
+    )
+    total = 0
+    for latitude, longitude in points.iterator(chunk_size=batch_size):
+        total += 1
+        for cell in point_cells(latitude, longitude):
+            cluster = totals[cell]
+            cluster[0] += 1
+            cluster[1] += latitude
+            cluster[2] += longitude
+
+    with transaction.atomic():
+        MapCluster.objects.all().delete()
+        MapCluster.objects.bulk_create(
+            [
+                MapCluster(zoom=zoom, cell_x=cell_x, cell_y=cell_y, count=count,
+                           latitude_sum=latitude_sum, longitude_sum=longitude_sum)
+                for (zoom, cell_x, cell_y), (count, latitude_sum, longitude_sum) in totals.items()
+            ],
+            batch_size=batch_size,
+        )
+    # كل البلاطات المتخزنة قبل كده بقت قديمة
+    try:
+        cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        cache.set(GENERATION_CACHE_KEY, 1, None)
+    return total
+
+
+def _serialize(cluster):
+    return {
+        'latitude': cluster.latitude_sum / cluster.count,
+        'longitude': cluster.longitude_sum / cluster.count,
+        'count': cluster.count,
+    }
+
+
+def get_tiles(zoom, tiles):
+    """
+    {(tile_x, tile_y): [تجمعات]} للبلاطات المطلوبة في المستوى ده.
+    الموجود في الكاش بيرجع منه، والناقص كله بيتجاب في استعلام واحد ويتخزن.
+    """
+    generation = cache.get(GENERATION_CACHE_KEY, 0)
+    keys = {tile: tile_cache_key(zoom, *tile, generation=generation) for tile in tiles}
+    cached = cache.get_many(keys.values())
+    result = {tile: cached[key] for tile, key in keys.items() if key in cached}
+
+    missing = [tile for tile in tiles if tile not in result]
+    if missing:
+        condition = Q()
+        for tile_x, tile_y in missing:
+            condition |= Q(
+                cell_x__gte=tile_x * CELLS_PER_TILE, cell_x__lt=(tile_x + 1) * CELLS_PER_TILE,
+                cell_y__gte=tile_y * CELLS_PER_TILE, cell_y__lt=(tile_y + 1) * CELLS_PER_TILE,
+            )
+        computed = {tile: [] for tile in missing}
+        for cluster in MapCluster.objects.filter(condition, zoom=zoom, count__gt=0):
+            tile = (cluster.cell_x // CELLS_PER_TILE, cluster.cell_y // CELLS_PER_TILE)
+            computed[tile].append(_serialize(cluster))
+        cache.set_many({keys[tile]: clusters for tile, clusters in computed.items()}, TILE_CACHE_TIMEOUT)
+        result.update(computed)
+    return result
@@ -0,0 +1,143 @@
+# properties/dedupe.py
+
+"""
+اكتشاف الصور المكررة بالـ perceptual hash (dHash 64 بت).
+
+الصورتين "نفس الصورة" لو المسافة (Hamming) بين الـ hashes <= MAX_DISTANCE، حتى لو
+الملف اتضغط تاني أو اتغير مقاسه أو اسمه (download_2.jfif و download_2_4Tg1IPY.jfif).
+
+البحث بالمسافة بيستخدم فهرس multi-index hashing: الـ 64 بت متقسمين 4 أجزاء (16 بت)
+كل جزء في عمود عليه index. لو المسافة <= 3 يبقى على الأقل جزء واحد متطابق تماماً
+(مبدأ برج الحمام)، فالمرشحين = الصور اللي أي جزء منها يساوي الجزء المقابل (استعلام
+واحد بـ OR على indexes)، وبعدين المسافة الحقيقية بتتحسب في بايثون على المرشحين بس.
+
+الصورة المكررة وقت الرفع بتاخد نفس قيمة حقل الصورة بتاعة الأصلية (image_queue.py)،
+فالاتنين بيستخدموا نفس الملف المتخزن ونفس نسخه المصغرة ومفيش رفع أصلاً. عشان كده
+البحث في صور نفس المالك بس، وبنفس نسبة الأبعاد، والـ hashes شبه الفاضية مابتتقارنش.
+"""
+
+import os
+
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from . import image_metadata
+from .image_storage import open_source
+
+HASH_SIZE = 8
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_DISTANCE = BANDS - 1
+# أقل عدد بتات 1 (أو 0) في hash يتقارن؛ أقل من كده الصورة شبه فاضية
+MIN_HASH_BITS = 8
+ASPECT_TOLERANCE = 0.02
+BAND_FIELDS = tuple(f'phash_band_{index}' for index in range(BANDS))
+
+
+def dhash(image):
+    """dHash: الصورة رمادي 9x8، وكل بت = هل البكسل أفتح من اللي جنبه."""
+    # draft بيخلي JPEG يتفك بمقاس صغير من الأول (أسرع بكتير للصور الكبيرة)
+    image.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))
+    image = ImageOps.exif_transpose(image).convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        for column in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + column]
+            right = pixels[row * (HASH_SIZE + 1) + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hash_source(source):
+    """dHash لمسار أو رابط أو ملف مفتوح، أو None لو مش صورة تتقري."""
+    try:
+        with open_source(source) as handle, Image.open(handle) as image:
+            return dhash(image)
+    except (OSError, ValueError):
+        return None
+
+
+def hamming(first, second):
+    return bin(first ^ second).count('1')
+
+
+def to_signed(value):
+    """الـ hash غير سالب 64 بت، والعمود BigInteger بإشارة."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def bands(value):
+    return [(value >> (BAND_BITS * index)) & BAND_MASK for index in range(BANDS)]
+
+
+def hash_fields(value):
+    """قيم أعمدة الـ hash في PropertyImage (كلها None لو مفيش hash)."""
+    if value is None:
+        return dict({'phash': None}, **{name: None for name in BAND_FIELDS})
+    return dict({'phash': to_signed(value)}, **dict(zip(BAND_FIELDS, bands(value))))
+
+
+def informative(value):
+    """
+    هل الـ hash يكفي للمقارنة؟ الصور شبه الفاضية (لون واحد، خلفية بيضا بكلمة صغيرة)
+    الـ hash بتاعها كله أصفار تقريباً، فصورتين مختلفتين منهم هيبانوا "نفس الصورة".
+    """
+    return MIN_HASH_BITS <= bin(value).count('1') <= 64 - MIN_HASH_BITS
+
+
+def same_shape(image, size):
+    """نفس نسبة الأبعاد (لو المقاسين معروفين)؛ النسخة المصغرة أو المضغوطة بتحافظ عليها."""
+    if size is None or not image.width or not image.height:
+        return True
+    width, height = size
+    return abs(width / height - image.width / image.height) <= ASPECT_TOLERANCE * (image.width / image.height)
+
+
+def find_duplicate(value, owner_id, size=None, max_distance=MAX_DISTANCE, before=None):
+    """
+    أقدم PropertyImage شبه مطابقة (مسافة <= max_distance وبنفس نسبة الأبعاد) في صور عقارات
+    نفس المالك، أو None. صورة وسيط تاني مابتتاخدش أبداً حتى لو شبهها.
+    size: (العرض، الطول) للصورة الجديدة لو معروف.
+    before: أقصى id (للـ backfill، عشان الصورة تتقارن باللي قبلها بس).
+    """
+    from .models import PropertyImage
+
+    if value is None or not informative(value):
+        return None
+    condition = Q()
+    for name, band in zip(BAND_FIELDS, bands(value)):
+        condition |= Q(**{name: band})
+    candidates = PropertyImage.objects.filter(condition, property__owner_id=owner_id).order_by('pk')
+    if before is not None:
+        candidates = candidates.filter(pk__lt=before)
+    # بيانات العرض عشان الصورة المكررة تاخدها من غير تحليل (image_queue.py)
+    for image in candidates.only('pk', 'image', 'phash', *image_metadata.FIELDS):
+        if hamming(to_unsigned(image.phash), value) <= max_distance and same_shape(image, size):
+            return image
+    return None
+
+
+def image_source(image):
+    """
+    مصدر صورة موجودة عشان تتعمل لها hash: الملف المحلي لو موجود (التخزين المحلي أو
+    ملفات media/ القديمة)، وإلا نسخة Cloudinary صغيرة (كفاية للـ hash وأسرع في التحميل).
+    """
+    from .image_storage import backend_for, local_backend
+
+    backend = backend_for(image.image)
+    if backend is local_backend:
+        digest, extension = backend.split(image.image)
+        return backend.path(backend.original_name(digest, extension))
+    resource = image.image
+    name = f"{resource.public_id}.{resource.format}" if resource.format else resource.public_id
+    legacy = os.path.join(str(settings.BASE_DIR), 'media', *name.split('/'))
+    if os.path.isfile(legacy):
+        return legacy
+    return image.get_optimized_url()
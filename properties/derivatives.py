@@ -0,0 +1,61 @@
+# properties/derivatives.py
+
+"""
+توليد نسخ الصور المصغرة (WebP / AVIF بمقاسات ثابتة) بـ Pillow.
+
+الموديول ده مابيعتمدش على Django خالص، عشان بيتشغل جوه ProcessPoolExecutor
+(image_storage.py) والـ processes الجديدة بتستورده من غير إعداد Django.
+"""
+
+import os
+
+from PIL import Image, ImageOps
+
+# العروض الثابتة للنسخ (srcset)؛ الصورة مابتتكبرش، فلو الأصل أصغر النسخة بتبقى بمقاسه
+WIDTHS = (400, 800, 1200, 1600)
+
+QUALITY = {'webp': 80, 'avif': 60}
+PIL_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+
+
+def output_formats():
+    """الصيغ اللي Pillow المتثبت يقدر يكتبها (AVIF محتاج Pillow حديث أو plugin)."""
+    Image.init()
+    return tuple(fmt for fmt in ('avif', 'webp') if PIL_FORMATS[fmt] in Image.SAVE)
+
+
+def derivative_name(width, fmt):
+    return f"{width}.{fmt}"
+
+
+def _prepare(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    return image
+
+
+def generate(original_path, output_dir, widths=WIDTHS, formats=None):
+    """
+    توليد نسخ الأصل في output_dir (``<العرض>.<الصيغة>``). كل ملف بيتكتب في ملف مؤقت
+    وبعدين os.replace، فالنسخة يا موجودة كاملة يا مش موجودة. بيرجع أسماء الملفات.
+    """
+    formats = formats or output_formats()
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    with Image.open(original_path) as original:
+        original = _prepare(original)
+        for width in sorted(widths, reverse=True):
+            if original.width > width:
+                height = max(1, round(original.height * width / original.width))
+                resized = original.resize((width, height), Image.LANCZOS)
+            else:
+                resized = original
+            for fmt in formats:
+                name = derivative_name(width, fmt)
+                path = os.path.join(output_dir, name)
+                temporary = f"{path}.{os.getpid()}.tmp"
+                resized.save(temporary, PIL_FORMATS[fmt], quality=QUALITY[fmt])
+                os.replace(temporary, path)
+                written.append(name)
+    return written
@@ -0,0 +1,193 @@
+# properties/exporter.py
+
+"""
+تصدير العقارات (CSV / JSONL / Parquet) كـ stream.
+
+- نفس فلاتر صفحة العقارات (filters.filter_listings) على الكروت، والعقارات نفسها بتتقري
+  بـ ``.iterator(chunk_size=...)`` من السيرفر على دفعات.
+- المالك بـ select_related، والمميزات والصور بـ prefetch لكل دفعة (استعلامين للدفعة
+  مهما كان عددها)، فمفيش N+1.
+- كل صيغة = generator بيطلع الملف حتة حتة، فالذاكرة ثابتة حتى لـ 100 ألف عقار وأكتر،
+  وبيتبعت بـ StreamingHttpResponse أو بيتكتب في ملف من أمر export_listings.
+
+Parquet محتاج pyarrow (مش من متطلبات المشروع الأساسية)، ولو مش متثبت بيطلع ExportError.
+"""
+
+import csv
+import io
+import json
+
+from django.db.models import Prefetch
+
+from .filters import filter_listings
+from .models import ListingCard, Property, PropertyImage
+
+CHUNK_SIZE = 1000
+
+FIELDS = (
+    'id', 'slug', 'title', 'description', 'property_type', 'status', 'price', 'area',
+    'bedrooms', 'bathrooms', 'location_address', 'city', 'district', 'latitude', 'longitude',
+    'is_published', 'published_date', 'owner', 'views_count', 'features', 'images',
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ExportError(Exception):
+    pass
+
+
+def export_queryset(params, owner=None):
+    """
+    العقارات المطابقة للفلاتر (كل العقارات لو owner=None، أو عقارات المالك بس شامل
+    غير المنشورة) مرتبة بالـ id ومجهزة للقراءة على دفعات.
+    """
+    cards = ListingCard.objects.all() if owner is None else ListingCard.objects.filter(owner=owner)
+    cards = filter_listings(cards, params)
+    queryset = Property.objects.filter(pk__in=cards.order_by().values('pk'))
+    return (
+        queryset.select_related('owner')
+        .prefetch_related(
+            'features',
+            Prefetch('images', queryset=PropertyImage.objects.order_by('-is_main', 'pk')),
+        )
+        .order_by('pk')
+    )
+
+
+def _row(prop):
+    return {
+        'id': prop.pk,
+        'slug': prop.slug,
+        'title': prop.title,
+        'description': prop.description,
+        'property_type': prop.property_type,
+        'status': prop.status,
+        'price': str(prop.price),
+        'area': str(prop.area),
+        'bedrooms': prop.bedrooms,
+        'bathrooms': prop.bathrooms,
+        'location_address': prop.location_address,
+        'city': prop.city,
+        'district': prop.district or '',
+        'latitude': float(prop.latitude) if prop.latitude is not None else None,
+        'longitude': float(prop.longitude) if prop.longitude is not None else None,
+        'is_published': prop.is_published,
+        'published_date': prop.published_date.isoformat(),
+        'owner': prop.owner.username,
+        'views_count': prop.views_count,
+        'features': [feature.name for feature in prop.features.all()],
+        'images': [image.get_delivery_url('original') for image in prop.images.all()],
+    }
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE, progress=None):
+    """صف (dict) لكل عقار. progress(عدد الصفوف) بتتنادى بعد كل دفعة وفي الآخر."""
+    count = 0
+    for prop in queryset.iterator(chunk_size=chunk_size):
+        yield _row(prop)
+        count += 1
+        if progress and count % chunk_size == 0:
+            progress(count)
+    if progress and count % chunk_size:
+        progress(count)
+
+
+class _Echo:
+    """ملف وهمي لـ csv.writer: write بترجع السطر بدل ما تكتبه."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    # BOM عشان Excel يفتح العربي صح
+    yield '﻿' + writer.writerow(FIELDS)
+    for row in rows:
+        row = dict(row, features=', '.join(row['features']), images=' | '.join(row['images']))
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _Sink(io.RawIOBase):
+    """ملف بيجمع اللي اتكتب فيه لحد ما الـ generator ياخده (take)."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_parquet(rows, row_group_size=CHUNK_SIZE):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ('id', pa.int64()), ('slug', pa.string()), ('title', pa.string()), ('description', pa.string()),
+        ('property_type', pa.string()), ('status', pa.string()), ('price', pa.string()), ('area', pa.string()),
+        ('bedrooms', pa.int32()), ('bathrooms', pa.int32()), ('location_address', pa.string()),
+        ('city', pa.string()), ('district', pa.string()), ('latitude', pa.float64()), ('longitude', pa.float64()),
+        ('is_published', pa.bool_()), ('published_date', pa.string()), ('owner', pa.string()),
+        ('views_count', pa.int64()), ('features', pa.list_(pa.string())), ('images', pa.list_(pa.string())),
+    ])
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= row_group_size:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            batch = []
+            yield sink.take()
+    if batch:
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    writer.close()
+    yield sink.take()
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'jsonl': stream_jsonl,
+    'parquet': stream_parquet,
+}
+
+
+def stream_export(queryset, fmt, progress=None):
+    """generator بيطلع الملف المصدّر حتة حتة (str لـ csv/jsonl، bytes لـ parquet)."""
+    if fmt not in STREAMS:
+        raise ExportError(f"Unsupported export format: {fmt}")
+    if fmt == 'parquet':
+        # نتأكد إن pyarrow موجود قبل ما الرد يبدأ
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+    return STREAMS[fmt](iter_rows(queryset, progress=progress))
@@ -0,0 +1,131 @@
+# properties/facets.py
+
+"""
+عدادات الفلاتر (Facets) لقائمة العقارات: عدد النتائج لكل نوع وحالة وعدد غرف،
+وتوزيع السعر والمساحة على شرائح (histogram).
+
+كل العدادات بتتحسب في استعلام تجميعي واحد (aggregate) على ListingCard:
+فلاتر النص (q / city_search) في WHERE، وكل عداد عليه شروط باقي الفلاتر بس
+(مش شرط الفلتر نفسه) عشان المستخدم يشوف هيلاقي كام نتيجة لو غيّر الاختيار.
+
+النتيجة بتتخزن في الكاش بمفتاح من الفلاتر بعد توحيدها + رقم جيل (generation)
+بيزيد مع أي تعديل في العقارات، فالكاش القديم بيتهمل تلقائياً.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .geo import filter_geo
+from .filters import canonical_params, facet_conditions, filter_features, filter_text
+from .models import ListingCard, Property
+
+CACHE_TIMEOUT = 60 * 10
+GENERATION_CACHE_KEY = 'properties:facets:generation'
+
+BEDROOM_BUCKETS = (
+    ('1', '1 غرفة', Q(bedrooms=1)),
+    ('2', '2 غرف', Q(bedrooms=2)),
+    ('3', '3 غرف', Q(bedrooms=3)),
+    ('4', '4+ غرف', Q(bedrooms__gte=4)),
+)
+
+# حدود شرائح السعر (جنيه) والمساحة (متر مربع)، آخر شريحة مفتوحة
+PRICE_EDGES = (0, 10000, 500000, 1000000, 2000000, 5000000, 10000000)
+AREA_EDGES = (0, 100, 150, 200, 300, 500, 1000)
+
+
+def _ranges(edges):
+    bounds = list(edges) + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _range_q(field, low, high):
+    condition = Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lt': high})
+    return condition
+
+
+def cache_key(params):
+    """مفتاح كاش ثابت لنفس مجموعة الفلاتر مهما اختلف ترتيبها أو كتابتها."""
+    canonical = canonical_params(params)
+    digest = hashlib.md5(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+    generation = cache.get(GENERATION_CACHE_KEY, 0)
+    return f'properties:facets:{generation}:{digest}'
+
+
+def invalidate():
+    try:
+        cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        cache.set(GENERATION_CACHE_KEY, 1, None)
+
+
+def _others(conditions, excluded):
+    combined = Q()
+    for name, condition in conditions.items():
+        if name != excluded:
+            combined &= condition
+    return combined
+
+
+def compute_facets(params):
+    """حساب كل العدادات في استعلام aggregate واحد."""
+    conditions = facet_conditions(params)
+    queryset = filter_text(ListingCard.objects.filter(is_published=True), params)
+    queryset = filter_features(filter_geo(queryset, params), params).order_by()
+
+    aggregates = {}
+    type_filter = _others(conditions, 'property_type')
+    for value, _label in Property.PROPERTY_TYPES:
+        aggregates[f'type__{value}'] = Count('pk', filter=type_filter & Q(property_type=value))
+    status_filter = _others(conditions, 'status')
+    for value, _label in Property.PROPERTY_STATUS:
+        aggregates[f'status__{value}'] = Count('pk', filter=status_filter & Q(status=value))
+    bedrooms_filter = _others(conditions, 'bedrooms')
+    for value, _label, condition in BEDROOM_BUCKETS:
+        aggregates[f'bedrooms__{value}'] = Count('pk', filter=bedrooms_filter & condition)
+    price_filter = _others(conditions, 'price')
+    for index, (low, high) in enumerate(_ranges(PRICE_EDGES)):
+        aggregates[f'price__{index}'] = Count('pk', filter=price_filter & _range_q('price', low, high))
+    area_filter = _others(conditions, 'area')
+    for index, (low, high) in enumerate(_ranges(AREA_EDGES)):
+        aggregates[f'area__{index}'] = Count('pk', filter=area_filter & _range_q('area', low, high))
+
+    totals = queryset.aggregate(**aggregates)
+
+    return {
+        'property_type': [
+            {'value': value, 'label': label, 'count': totals[f'type__{value}']}
+            for value, label in Property.PROPERTY_TYPES
+        ],
+        'status': [
+            {'value': value, 'label': label, 'count': totals[f'status__{value}']}
+            for value, label in Property.PROPERTY_STATUS
+        ],
+        'bedrooms': [
+            {'value': value, 'label': label, 'count': totals[f'bedrooms__{value}']}
+            for value, label, _condition in BEDROOM_BUCKETS
+        ],
+        'price': [
+            {'min': low, 'max': high, 'count': totals[f'price__{index}']}
+            for index, (low, high) in enumerate(_ranges(PRICE_EDGES))
+        ],
+        'area': [
+            {'min': low, 'max': high, 'count': totals[f'area__{index}']}
+            for index, (low, high) in enumerate(_ranges(AREA_EDGES))
+        ],
+    }
+
+
+def get_facets(params):
+    """العدادات من الكاش، أو بتتحسب وتتخزن لو مش موجودة."""
+    key = cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(params)
+        cache.set(key, facets, CACHE_TIMEOUT)
+    return facets
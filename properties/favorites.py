@@ -0,0 +1,99 @@
+# properties/favorites.py
+
+"""
+مفضلة كل مستخدم كـ set بأرقام العقارات متخزنة في الكاش، فحالة القلب في صفحة القائمة
+والتفاصيل بتتعرف بـ ``pk in favorite_ids(user)`` (O(1) لكل كارت) من غير استعلام لكل عقار.
+
+- favorite_ids: الـ set من الكاش، أو استعلام واحد لو مش موجود.
+- toggle: إضافة/حذف بأمر SQL واحد (INSERT ... ON CONFLICT DO NOTHING أو DELETE)
+  حسب الـ set المتخزن، ولو الأمر مالقاش حاجة (الكاش كان قديم) بيتعمل العكس.
+  بعد الـ commit الـ set في الكاش بيتعدل تحت قفل (cache.add)؛ لو فيه تعديل تاني
+  لنفس المستخدم في نفس اللحظة الـ set بيتمسح ويتقري تاني من قاعدة البيانات.
+- invalidate: لأي تعديل من برة toggle (لوحة الإدارة، حذف عقار أو مستخدم) عن طريق signals.py.
+
+المسوق العقاري مالوش مفضلة، فالـ set بتاعه فاضي دايماً.
+
+الـ set والقفل لازم يكونوا في كاش مشترك بين الـ workers (Redis، REDIS_URL في settings.py)؛
+مع LocMemCache (التطوير المحلي) كل process ليه نسخته والقفل مابيحميش غير نفسه.
+"""
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import cards
+from .models import FavoriteProperty
+
+FAVORITES_CACHE_KEY = 'properties:favorites:user:{}'
+LOCK_CACHE_KEY = 'properties:favorites:lock:{}'
+CACHE_TIMEOUT = 60 * 60 * 24
+LOCK_TIMEOUT = 5
+
+
+def can_favorite(user):
+    return user.is_authenticated and not getattr(user, 'is_realtor', False)
+
+
+def favorite_ids(user):
+    """أرقام العقارات المفضلة للمستخدم (frozenset)."""
+    if not can_favorite(user):
+        return frozenset()
+    key = FAVORITES_CACHE_KEY.format(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(FavoriteProperty.objects.filter(user_id=user.pk).values_list('property_id', flat=True))
+        cache.set(key, ids, CACHE_TIMEOUT)
+    return ids
+
+
+def invalidate(user_id):
+    cache.delete(FAVORITES_CACHE_KEY.format(user_id))
+
+
+def _update_cached(user_id, property_id, is_favorite):
+    key = FAVORITES_CACHE_KEY.format(user_id)
+    lock = LOCK_CACHE_KEY.format(user_id)
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        # تعديل تاني شغال على نفس الـ set: أضمن حاجة نمسحه
+        invalidate(user_id)
+        return
+    try:
+        ids = cache.get(key)
+        if ids is not None:
+            ids = ids | {property_id} if is_favorite else ids - {property_id}
+            cache.set(key, ids, CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock)
+
+
+def _insert(user_id, property_id):
+    table = connection.ops.quote_name(FavoriteProperty._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, property_id, created_at) VALUES (%s, %s, %s) "
+            "ON CONFLICT (user_id, property_id) DO NOTHING",
+            [user_id, property_id, timezone.now()],
+        )
+        return cursor.rowcount > 0
+
+
+def _delete(user_id, property_id):
+    table = connection.ops.quote_name(FavoriteProperty._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE user_id = %s AND property_id = %s", [user_id, property_id])
+        return cursor.rowcount > 0
+
+
+def toggle(user, property_id):
+    """
+    تبديل حالة العقار في مفضلة المستخدم. بيرجع True لو بقى مفضل.
+    الأوامر مباشرة (من غير signals)، فعداد المفضلة في الكارت بيتحدث هنا.
+    """
+    with transaction.atomic():
+        if property_id in favorite_ids(user):
+            is_favorite = not _delete(user.pk, property_id) and _insert(user.pk, property_id)
+        else:
+            is_favorite = _insert(user.pk, property_id) or not _delete(user.pk, property_id)
+        cards.adjust_favorites_count(property_id, 1 if is_favorite else -1)
+        transaction.on_commit(lambda: _update_cached(user.pk, property_id, is_favorite))
+    return is_favorite
@@ -0,0 +1,134 @@
+# properties/feature_index.py
+
+"""
+فهرس المميزات (Features) لفلترة القائمة بأكتر من ميزة مرة واحدة.
+
+- كتالوج المميزات (id, name) متخزن في الكاش، فالفورم وصفحة القائمة بيعرضوا الـ checkboxes
+  من غير استعلام Feature.objects.all() في كل عرض. بيتمسح لما ميزة تتضاف أو تتعدل أو تتحذف.
+- لكل ميزة bitmap بأرقام العقارات اللي فيها (int بايثون: البت رقم N = العقار رقم N)
+  متخزن في الكاش. الفلترة بـ features=1&features=5 = AND بين الـ bitmaps في الذاكرة
+  (بدل join على جدول الربط لكل ميزة)، والناتج أرقام بتتحط في ``pk__in`` على الكروت.
+  لو الناتج أكتر من MAX_PK_IN رقم الفلتر بيبقى subquery على جدول الربط بدل قايمة ضخمة
+  في الـ SQL (matching_property_subquery).
+- الـ bitmap بيتبني من جدول الربط لما يكون مش موجود (استعلام واحد لكل المميزات الناقصة)،
+  وبيتمسح لما ربط الميزة بعقار يتغير (m2m_changed في signals.py أو الاستيراد بالجملة).
+
+العقار المحذوف ممكن يفضل له بت في الـ bitmap لحد ما يتبني تاني، وده مش بيأثر على
+النتائج لأن الأرقام بتتطابق على ListingCard (الكارت بيتحذف مع العقار).
+"""
+
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Feature, Property
+
+CATALOGUE_CACHE_KEY = 'properties:features:catalogue'
+BITMAP_CACHE_KEY = 'properties:features:bitmap:{}'
+# الـ bitmaps بتتمسح عند أي تغيير، فالمدة دي مجرد حد أمان
+BITMAP_CACHE_TIMEOUT = 60 * 60 * 24
+# أقصى عدد أرقام في pk__in؛ أكتر من كده subquery
+MAX_PK_IN = 500
+
+
+def catalogue():
+    """قائمة (id, name) لكل المميزات مرتبة بالاسم."""
+    features = cache.get(CATALOGUE_CACHE_KEY)
+    if features is None:
+        features = list(Feature.objects.order_by('name').values_list('pk', 'name'))
+        cache.set(CATALOGUE_CACHE_KEY, features, None)
+    return features
+
+
+def invalidate_catalogue():
+    cache.delete(CATALOGUE_CACHE_KEY)
+
+
+def invalidate_features(feature_ids):
+    """مسح الـ bitmaps بتاعة المميزات دي (بتتبني تاني وقت أول فلترة بيها)."""
+    cache.delete_many([BITMAP_CACHE_KEY.format(pk) for pk in set(feature_ids)])
+
+
+def parse_feature_ids(params):
+    """أرقام المميزات من باراميتر features (متكرر أو مفصول بفاصلة) بعد التوحيد والترتيب."""
+    if hasattr(params, 'getlist'):
+        values = params.getlist('features')
+    else:
+        values = params.get('features') or []
+        if isinstance(values, (str, int)):
+            values = [values]
+    ids = set()
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if part.isdigit():
+                ids.add(int(part))
+    return sorted(ids)
+
+
+def ids_bitmap(property_ids):
+    """bitmap من أرقام عقارات (بيتبني في bytearray عشان مانعملش int جديد لكل رقم)."""
+    property_ids = list(property_ids)
+    if not property_ids:
+        return 0
+    data = bytearray(max(property_ids) // 8 + 1)
+    for property_id in property_ids:
+        data[property_id >> 3] |= 1 << (property_id & 7)
+    return int.from_bytes(data, 'little')
+
+
+def _build(feature_ids):
+    pairs = Property.features.through.objects.filter(feature_id__in=feature_ids)
+    property_ids = defaultdict(list)
+    for feature_id, property_id in pairs.values_list('feature_id', 'property_id').iterator():
+        property_ids[feature_id].append(property_id)
+    return {pk: ids_bitmap(property_ids[pk]) for pk in feature_ids}
+
+
+def bitmaps(feature_ids):
+    """dict: رقم الميزة -> bitmap العقارات (من الكاش، والناقص بيتبني في استعلام واحد)."""
+    keys = {BITMAP_CACHE_KEY.format(pk): pk for pk in feature_ids}
+    cached = cache.get_many(keys)
+    result = {keys[key]: value for key, value in cached.items()}
+    missing = [pk for pk in feature_ids if pk not in result]
+    if missing:
+        built = _build(missing)
+        cache.set_many({BITMAP_CACHE_KEY.format(pk): value for pk, value in built.items()}, BITMAP_CACHE_TIMEOUT)
+        result.update(built)
+    return result
+
+
+def bitmap_ids(bitmap):
+    """أرقام البتات اللي قيمتها 1 (بالترتيب)، بايت بايت عشان البايتات الفاضية تتعدى بسرعة."""
+    ids = []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        if byte:
+            ids.extend(index * 8 + bit for bit in range(8) if byte >> bit & 1)
+    return ids
+
+
+def matching_property_ids(feature_ids):
+    """أرقام العقارات اللي فيها كل المميزات دي (تقاطع الـ bitmaps)."""
+    if not feature_ids:
+        return []
+    maps = bitmaps(feature_ids)
+    combined = None
+    # الأصغر الأول عشان التقاطع يصغر بسرعة
+    for bitmap in sorted(maps.values(), key=int.bit_count):
+        combined = bitmap if combined is None else combined & bitmap
+        if not combined:
+            return []
+    return bitmap_ids(combined)
+
+
+def matching_property_subquery(feature_ids):
+    """نفس matching_property_ids كـ subquery على جدول الربط (العقارات اللي ليها كل المميزات)."""
+    return (
+        Property.features.through.objects.filter(feature_id__in=feature_ids)
+        .values('property_id')
+        .annotate(matched=Count('feature_id'))
+        .filter(matched=len(feature_ids))
+        .values('property_id')
+    )
@@ -0,0 +1,92 @@
+# properties/features.py
+
+"""
+تحويل أسماء المميزات المكتوبة (فورم العقار، لوحة الإدارة، الاستيراد بالجملة) لـ Feature
+وربطها بالعقارات في عدد ثابت من الاستعلامات مهما كان عدد الأسماء:
+
+- الأسماء بتتوحد (normalize_arabic: الهمزات والتاء المربوطة وحالة الحروف والمسافات)
+  والمكرر بيتشال، فـ "أمن، امن ، أمن" = ميزة واحدة.
+- resolve_features: bulk_create واحد (ignore_conflicts على name_normalized) للناقص
+  + استعلام واحد بيجيب الكل.
+- attach_features: insert واحد في جدول الربط لكل العقارات (ignore_conflicts للموجود).
+
+bulk_create مابيبعتش signals، فكتالوج المميزات والـ bitmaps (feature_index.py) ونتايج
+البحث والـ facets بيتمسحوا هنا (بعد الـ commit، عشان مايتبنوش تاني من بيانات لسه ماتحفظتش).
+"""
+
+import re
+
+from django.db import transaction
+
+from . import facets, feature_index, result_cache
+from .models import Feature, Property
+from .normalization import normalize_arabic
+
+# الفاصلة العربي أو الإنجليزي
+SEPARATORS_RE = re.compile(r'[,،]')
+MAX_NAME_LENGTH = Feature._meta.get_field('name').max_length
+
+
+def split_names(value):
+    """أسماء من نص مفصول بفاصلة (أو قائمة أسماء زي ما هي)."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = SEPARATORS_RE.split(value)
+    return [name for name in value if name and name.strip()]
+
+
+def feature_key(name):
+    return normalize_arabic(name)[:MAX_NAME_LENGTH]
+
+
+def clean_names(names):
+    """{الاسم الموحد: الاسم للعرض} من غير تكرار؛ أول كتابة للاسم هي اللي بتتعرض."""
+    cleaned = {}
+    for name in split_names(names):
+        display = ' '.join(name.split())[:MAX_NAME_LENGTH]
+        key = feature_key(display)
+        if key and key not in cleaned:
+            cleaned[key] = display
+    return cleaned
+
+
+def resolve_features(names):
+    """{الاسم الموحد: Feature} لكل الأسماء (الناقص بيتعمل)، في استعلامين."""
+    cleaned = clean_names(names)
+    if not cleaned:
+        return {}
+    Feature.objects.bulk_create(
+        [Feature(name=display, name_normalized=key) for key, display in cleaned.items()],
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(feature_index.invalidate_catalogue)
+    return {feature.name_normalized: feature for feature in Feature.objects.filter(name_normalized__in=cleaned)}
+
+
+def attach_features(pairs):
+    """ربط (رقم العقار، Feature أو رقمها) في insert واحد. بيرجع أرقام المميزات اللي اتربطت."""
+    Through = Property.features.through
+    rows = {
+        (property_id, getattr(feature, 'pk', feature)) for property_id, feature in pairs
+    }
+    if not rows:
+        return set()
+    Through.objects.bulk_create(
+        [Through(property_id=property_id, feature_id=feature_id) for property_id, feature_id in rows],
+        ignore_conflicts=True,
+    )
+    feature_ids = {feature_id for _property_id, feature_id in rows}
+    transaction.on_commit(lambda: feature_index.invalidate_features(feature_ids))
+    return feature_ids
+
+
+def add_features(property_obj, names):
+    """إضافة مميزات بالاسم لعقار واحد (فورم العقار ولوحة الإدارة). بيرجع الـ Features."""
+    features = resolve_features(names)
+    if attach_features((property_obj.pk, feature) for feature in features.values()):
+        # الربط من غير m2m_changed، فنتايج البحث بالمميزات بتتمسح هنا (بعد الـ commit زي الـ bitmaps)
+        city = property_obj.city_normalized
+        transaction.on_commit(lambda: result_cache.invalidate(cities=[city]))
+        transaction.on_commit(facets.invalidate)
+    return list(features.values())
@@ -0,0 +1,169 @@
+# properties/filters.py
+
+"""
+فلاتر قائمة العقارات (نفس باراميترات GET بتاعة PropertyListView).
+بتستخدمها صفحة القائمة و الـ JSON API عشان الفلترة تبقى في مكان واحد.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from . import feature_index, search
+from .geo import filter_geo
+from .gazetteer import gazetteer, CITY, DISTRICT
+from .normalization import normalize_arabic
+
+# كل باراميترات الفلترة المدعومة
+FILTER_PARAMS = (
+    'q', 'city_search', 'property_type', 'status',
+    'min_price', 'max_price', 'bedrooms', 'min_area', 'max_area',
+    # حدود عليا مش شاملة، بتستخدمها روابط شرائح الـ histogram (نفس حدود الشرائح في facets.py)
+    'price_below', 'area_below',
+    'bbox', 'lat', 'lng', 'radius',
+)
+
+
+def canonical_params(params):
+    """
+    الفلاتر بعد توحيدها (من غير الفاضي، والنص موحد) كـ dict، عشان نفس البحث
+    يدي نفس مفتاح الكاش مهما اختلف ترتيب الباراميترات أو كتابتها.
+    """
+    canonical = {}
+    for name in FILTER_PARAMS:
+        value = (params.get(name) or '').strip()
+        if value:
+            canonical[name] = normalize_arabic(value) if name in ('q', 'city_search') else value
+    # المميزات باراميتر متكرر (features=1&features=5)، فبتتوحد كأرقام مرتبة
+    feature_ids = feature_index.parse_feature_ids(params)
+    if feature_ids:
+        canonical['features'] = ','.join(map(str, feature_ids))
+    return canonical
+
+
+def scoped_city(params):
+    """
+    لو النتائج محصورة في مدينة واحدة بالظبط (q = اسم مدينة) بيرجع اسمها الموحد، وإلا None.
+    """
+    query = params.get('q')
+    if params.get('city_search') or not query:
+        return None
+    kind, normalized_query = gazetteer.classify(query.strip())
+    return normalized_query if kind == CITY else None
+
+
+def _decimal(value):
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def filter_text(queryset, params):
+    """فلاتر النص: city_search أو q (مدينة / حي / بحث نصي كامل)."""
+    # فلترة بالمدينة بشكل صريح
+    city_search = params.get('city_search')
+    query = params.get('q')
+    if city_search:
+        # المقارنة على النسخة الموحدة من اسم المدينة (بادئة على عمود مفهرس)
+        city_value = normalize_arabic(city_search)
+        if city_value:
+            queryset = queryset.filter(city_normalized__startswith=city_value)
+    elif query:
+        # لو البحث يساوي اسم مدينة أو حي بالضبط، فلتر بالمدينة/الحي فقط لتجنب ظهور مدن أخرى
+        query_value = query.strip()
+        # التصنيف بيتم من قاموس الأماكن في الذاكرة من غير استعلامات exists()
+        kind, normalized_query = gazetteer.classify(query_value)
+        if kind == CITY:
+            queryset = queryset.filter(city_normalized=normalized_query)
+        elif kind == DISTRICT:
+            queryset = queryset.filter(district_normalized=normalized_query)
+        else:
+            # بحث نصي كامل (FTS) على العنوان والوصف والعنوان التفصيلي والمدينة والحي
+            # مرتب حسب الصلة، وباقي الفلاتر تحت بتتركب عليه في نفس الاستعلام
+            queryset = search.search(queryset, query_value)
+    return queryset
+
+
+def filter_features(queryset, params):
+    """
+    فلتر المميزات (features=1&features=5 = العقارات اللي فيها الاتنين): تقاطع الـ bitmaps
+    في الذاكرة (feature_index.py) والأرقام الناتجة في ``pk__in``، من غير join لكل ميزة.
+    لو الأرقام كتير (ميزة شائعة) الفلتر بيبقى subquery على جدول الربط.
+    """
+    feature_ids = feature_index.parse_feature_ids(params)
+    if not feature_ids:
+        return queryset
+    property_ids = feature_index.matching_property_ids(feature_ids)
+    if len(property_ids) > feature_index.MAX_PK_IN:
+        return queryset.filter(pk__in=feature_index.matching_property_subquery(feature_ids))
+    return queryset.filter(pk__in=property_ids)
+
+
+def facet_conditions(params):
+    """
+    شروط الفلاتر اللي ليها facets (النوع، الحالة، الغرف، السعر، المساحة) كـ Q لكل فلتر.
+    الفلتر اللي مش مستخدم بيبقى Q() فاضي.
+    """
+    conditions = {}
+
+    # فلترة نوع العقار
+    property_type = params.get('property_type')
+    conditions['property_type'] = Q(property_type=property_type) if property_type else Q()
+
+    # فلترة حالة العقار (للبيع أو للإيجار)
+    status = params.get('status')
+    conditions['status'] = Q(status=status) if status else Q()
+
+    # فلترة عدد غرف النوم
+    bedrooms = params.get('bedrooms')
+    conditions['bedrooms'] = Q()
+    if bedrooms and bedrooms.isdigit():
+        bedrooms_num = int(bedrooms)
+        if bedrooms_num >= 4:
+            conditions['bedrooms'] = Q(bedrooms__gte=4)
+        else:
+            conditions['bedrooms'] = Q(bedrooms=bedrooms_num)
+
+    # فلترة السعر الأدنى والأقصى
+    conditions['price'] = Q()
+    min_price = _decimal(params.get('min_price'))
+    if min_price is not None:
+        conditions['price'] &= Q(price__gte=min_price)
+    max_price = _decimal(params.get('max_price'))
+    if max_price is not None:
+        conditions['price'] &= Q(price__lte=max_price)
+    price_below = _decimal(params.get('price_below'))
+    if price_below is not None:
+        conditions['price'] &= Q(price__lt=price_below)
+
+    # فلترة المساحة
+    conditions['area'] = Q()
+    min_area = _decimal(params.get('min_area'))
+    if min_area is not None:
+        conditions['area'] &= Q(area__gte=min_area)
+    max_area = _decimal(params.get('max_area'))
+    if max_area is not None:
+        conditions['area'] &= Q(area__lte=max_area)
+    area_below = _decimal(params.get('area_below'))
+    if area_below is not None:
+        conditions['area'] &= Q(area__lt=area_below)
+
+    return conditions
+
+
+def filter_listings(queryset, params):
+    """
+    تطبيق الفلاتر على queryset (ListingCard) من dict/QueryDict للباراميترات.
+    لو فيه بحث نصي حر، الناتج بيكون مرتب حسب الصلة (فيه annotation اسمه search_rank).
+    """
+    queryset = filter_text(queryset, params)
+    # فلاتر الموقع (bbox / lat+lng+radius) على ListingCard
+    queryset = filter_geo(queryset, params)
+    queryset = filter_features(queryset, params)
+    for condition in facet_conditions(params).values():
+        if condition:
+            queryset = queryset.filter(condition)
+    return queryset
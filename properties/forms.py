@@ -2,6 +2,7 @@
 
 from django import forms
 from .models import Property, Feature, PropertyImage
+from .feature_index import catalogue
 
 class PropertyForm(forms.ModelForm):
     main_image = forms.ImageField(
@@ -67,4 +68,7 @@ class PropertyForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # الاختيارات من كتالوج المميزات المتخزن في الكاش بدل استعلام Feature في كل عرض
+        # (الـ queryset بيفضل للتحقق من القيم وقت الحفظ بس)
+        self.fields['features'].choices = catalogue()
         self.fields['features'].widget.attrs.update({'class': 'grid grid-cols-2 md:grid-cols-3 gap-2'})
@@ -0,0 +1,148 @@
+# properties/gazetteer.py
+
+"""
+قاموس أماكن (Gazetteer) داخل ذاكرة العملية لأسماء المدن والأحياء الموجودة
+في العقارات المنشورة.
+
+- بيتحمل مرة واحدة (lazy) عند أول استخدام.
+- إشارات الحفظ/الحذف بتعلّم عليه إنه محتاج تحديث، وبتزوّد رقم إصدار في الكاش
+  عشان باقي العمليات (workers) تعرف إن نسختها قديمة.
+- بيصنف نص البحث (مدينة / حي / نص حر) من غير أي استعلام لقاعدة البيانات،
+  وبيوفر اقتراحات بالبادئة (prefix trie) لمربع البحث.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+
+from .normalization import normalize_arabic
+
+CITY = 'city'
+DISTRICT = 'district'
+TEXT = 'text'
+
+VERSION_CACHE_KEY = 'properties:gazetteer:version'
+# حد أقصى لعمر النسخة المحملة حتى لو الكاش مش مشترك بين العمليات (LocMemCache)
+MAX_AGE = 300
+
+_TERMINAL = '$'
+
+
+class _Trie:
+    """شجرة بادئات بسيطة: كل عقدة dict، والمفتاح '$' فيه الأسماء اللي بتنتهي عندها."""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, entry):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(_TERMINAL, []).append(entry)
+
+    def search(self, prefix, limit):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        results = []
+        stack = [node]
+        while stack and len(results) < limit:
+            current = stack.pop()
+            results.extend(current.get(_TERMINAL, ()))
+            # الترتيب المعكوس عشان الـ stack يطلع الحروف بالترتيب الأبجدي
+            stack.extend(current[char] for char in sorted(current, reverse=True) if char != _TERMINAL)
+        return results[:limit]
+
+
+class Gazetteer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._version = None
+        self.cities = {}
+        self.districts = {}
+        self._trie = _Trie()
+
+    # -- التحميل --------------------------------------------------------------
+
+    def _load(self):
+        from .models import Property
+
+        cities = {}
+        districts = {}
+        rows = (
+            Property.objects.filter(is_published=True)
+            .values_list('city', 'city_normalized', 'district', 'district_normalized')
+            .distinct()
+        )
+        for city, city_normalized, district, district_normalized in rows:
+            if city_normalized:
+                cities.setdefault(city_normalized, city.strip())
+            if district_normalized:
+                districts.setdefault(district_normalized, district.strip())
+
+        trie = _Trie()
+        for normalized, name in sorted(cities.items()):
+            trie.insert(normalized, {'name': name, 'type': CITY})
+        for normalized, name in sorted(districts.items()):
+            trie.insert(normalized, {'name': name, 'type': DISTRICT})
+
+        self.cities, self.districts, self._trie = cities, districts, trie
+
+    def _ensure_loaded(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        stale = (
+            not self._loaded
+            or version != self._version
+            or time.monotonic() - self._loaded_at > MAX_AGE
+        )
+        if not stale:
+            return
+        with self._lock:
+            self._load()
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+            self._version = version
+
+    def invalidate(self):
+        """تعليم النسخة الحالية كقديمة (بتتنادى من إشارات Property)."""
+        self._loaded = False
+        try:
+            cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, 1, None)
+
+    # -- الاستخدام ------------------------------------------------------------
+
+    def classify(self, query):
+        """
+        بيرجع (نوع, القيمة الموحدة): CITY لو النص اسم مدينة بالضبط،
+        DISTRICT لو اسم حي، وإلا TEXT.
+        """
+        normalized = normalize_arabic(query)
+        if not normalized:
+            return TEXT, normalized
+        self._ensure_loaded()
+        if normalized in self.cities:
+            return CITY, normalized
+        if normalized in self.districts:
+            return DISTRICT, normalized
+        return TEXT, normalized
+
+    def suggest(self, prefix, limit=10, kind=None):
+        """اقتراحات أماكن تبدأ بالنص المكتوب (اختيارياً مدن فقط أو أحياء فقط)."""
+        normalized = normalize_arabic(prefix)
+        if not normalized:
+            return []
+        self._ensure_loaded()
+        if kind is None:
+            return self._trie.search(normalized, limit)
+        matches = self._trie.search(normalized, limit * 4)
+        return [entry for entry in matches if entry['type'] == kind][:limit]
+
+
+gazetteer = Gazetteer()
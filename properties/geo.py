@@ -0,0 +1,181 @@
+# properties/geo.py
+
+"""
+البحث الجغرافي في العقارات: "في نطاق N كم من نقطة" و "جوه حدود الخريطة (bbox)".
+
+كل كارت (ListingCard) متخزن معاه geohash لموقعه في عمود مفهرس. البحث بيتم على مرحلتين:
+
+1. تصفية مبدئية بالخلايا: بنغطي المستطيل المطلوب بعدد محدود من خلايا geohash، وكل خلية
+   = شرط range على العمود المفهرس (geohash >= 'abc' AND geohash < 'abc{').
+2. تدقيق في نفس الاستعلام: للـ bbox شرط range على خط العرض والطول، وللنطاق مسافة
+   haversine كتعبير SQL (distance_km).
+"""
+
+import math
+
+from django.db.models import Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+# أكبر من أي حرف في GEOHASH_ALPHABET، فـ prefix + GEOHASH_END = نهاية نطاق البادئة
+GEOHASH_END = '{'
+
+# أقصى عدد خلايا في استعلام واحد؛ لو المستطيل محتاج أكتر بنكبر الخلية
+MAX_CELLS = 24
+
+# أقصى نطاق مسموح بيه في البحث بالمسافة
+MAX_RADIUS_KM = 200
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    if latitude is None or longitude is None:
+        return ''
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, value = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(ارتفاع، عرض) خلية geohash بالدرجات عند الدقة دي."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def covering_cells(south, west, north, east, max_cells=MAX_CELLS):
+    """
+    بادئات geohash بتغطي المستطيل بالكامل، بأدق دقة عددها ميزيدش عن max_cells.
+    ممكن تغطي مساحة أكبر شوية من المستطيل، والتدقيق بيتم بعدها.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(precision)
+        rows = math.floor(north / lat_step) - math.floor(south / lat_step) + 1
+        columns = math.floor(east / lon_step) - math.floor(west / lon_step) + 1
+        if rows * columns <= max_cells:
+            break
+
+    cells = set()
+    first_row, first_column = math.floor(south / lat_step), math.floor(west / lon_step)
+    for row in range(rows):
+        latitude = min((first_row + row + 0.5) * lat_step, 90.0)
+        for column in range(columns):
+            longitude = min((first_column + column + 0.5) * lon_step, 180.0)
+            cells.add(encode_geohash(latitude, longitude, precision))
+    return sorted(cells)
+
+
+def cells_condition(cells, field='geohash'):
+    condition = Q()
+    for cell in cells:
+        condition |= Q(**{f'{field}__gte': cell, f'{field}__lt': cell + GEOHASH_END})
+    return condition
+
+
+def distance_km(latitude, longitude, lat_field='latitude', lon_field='longitude'):
+    """
+    المسافة (haversine) بالكيلومتر من النقطة لكل صف كتعبير SQL، فبتتحسب في قاعدة البيانات
+    على الصفوف اللي عدت من التصفية بالخلايا بس (Django بيعرّف الدوال دي لـ SQLite كمان).
+    """
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = Radians(lat_field), Radians(lon_field)
+    a = (
+        Power(Sin((lat2 - Value(lat1)) / Value(2.0)), 2)
+        + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin((lon2 - Value(lon1)) / Value(2.0)), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Value(1.0), Sqrt(a)))
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """المستطيل اللي بيحيط بدايرة نصف قطرها radius_km."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    lon_delta = 180.0 if cos_lat < 1e-6 else min(180.0, lat_delta / cos_lat)
+    return (
+        max(-90.0, latitude - lat_delta), max(-180.0, longitude - lon_delta),
+        min(90.0, latitude + lat_delta), min(180.0, longitude + lon_delta),
+    )
+
+
+def _float(value, low, high):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(value) or not low <= value <= high:
+        return None
+    return value
+
+
+def parse_bbox(value):
+    """``south,west,north,east`` -> tuple أو None لو مش صالح."""
+    if not value:
+        return None
+    parts = value.split(',')
+    if len(parts) != 4:
+        return None
+    south, north = _float(parts[0], -90, 90), _float(parts[2], -90, 90)
+    west, east = _float(parts[1], -180, 180), _float(parts[3], -180, 180)
+    if None in (south, west, north, east) or south > north or west > east:
+        return None
+    return south, west, north, east
+
+
+def parse_radius(params):
+    """(lat, lng, radius_km) من الباراميترات أو None."""
+    latitude = _float(params.get('lat'), -90, 90)
+    longitude = _float(params.get('lng'), -180, 180)
+    radius = _float(params.get('radius'), 0, MAX_RADIUS_KM)
+    if None in (latitude, longitude) or not radius:
+        return None
+    return latitude, longitude, radius
+
+
+def within_bbox(queryset, south, west, north, east):
+    """العناصر جوه المستطيل: تصفية بالخلايا على geohash + شرط range على الإحداثيات."""
+    return queryset.filter(
+        cells_condition(covering_cells(south, west, north, east)),
+        latitude__range=(south, north),
+        longitude__range=(west, east),
+    )
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """
+    العناصر في نطاق radius_km من النقطة، ومعاها ``distance_km`` (annotation) للترتيب والعرض.
+    المرشحين من خلايا المستطيل المحيط بالدايرة والمسافة بتتدقق في نفس الاستعلام، فمفيش
+    قايمة أرقام بتتبني في بايثون مهما كان النطاق كبير.
+    """
+    return (
+        within_bbox(queryset, *radius_bbox(latitude, longitude, radius_km))
+        .annotate(distance_km=distance_km(latitude, longitude))
+        .filter(distance_km__lte=radius_km)
+    )
+
+
+def filter_geo(queryset, params):
+    """فلاتر الموقع من الباراميترات: ``bbox=south,west,north,east`` و/أو ``lat`` + ``lng`` + ``radius``."""
+    bbox = parse_bbox(params.get('bbox'))
+    if bbox:
+        queryset = within_bbox(queryset, *bbox)
+    radius = parse_radius(params)
+    if radius:
+        queryset = within_radius(queryset, *radius)
+    return queryset
@@ -0,0 +1,93 @@
+# properties/image_metadata.py
+
+"""
+بيانات العرض اللي بتتحسب مرة واحدة وقت رفع الصورة (image_queue.py) وبتتحفظ في PropertyImage:
+
+- width / height: مقاس الصورة (بعد اتجاه EXIF) عشان التمبلت يحجز المكان قبل التحميل.
+- dominant_color: اللون الغالب (#rrggbb) كخلفية لحد ما الصورة تحمل.
+- placeholder: صورة LQIP صغيرة جداً (PLACEHOLDER_SIZE بكسل، WebP مضبب) كـ data URI
+  (بضع مئات من البايتات) بتظهر على طول والصورة الحقيقية بتتحمل lazy.
+
+الحساب من نسخة مصغرة (JPEG draft) فمفيش فك للصورة كاملة، والمقاس من الـ header.
+"""
+
+import base64
+import io
+
+from PIL import Image, ImageFilter, ImageOps
+
+from .image_storage import open_source
+
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+# مقاس النسخة المصغرة اللي الألوان والـ placeholder (والـ dHash وقت الرفع) بيتحسبوا منها
+PREVIEW_SIZE = PLACEHOLDER_SIZE * 8
+FIELDS = ('width', 'height', 'dominant_color', 'placeholder')
+DOMINANT_COLORS = 5
+# اتجاهات EXIF اللي فيها الصورة متلفة 90 درجة (العرض والطول بيتبدلوا)
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _orientation(image):
+    try:
+        return image.getexif().get(0x0112, 1)
+    except Exception:
+        return 1
+
+
+def dominant_color(image):
+    """أكتر لون متكرر بعد تقليل الألوان لـ DOMINANT_COLORS."""
+    quantized = image.convert('RGB').quantize(colors=DOMINANT_COLORS)
+    count, index = max(quantized.getcolors())
+    red, green, blue = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def placeholder(image):
+    small = image.convert('RGB')
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    small = small.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    small.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def dimensions(image):
+    """(العرض، الطول) من الـ header بعد اتجاه EXIF، من غير فك الصورة."""
+    width, height = image.size
+    if _orientation(image) in ROTATED_ORIENTATIONS:
+        width, height = height, width
+    return width, height
+
+
+def preview(image):
+    """نسخة مصغرة (PREVIEW_SIZE) في الاتجاه الصح؛ ده الفك الوحيد للصورة."""
+    image.draft('RGB', (PREVIEW_SIZE, PREVIEW_SIZE))
+    small = ImageOps.exif_transpose(image)
+    small.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+    return small
+
+
+def describe(small, width, height):
+    """dict بالحقول من نسخة preview() والمقاس الأصلي."""
+    return {
+        'width': width,
+        'height': height,
+        'dominant_color': dominant_color(small),
+        'placeholder': placeholder(small),
+    }
+
+
+def analyze_image(image):
+    """dict بالحقول (width, height, dominant_color, placeholder) لصورة Pillow مفتوحة."""
+    width, height = dimensions(image)
+    return describe(preview(image), width, height)
+
+
+def analyze(source):
+    """بيانات العرض لمسار أو رابط، أو dict فاضي لو مش صورة تتقري."""
+    try:
+        with open_source(source) as handle, Image.open(handle) as image:
+            return analyze_image(image)
+    except (OSError, ValueError):
+        return {}
@@ -0,0 +1,321 @@
+# properties/image_queue.py
+
+"""
+طابور رفع صور العقارات في الخلفية.
+
+كل صورة = مهمة (ملف JSON) في مجلد على الديسك (PROPERTY_IMAGE_SPOOL_DIR):
+- pending/: مهام مستنية الرفع.
+- uploading/: مهام اتاخدت وبيترفعوا دلوقتي (الأخد = os.replace من pending، فمهمة واحدة
+  مابتترفعش مرتين حتى لو الـ thread pool وأمر upload_queued_images شغالين مع بعض).
+- failed/: مهام فشلت (معاها سبب الفشل) عشان تتراجع أو تتعاد.
+- files/: الملفات اللي اترفعت من فورم العقار، محفوظة لحد ما تترفع.
+
+المصدر (source) ممكن يكون رابط أو مسار ملف على الديسك؛ الرفع (image_storage.py) وبعدين
+إنشاء PropertyImage بالقيمة اللي رجعت. المهمة بتتكتب في ملف مؤقت وبعدين os.replace فمفيش
+مهمة بتتقري وهي نص مكتوبة.
+
+صور فورم العقار (enqueue_upload) بتتحفظ على الديسك وبيتعملها PendingPropertyImage، وبعد
+الـ commit بتتبعت لـ uploader (ThreadPoolExecutor بعدد threads ثابت
+PROPERTY_IMAGE_UPLOAD_WORKERS) فالطلب بيرجع على طول. التقدم بيتبعت لصاحب العقار على
+WebSocket الإشعارات (مجموعة user_{id}).
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import dedupe, image_metadata
+from .image_storage import get_backend, open_source
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+UPLOADING = 'uploading'
+FAILED = 'failed'
+FILES = 'files'
+
+
+def spool_dir(state=PENDING):
+    path = os.path.join(str(settings.PROPERTY_IMAGE_SPOOL_DIR), state)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def job_path(job_id, state=PENDING):
+    return os.path.join(spool_dir(state), f"{job_id}.json")
+
+
+def _write_job(job, state=PENDING):
+    path = job_path(job['id'], state)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump(job, handle, ensure_ascii=False)
+    os.replace(temporary, path)
+    return path
+
+
+def enqueue_image(property_id, source, is_main=False, **extra):
+    """إضافة صورة للطابور. بيرجع رقم المهمة."""
+    job = {
+        'id': extra.pop('job_id', None) or uuid.uuid4().hex,
+        'property_id': property_id,
+        'source': source,
+        'is_main': is_main,
+        'queued_at': timezone.now().isoformat(),
+        **extra,
+    }
+    _write_job(job)
+    return job['id']
+
+
+def spool_file(uploaded_file):
+    """حفظ ملف مرفوع (UploadedFile) في files/ على دفعات. بيرجع المسار."""
+    extension = os.path.splitext(uploaded_file.name)[1].lower()[:10]
+    path = os.path.join(spool_dir(FILES), f"{uuid.uuid4().hex}{extension}")
+    with open(path, 'wb') as handle:
+        for chunk in uploaded_file.chunks():
+            handle.write(chunk)
+    return path
+
+
+def enqueue_upload(property_obj, uploaded_file, is_main=False, replace_main=False, user_id=None):
+    """
+    صورة من فورم العقار: تتحفظ على الديسك، وتتسجل كـ PendingPropertyImage، وتترفع في
+    الخلفية بعد الـ commit. replace_main: الصورة الرئيسية القديمة تتمسح لما الجديدة تترفع.
+    """
+    from .models import PendingPropertyImage
+
+    source = spool_file(uploaded_file)
+    job_id = uuid.uuid4().hex
+    pending = PendingPropertyImage.objects.create(
+        property=property_obj, job_id=job_id, file_name=uploaded_file.name[:255], is_main=is_main,
+    )
+    enqueue_image(
+        property_obj.pk, source, is_main=is_main, job_id=job_id, spooled=True,
+        replace_main=replace_main, user_id=user_id,
+    )
+    transaction.on_commit(lambda: uploader.submit(job_path(job_id)))
+    return pending
+
+
+def pending_jobs():
+    directory = spool_dir(PENDING)
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json')
+    )
+
+
+def claim_job(path):
+    """أخد مهمة من pending/ لـ uploading/. بيرجع المسار الجديد أو None لو حد تاني أخدها."""
+    claimed = os.path.join(spool_dir(UPLOADING), os.path.basename(path))
+    try:
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return None
+    # وقت الأخد (مش وقت الإضافة) هو اللي requeue_stale بيقيس منه
+    os.utime(claimed)
+    return claimed
+
+
+def upload(source):
+    """رفع المصدر (Cloudinary أو التخزين المحلي حسب PROPERTY_IMAGE_BACKEND) وبيرجع قيمة حقل الصورة."""
+    return get_backend().save(source)
+
+
+def _inspect(source):
+    """
+    (dHash، المقاس، نسخة مصغرة) من فتح وفك واحد للمصدر، أو (None, None, None) لو مش صورة
+    تتقري. الـ dHash بيتحسب من النسخة المصغرة (نفس الصورة بعد فك JPEG بمقاس صغير).
+    """
+    try:
+        with open_source(source) as handle, Image.open(handle) as image:
+            size = image_metadata.dimensions(image)
+            small = image_metadata.preview(image)
+        return dedupe.dhash(small), size, small
+    except (OSError, ValueError):
+        return None, None, None
+
+
+def process_job(path):
+    """رفع صورة مهمة واحدة (متاخدة بـ claim_job). بيرجع PropertyImage أو None لو المهمة فشلت (بتتنقل لـ failed/)."""
+    from .models import PendingPropertyImage, Property, PropertyImage
+
+    with open(path, encoding='utf-8') as handle:
+        job = json.load(handle)
+    try:
+        owner_id = Property.objects.filter(pk=job['property_id']).values_list('owner_id', flat=True).first()
+        if owner_id is None:
+            raise ValueError("العقار مش موجود")
+        phash, size, small = _inspect(job['source'])
+        # صورة متكررة (نفس الصورة اترفعت قبل كده لنفس المالك) بتاخد نفس الملف المتخزن وبيانات عرضه من غير رفع
+        duplicate = dedupe.find_duplicate(phash, owner_id, size)
+        value = duplicate.image if duplicate is not None else upload(job['source'])
+        if duplicate is not None and duplicate.width is not None:
+            metadata = {name: getattr(duplicate, name) for name in image_metadata.FIELDS}
+        elif small is not None:
+            metadata = image_metadata.describe(small, *size)
+        else:
+            metadata = {}
+        with transaction.atomic():
+            if job.get('replace_main'):
+                PropertyImage.objects.filter(property_id=job['property_id'], is_main=True).delete()
+            image = PropertyImage.objects.create(
+                property_id=job['property_id'], image=value, is_main=job['is_main'],
+                **dedupe.hash_fields(phash), **metadata,
+            )
+            PendingPropertyImage.objects.filter(job_id=job['id']).delete()
+    except Exception as error:
+        logger.warning("Image upload job %s failed: %s", job['id'], error)
+        job['error'] = str(error)
+        _write_job(job, FAILED)
+        os.remove(path)
+        PendingPropertyImage.objects.filter(job_id=job['id']).update(
+            status=PendingPropertyImage.FAILED, error=str(error)
+        )
+        report_progress(job)
+        return None
+    os.remove(path)
+    if job.get('spooled'):
+        try:
+            os.remove(job['source'])
+        except FileNotFoundError:
+            pass
+    report_progress(job)
+    return image
+
+
+def report_progress(job):
+    """
+    تقدم رفع صور العقار لصاحبه على WebSocket الإشعارات (لو المهمة جاية من الفورم)،
+    وإشعار عادي لما كل الصور تخلص.
+    """
+    user_id = job.get('user_id')
+    if not user_id:
+        return
+    from .models import PendingPropertyImage, Property
+    from notifications.utils import send_notification
+
+    try:
+        pending = PendingPropertyImage.objects.filter(property_id=job['property_id'])
+        remaining = pending.filter(status=PendingPropertyImage.PENDING).count()
+        failed = pending.filter(status=PendingPropertyImage.FAILED).count()
+        async_to_sync(get_channel_layer().group_send)(
+            f'user_{user_id}',
+            {
+                'type': 'image_upload_progress',
+                'property_id': job['property_id'],
+                'job_id': job['id'],
+                'succeeded': 'error' not in job,
+                'remaining': remaining,
+                'failed': failed,
+            }
+        )
+        if remaining == 0:
+            prop = Property.objects.filter(pk=job['property_id']).only('pk', 'slug', 'title').first()
+            if prop is not None:
+                message = f"تم رفع صور عقارك '{prop.title}'"
+                if failed:
+                    message += f" (فشل رفع {failed} صورة)"
+                send_notification(user_id, message, link=prop.get_absolute_url())
+    except Exception:
+        # الإشعار مش أهم من الرفع نفسه
+        logger.exception("Could not report image upload progress for job %s", job['id'])
+
+
+def requeue_stale(max_age=3600):
+    """
+    رجوع المهام اللي فضلت في uploading/ أكتر من max_age ثانية (الـ process وقع وهي بتترفع)
+    لـ pending/. بيرجع عددهم.
+    """
+    directory = spool_dir(UPLOADING)
+    now = timezone.now().timestamp()
+    requeued = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith('.json') and now - os.path.getmtime(path) > max_age:
+            try:
+                os.replace(path, os.path.join(spool_dir(PENDING), name))
+            except FileNotFoundError:
+                continue
+            requeued += 1
+    return requeued
+
+
+def drain(limit=None):
+    """رفع كل المهام المستنية (أو أول limit منهم). بيرجع (عدد الناجح، عدد الفاشل)."""
+    done = failed = 0
+    for path in pending_jobs()[:limit]:
+        claimed = claim_job(path)
+        if claimed is None:
+            continue
+        if process_job(claimed) is None:
+            failed += 1
+        else:
+            done += 1
+    return done, failed
+
+
+class ImageUploader:
+    """
+    رفع مهام الطابور في thread pool بعدد threads ثابت (مش thread لكل صورة)، فطلب الفورم
+    بيرجع على طول ومفيش أكتر من max_workers رفع في نفس الوقت لكل process.
+
+    أول ما الـ pool يبدأ (start() من wsgi.py مع كل worker جديد) بيرجّع المهام اللي worker
+    قديم اتقفل وهي بتترفع (gunicorn --max-requests / --timeout) وبيرفع كل اللي مستني في
+    pending/، فمفيش صورة بتفضل مستنية للأبد. الأخد بـ os.replace فالـ workers مابيتخانقوش.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                workers = self.max_workers or settings.PROPERTY_IMAGE_UPLOAD_WORKERS
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-upload')
+                self._executor.submit(self._recover)
+            return self._executor
+
+    def start(self):
+        self._get_executor()
+
+    def submit(self, path):
+        return self._get_executor().submit(self._run, path)
+
+    def _recover(self):
+        try:
+            requeued = requeue_stale(max_age=settings.PROPERTY_IMAGE_STALE_AFTER)
+            if requeued:
+                logger.info("Requeued %s stale image upload jobs", requeued)
+            for path in pending_jobs():
+                self.submit(path)
+        except Exception:
+            logger.exception("Could not recover queued image upload jobs")
+
+    def _run(self, path):
+        claimed = claim_job(path)
+        if claimed is None:
+            return None
+        try:
+            return process_job(claimed)
+        except Exception:
+            logger.exception("Image upload worker crashed on %s", path)
+            return None
+        finally:
+            # كل thread ليه اتصال قاعدة بيانات خاص بيه
+            close_old_connections()
+
+
+uploader = ImageUploader()
@@ -0,0 +1,248 @@
+# properties/image_storage.py
+
+"""
+مكان تخزين صور العقارات وروابط عرضها (PROPERTY_IMAGE_BACKEND):
+
+- cloudinary: الرفع على Cloudinary والتحسين (مقاس/صيغة/جودة) بيتعمل في الرابط نفسه.
+- local: من غير نت (الاختبارات والـ staging والاستضافة الذاتية). الأصل بيتحفظ
+  content-addressed (sha256 للمحتوى) تحت PROPERTY_IMAGE_LOCAL_ROOT، ووقت الرفع بتتولد
+  نسخ WebP/AVIF بعروض ثابتة (derivatives.py) في ProcessPoolExecutor فالرفع مابيستناش.
+  لو نسخة ناقصة (اتمسحت أو الـ pool وقع) بتتولد وقت أول طلب ليها (local_image view).
+
+الصورة المحلية بتتخزن في حقل الصورة كـ ``local/<sha256>.<ext>``، فكل صورة بتعرف
+مكانها من قيمتها (backend_for) حتى لو الإعداد اتغير بعد كده.
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from . import derivatives
+
+logger = logging.getLogger(__name__)
+
+LOCAL_PREFIX = 'local/'
+# العرض الافتراضي لـ get_optimized_url (زي الرابط القديم w_400)
+DEFAULT_WIDTH = 400
+
+
+# التحويلات المسماة اللي روابطها بتتحسب مرة واحدة وقت الرفع (PropertyImage.delivery_urls):
+# الاسم -> (إعدادات Cloudinary، عرض النسخة في التخزين المحلي أو None للأصل)
+TRANSFORMATIONS = {
+    'card': ({'width': 600, 'height': 336, 'crop': 'fill', 'gravity': 'auto'}, 800),
+    'gallery': ({'width': 1200, 'crop': 'limit'}, 1200),
+    'thumbnail': ({'width': 200, 'height': 200, 'crop': 'fill', 'gravity': 'auto'}, 400),
+    # og:image لازم صيغة تفهمها كل المواقع (JPEG)، فالتخزين المحلي بيستخدم الأصل
+    'og': ({'width': 1200, 'height': 630, 'crop': 'fill', 'gravity': 'auto', 'format': 'jpg'}, None),
+}
+# بيزيد لما التحويلات تتغير، فالروابط المحفوظة القديمة تتحسب تاني
+DELIVERY_URLS_VERSION = 1
+
+
+def open_source(source):
+    """ملف مفتوح للقراءة من مسار أو رابط (أو الملف نفسه لو مفتوح)."""
+    if hasattr(source, 'read'):
+        return source
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source, timeout=30) as response:
+            return io.BytesIO(response.read())
+    return open(source, 'rb')
+
+
+def _public_id(resource):
+    return getattr(resource, 'public_id', None) or str(resource)
+
+
+class CloudinaryImageBackend:
+    name = 'cloudinary'
+
+    def save(self, source):
+        import cloudinary.uploader
+
+        return cloudinary.uploader.upload(source)['public_id']
+
+    def url(self, resource):
+        return resource.url
+
+    def optimized_url(self, resource, width=DEFAULT_WIDTH, fmt='auto'):
+        from cloudinary.utils import cloudinary_url
+
+        # f_auto (fetch_format) بيختار الصيغة حسب المتصفح؛ format كان بيحط ".auto" كامتداد
+        formats = {'fetch_format': 'auto'} if fmt == 'auto' else {'format': fmt}
+        return cloudinary_url(
+            _public_id(resource), crop='fill', quality='auto', width=width, secure=True, **formats,
+        )[0]
+
+    def srcset(self, resource, fmt='auto'):
+        return ', '.join(
+            f"{self.optimized_url(resource, width, fmt)} {width}w" for width in derivatives.WIDTHS
+        )
+
+    def transformation_url(self, resource, name):
+        from cloudinary.utils import cloudinary_url
+
+        options = dict(TRANSFORMATIONS[name][0])
+        if 'format' not in options:
+            options['fetch_format'] = 'auto'
+        return cloudinary_url(_public_id(resource), quality='auto', secure=True, **options)[0]
+
+
+class LocalImageBackend:
+    name = 'local'
+
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def root(self):
+        return str(settings.PROPERTY_IMAGE_LOCAL_ROOT)
+
+    @property
+    def base_url(self):
+        return settings.PROPERTY_IMAGE_LOCAL_URL
+
+    # ------------------------------------------------------------------
+    # المسارات
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def split(resource):
+        """(sha256, الامتداد) من قيمة حقل الصورة."""
+        value = _public_id(resource)
+        # القيمة ممكن تكون نص (لسه راجعة من save) ولـ str دالة اسمها format
+        extension = None if isinstance(resource, str) else getattr(resource, 'format', None)
+        if extension is None and '.' in value:
+            value, extension = value.rsplit('.', 1)
+        return value[len(LOCAL_PREFIX):], extension or ''
+
+    @staticmethod
+    def original_name(digest, extension):
+        return f"originals/{digest[:2]}/{digest}.{extension}" if extension else f"originals/{digest[:2]}/{digest}"
+
+    @staticmethod
+    def derivative_dir_name(digest):
+        return f"derived/{digest[:2]}/{digest}"
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    # ------------------------------------------------------------------
+    # الرفع
+    # ------------------------------------------------------------------
+
+    def _pool_executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn مش fork: الـ process اللي بيرفع فيه threads (image_queue.uploader)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.PROPERTY_IMAGE_DERIVATIVE_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._pool
+
+    def save(self, source):
+        """حفظ الأصل (مسار أو رابط) باسم محتواه وبدء توليد النسخ في الخلفية. بيرجع قيمة الحقل."""
+        extension = os.path.splitext(source.split('?', 1)[0])[1].lower().lstrip('.')[:10] or 'jpg'
+        hasher = hashlib.sha256()
+        temporary = os.path.join(self.root, 'originals', f".{os.getpid()}.{threading.get_ident()}.tmp")
+        os.makedirs(os.path.dirname(temporary), exist_ok=True)
+        opener = urllib.request.urlopen if source.startswith(('http://', 'https://')) else (lambda s: open(s, 'rb'))
+        with opener(source) as reader, open(temporary, 'wb') as writer:
+            for chunk in iter(lambda: reader.read(1024 * 1024), b''):
+                hasher.update(chunk)
+                writer.write(chunk)
+        digest = hasher.hexdigest()
+        original = self.path(self.original_name(digest, extension))
+        os.makedirs(os.path.dirname(original), exist_ok=True)
+        # نفس المحتوى = نفس الملف، فالنسخة الموجودة بتتستخدم زي ما هي
+        if os.path.exists(original):
+            os.remove(temporary)
+        else:
+            os.replace(temporary, original)
+            self.generate_async(digest, extension)
+        return f"{LOCAL_PREFIX}{digest}.{extension}"
+
+    def generate_async(self, digest, extension):
+        future = self._pool_executor().submit(
+            derivatives.generate,
+            self.path(self.original_name(digest, extension)),
+            self.path(self.derivative_dir_name(digest)),
+        )
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            logger.warning("Image derivative generation failed: %s", future.exception())
+
+    def ensure_derivative(self, digest, width, fmt):
+        """النسخة المطلوبة (بتتولد هنا لو ناقصة). بيرجع مسارها أو None لو الأصل مش موجود."""
+        directory = self.path(self.derivative_dir_name(digest))
+        path = os.path.join(directory, derivatives.derivative_name(width, fmt))
+        if os.path.exists(path):
+            return path
+        originals = self.path(f"originals/{digest[:2]}")
+        names = [name for name in os.listdir(originals) if name.split('.', 1)[0] == digest] if os.path.isdir(originals) else []
+        if not names:
+            return None
+        derivatives.generate(os.path.join(originals, names[0]), directory, widths=(width,), formats=(fmt,))
+        return path
+
+    # ------------------------------------------------------------------
+    # الروابط
+    # ------------------------------------------------------------------
+
+    def url(self, resource):
+        digest, extension = self.split(resource)
+        return f"{self.base_url}{self.original_name(digest, extension)}"
+
+    def optimized_url(self, resource, width=DEFAULT_WIDTH, fmt='webp'):
+        digest, _extension = self.split(resource)
+        width = next((size for size in derivatives.WIDTHS if size >= width), derivatives.WIDTHS[-1])
+        return f"{self.base_url}{self.derivative_dir_name(digest)}/{derivatives.derivative_name(width, fmt)}"
+
+    def srcset(self, resource, fmt='webp'):
+        return ', '.join(
+            f"{self.optimized_url(resource, width, fmt)} {width}w" for width in derivatives.WIDTHS
+        )
+
+    def transformation_url(self, resource, name):
+        width = TRANSFORMATIONS[name][1]
+        return self.url(resource) if width is None else self.optimized_url(resource, width)
+
+
+cloudinary_backend = CloudinaryImageBackend()
+local_backend = LocalImageBackend()
+BACKENDS = {backend.name: backend for backend in (cloudinary_backend, local_backend)}
+
+
+def get_backend():
+    """مكان رفع الصور الجديدة حسب PROPERTY_IMAGE_BACKEND."""
+    return BACKENDS[settings.PROPERTY_IMAGE_BACKEND]
+
+
+def backend_for(resource):
+    """مكان صورة موجودة (من قيمة الحقل نفسها)."""
+    return local_backend if _public_id(resource).startswith(LOCAL_PREFIX) else cloudinary_backend
+
+
+def delivery_urls(resource):
+    """
+    روابط عرض الصورة المحسوبة مسبقاً (بتتحفظ في PropertyImage.delivery_urls عشان
+    التمبلت يقرأها من غير ما يبني رابط في كل عرض).
+    """
+    backend = backend_for(resource)
+    urls = {name: backend.transformation_url(resource, name) for name in TRANSFORMATIONS}
+    urls['original'] = backend.url(resource)
+    urls['srcset'] = backend.srcset(resource)
+    urls['v'] = DELIVERY_URLS_VERSION
+    return urls
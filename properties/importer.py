@@ -0,0 +1,248 @@
+# properties/importer.py
+
+"""
+استيراد عقارات بالجملة من CSV أو JSONL (أمر ``manage.py import_listings``).
+
+- القراءة سطر بسطر (ذاكرة ثابتة مهما كان حجم الملف)، والمعالجة على دفعات.
+- كل صف بيتراجع بنفس قواعد PropertyForm؛ الصفوف الغلط (ومنها سطور JSONL البايظة أو اللي مش
+  object) بتتكتب في ملف أخطاء ومابتوقفش الاستيراد.
+- كل دفعة في transaction واحدة: slugs بالجملة، bulk_create للعقارات، المميزات بـ get-or-create
+  واحد للدفعة، وروابط المميزات في INSERT واحد. الفهرس النصي وكروت القوائم وتجمعات الخريطة
+  بتتحدث للدفعة كلها، فمفيش إشارات (signals) ولا إشعارات لكل صف.
+- الصور بتتحط في طابور الرفع في الخلفية (image_queue.py).
+- التقدم (عدد الصفوف اللي خلصت) بيتحفظ في ImportCheckpoint جوه transaction الدفعة نفسها،
+  فلو الاستيراد وقف بيكمل من بعد آخر دفعة اتحفظت من غير ما يعيد أي صف.
+  مهام الصور وسطور ملف الأخطاء بتتكتب بعد الـ commit: لو العملية وقعت بينهم بتضيع
+  (مابتتكررش)، وصور العقارات دي ممكن تتضاف من الفورم.
+
+الأعمدة: حقول PropertyForm (title, description, property_type, ...) و owner (اسم المستخدم،
+اختياري لو فيه مالك افتراضي) و features (أسماء مفصولة بفاصلة أو قائمة) و images (روابط/مسارات
+مفصولة بـ | أو قائمة، الأولى هي الرئيسية).
+"""
+
+import csv
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from . import cards, clusters, facets, result_cache, search
+from .features import attach_features, feature_key, resolve_features
+from .forms import PropertyForm
+from .gazetteer import gazetteer
+from .image_queue import enqueue_image
+from .models import ImportCheckpoint, ListingCard, Property
+from .slugs import allocate_slugs
+
+User = get_user_model()
+
+FORM_FIELDS = [name for name in PropertyForm._meta.fields if name != 'features']
+TRUE_VALUES = {'1', 'true', 'yes', 'on', 'نعم'}
+
+
+class InvalidRow:
+    """سطر ماينفعش يتقري كصف (JSON بايظ أو مش object)؛ بيتكتب في ملف الأخطاء زي أي صف غلط."""
+
+    def __init__(self, text, message, code):
+        self.text = text
+        self.errors = {'__all__': [{'message': message, 'code': code}]}
+
+
+def _parse_json_line(line):
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as error:
+        return InvalidRow(line, f'JSON غير صالح: {error.msg}', 'json')
+    if not isinstance(row, dict):
+        return InvalidRow(line, 'الصف لازم يكون JSON object', 'type')
+    return row
+
+
+def iter_rows(path, fmt=None):
+    """(رقم السطر، dict) لكل صف في الملف، من غير ما الملف كله يتحمل في الذاكرة."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, encoding='utf-8-sig', newline='') as handle:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(handle), start=1):
+                yield number, row
+        elif fmt == 'jsonl':
+            for number, line in enumerate(handle, start=1):
+                line = line.strip()
+                if line:
+                    yield number, _parse_json_line(line)
+        else:
+            raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _split(value, separator):
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(separator) if item.strip()]
+
+
+def form_data(row):
+    data = {}
+    for name in FORM_FIELDS:
+        value = row.get(name)
+        if value is None or value == '':
+            continue
+        data[name] = value
+    # الصف من غير is_published بيتنشر زي الفورم الافتراضي
+    published = row.get('is_published')
+    if published is None or published == '':
+        data['is_published'] = 'on'
+    elif str(published).strip().lower() in TRUE_VALUES:
+        data['is_published'] = 'on'
+    else:
+        data.pop('is_published', None)
+    return data
+
+
+class ListingImporter:
+    def __init__(self, owner=None, batch_size=500, checkpoint_key=None, errors_path=None, report=None):
+        self.default_owner = owner
+        self.batch_size = batch_size
+        self.checkpoint_key = checkpoint_key
+        self.errors_path = errors_path
+        self.report = report or (lambda message: None)
+        self.imported = 0
+        self.invalid = 0
+        self.rows_done = 0
+        self.images_queued = 0
+        # المستورد قبل الاستكمال (من الـ checkpoint)، عشان السرعة تتحسب للتشغيل الحالي بس
+        self.resumed_imported = 0
+        self.resumed_rows = 0
+
+    # ------------------------------------------------------------------
+    # checkpoint
+    # ------------------------------------------------------------------
+
+    def load_checkpoint(self):
+        if not self.checkpoint_key:
+            return
+        state = ImportCheckpoint.objects.filter(key=self.checkpoint_key).first()
+        if state is None:
+            return
+        self.rows_done = state.rows_done
+        self.imported = state.imported
+        self.invalid = state.invalid
+        self.images_queued = state.images_queued
+        self.resumed_imported = self.imported
+        self.resumed_rows = self.rows_done
+
+    def save_checkpoint(self):
+        if not self.checkpoint_key:
+            return
+        ImportCheckpoint.objects.update_or_create(key=self.checkpoint_key, defaults={
+            'rows_done': self.rows_done,
+            'imported': self.imported,
+            'invalid': self.invalid,
+            'images_queued': self.images_queued,
+        })
+
+    # ------------------------------------------------------------------
+    # الاستيراد
+    # ------------------------------------------------------------------
+
+    def run(self, rows):
+        self.load_checkpoint()
+        resumed_from = self.resumed_rows
+        started = time.monotonic()
+        errors = open(self.errors_path, 'a', encoding='utf-8') if self.errors_path else None
+        try:
+            batch = []
+            for number, row in rows:
+                if number <= resumed_from:
+                    continue
+                batch.append((number, row))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch, errors)
+                    self.report_progress(started, resumed_from)
+                    batch = []
+            if batch:
+                self.import_batch(batch, errors)
+                self.report_progress(started, resumed_from)
+        finally:
+            if errors:
+                errors.close()
+        return time.monotonic() - started
+
+    def report_progress(self, started, resumed_from):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        rate = (self.rows_done - resumed_from) / elapsed
+        self.report(
+            f"{self.rows_done} rows: {self.imported} imported, {self.invalid} invalid "
+            f"({rate:.0f} rows/s)"
+        )
+
+    def _owners(self, batch):
+        usernames = {
+            str(row['owner']).strip() for _number, row in batch if not isinstance(row, InvalidRow) and row.get('owner')
+        }
+        return {user.username: user for user in User.objects.filter(username__in=usernames)}
+
+    def import_batch(self, batch, errors=None):
+        owners = self._owners(batch)
+        valid = []
+        rejected = []
+        for number, row in batch:
+            if isinstance(row, InvalidRow):
+                rejected.append({'line': number, 'errors': row.errors, 'text': row.text})
+                continue
+            username = str(row.get('owner') or '').strip()
+            owner = owners.get(username) if username else self.default_owner
+            form = PropertyForm(data=form_data(row))
+            problems = None
+            if owner is None:
+                problems = {'owner': [{'message': 'مالك غير معروف', 'code': 'owner'}]}
+            elif not form.is_valid():
+                problems = form.errors.get_json_data()
+            if problems:
+                rejected.append({'line': number, 'errors': problems})
+                continue
+            prop = form.save(commit=False)
+            prop.owner = owner
+            prop.update_normalized_fields()
+            valid.append((prop, _split(row.get('features'), ','), _split(row.get('images'), '|')))
+
+        properties = [prop for prop, _features, _images in valid]
+        with transaction.atomic():
+            if properties:
+                allocate_slugs(properties)
+                Property.objects.bulk_create(properties)
+
+                features = resolve_features(name for _prop, names, _images in valid for name in names)
+                attach_features(
+                    (prop.pk, features[feature_key(name)])
+                    for prop, names, _images in valid for name in names if feature_key(name) in features
+                )
+
+                search.index_properties(properties)
+                ListingCard.objects.bulk_create([cards.build_card(prop) for prop in properties])
+                clusters.add_points(
+                    (prop.latitude, prop.longitude) for prop in properties
+                    if prop.is_published and prop.latitude is not None and prop.longitude is not None
+                )
+
+            # التقدم بيتحفظ مع الدفعة نفسها: يا الاتنين اتحفظوا يا ولا واحد
+            self.rows_done = batch[-1][0]
+            self.imported += len(properties)
+            self.invalid += len(rejected)
+            self.images_queued += sum(len(images) for _prop, _features, images in valid)
+            self.save_checkpoint()
+
+        # الصور وملف الأخطاء بعد الـ commit، فالدفعة مابتتعادش ومفيش مهام صور مكررة
+        for prop, _features, images in valid:
+            for index, source in enumerate(images):
+                enqueue_image(prop.pk, source, is_main=index == 0)
+        if errors:
+            for record in rejected:
+                errors.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        if properties:
+            result_cache.invalidate(cities=[prop.city_normalized for prop in properties])
+            facets.invalidate()
+            gazetteer.invalidate()
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from properties import cards
+from properties.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = "Precompute the named delivery URLs (card, gallery, thumbnail, og) of property images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--force', action='store_true', help="Recompute URLs that are already up to date")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        updated = 0
+        property_ids = set()
+        last_pk = 0
+        while True:
+            batch = list(
+                PropertyImage.objects.filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', 'property_id', 'image', 'delivery_urls')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            stale = [image for image in batch if image.image and (options['force'] or image.delivery_urls_stale())]
+            for image in stale:
+                image.refresh_delivery_urls()
+            PropertyImage.objects.bulk_update(stale, ['delivery_urls'])
+            updated += len(stale)
+            property_ids.update(image.property_id for image in stale)
+            self.stdout.write(f"{updated} images updated")
+
+        # الكروت بتخزن رابط الغلاف، فبتتحدث للعقارات اللي صورها اتغيرت
+        for property_id in property_ids:
+            cards.refresh_cover(property_id)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Built delivery URLs for {updated} images ({len(property_ids)} listing covers refreshed) in {elapsed:.2f}s"
+        ))
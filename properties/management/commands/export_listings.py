@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.exporter import STREAMS, ExportError, export_queryset, stream_export
+
+
+class Command(BaseCommand):
+    help = "Export listings as CSV, JSONL or Parquet, streaming rows in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Output file path")
+        parser.add_argument('--format', choices=sorted(STREAMS), default=None,
+                            help="Defaults to the output file extension")
+        parser.add_argument('--owner', help="Only export this user's listings")
+        parser.add_argument('--filter', action='append', default=[], metavar='NAME=VALUE',
+                            help="Listing filter, same names as the listings page (repeatable)")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or output.rsplit('.', 1)[-1].lower()
+
+        params = {}
+        for item in options['filter']:
+            name, separator, value = item.partition('=')
+            if not separator:
+                raise CommandError(f"Invalid filter {item!r}, expected NAME=VALUE")
+            params[name.strip()] = value.strip()
+
+        owner = None
+        if options['owner']:
+            User = get_user_model()
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown owner: {options['owner']}")
+
+        started = time.monotonic()
+        exported = [0]
+
+        def progress(count):
+            exported[0] = count
+            rate = count / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"{count} listings ({rate:.0f} rows/s)")
+
+        try:
+            content = stream_export(export_queryset(params, owner=owner), fmt, progress=progress)
+            if fmt == 'parquet':
+                handle = open(output, 'wb')
+            else:
+                handle = open(output, 'w', encoding='utf-8', newline='')
+            with handle:
+                for chunk in content:
+                    handle.write(chunk)
+        except ExportError as error:
+            raise CommandError(str(error))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Exported {exported[0]} listings to {output} in {elapsed:.2f}s"))
@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from properties import dedupe
+from properties.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = "Compute perceptual hashes for property images that have none, optionally merging duplicates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Images hashed in parallel")
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--rehash', action='store_true', help="Recompute hashes that already exist")
+        parser.add_argument('--merge', action='store_true',
+                            help="Point near-duplicate images at the oldest copy's stored asset")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        queryset = PropertyImage.objects.order_by('pk')
+        if not options['rehash']:
+            queryset = queryset.filter(phash__isnull=True)
+
+        hashed = unreadable = 0
+        last_pk = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(queryset.filter(pk__gt=last_pk)[:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                sources = [dedupe.image_source(image) for image in batch]
+                for image, value in zip(batch, executor.map(dedupe.hash_source, sources)):
+                    if value is None:
+                        unreadable += 1
+                        continue
+                    for name, field_value in dedupe.hash_fields(value).items():
+                        setattr(image, name, field_value)
+                    hashed += 1
+                PropertyImage.objects.bulk_update(
+                    [image for image in batch if image.phash is not None], ['phash', *dedupe.BAND_FIELDS]
+                )
+                self.stdout.write(f"{hashed} hashed, {unreadable} unreadable")
+
+        merged = self.merge_duplicates() if options['merge'] else 0
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Hashed {hashed} images ({unreadable} unreadable, {merged} merged) in {elapsed:.2f}s"
+        ))
+
+    def merge_duplicates(self):
+        merged = 0
+        images = PropertyImage.objects.filter(phash__isnull=False).select_related('property').order_by('pk')
+        for image in images.iterator():
+            original = dedupe.find_duplicate(
+                dedupe.to_unsigned(image.phash), image.property.owner_id,
+                size=(image.width, image.height) if image.width and image.height else None, before=image.pk,
+            )
+            if original is not None and str(original.image) != str(image.image):
+                image.image = original.image
+                # save (مش update) عشان كارت العقار يتحدث لو دي صورة الغلاف
+                image.save(update_fields=['image'])
+                merged += 1
+        return merged
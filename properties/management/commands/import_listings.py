@@ -0,0 +1,56 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.importer import ListingImporter, iter_rows
+from properties.models import ImportCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Stream listings from a CSV or JSONL file into the database in validated batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help="Input format (default: from the file extension)")
+        parser.add_argument('--owner', help="Username used for rows without an 'owner' column")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--checkpoint', default=None,
+                            help="Name of the saved progress used to resume (default: the file's absolute path)")
+        parser.add_argument('--errors', default=None,
+                            help="File for rejected rows (default: <path>.errors.jsonl)")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        owner = None
+        if options['owner']:
+            try:
+                owner = get_user_model().objects.get(username=options['owner'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Unknown owner: {options['owner']}")
+
+        checkpoint = (options['checkpoint'] or os.path.abspath(path))[:255]
+        if options['restart']:
+            ImportCheckpoint.objects.filter(key=checkpoint).delete()
+
+        importer = ListingImporter(
+            owner=owner,
+            batch_size=options['batch_size'],
+            checkpoint_key=checkpoint,
+            errors_path=options['errors'] or f"{path}.errors.jsonl",
+            report=self.stdout.write,
+        )
+        try:
+            elapsed = importer.run(iter_rows(path, options['format']))
+        except (OSError, ValueError) as error:
+            raise CommandError(f"{error} (resume with the same command; progress is saved as {checkpoint!r})")
+
+        imported_now = importer.imported - importer.resumed_imported
+        rate = imported_now / elapsed if elapsed else 0
+        resumed = f", resumed after row {importer.resumed_rows}" if importer.resumed_rows else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.imported} listings{resumed} ({importer.invalid} invalid, "
+            f"{importer.images_queued} images queued) in {elapsed:.2f}s ({rate:.0f} listings/s)"
+        ))
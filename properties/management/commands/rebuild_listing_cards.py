@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from properties.cards import rebuild_cards
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ListingCard read model from Property, PropertyImage and FavoriteProperty"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = rebuild_cards(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} listing cards in {elapsed:.2f}s"))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from properties.clusters import rebuild_clusters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed map marker clusters (MapCluster) from published listing cards"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = rebuild_clusters(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Clustered {total} listings in {elapsed:.2f}s"))
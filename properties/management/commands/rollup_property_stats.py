@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from properties.rollups import rollup_all
+
+
+class Command(BaseCommand):
+    help = "Aggregate new views, favorites and inquiries into PropertyDailyStats (incremental, watermark based)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--loop', action='store_true', help="Keep running and roll up every --interval seconds")
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            processed = rollup_all(batch_size=options['batch_size'])
+            elapsed = time.monotonic() - started
+            summary = ', '.join(f"{source}: {count}" for source, count in processed.items())
+            self.stdout.write(self.style.SUCCESS(f"Rolled up {summary} in {elapsed:.2f}s"))
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from properties.image_queue import drain, requeue_stale
+
+
+class Command(BaseCommand):
+    help = "Upload the property images waiting in the on-disk image queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--requeue-stale', type=int, default=None, metavar='SECONDS',
+                            help="First move jobs stuck in uploading/ for longer than this back to the queue")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['requeue_stale'] is not None:
+            requeued = requeue_stale(max_age=options['requeue_stale'])
+            self.stdout.write(f"Requeued {requeued} stale upload jobs")
+        done, failed = drain(limit=options['limit'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Uploaded {done} images ({failed} failed) in {elapsed:.2f}s"))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:00
+
+from django.db import migrations
+
+from properties import search
+
+
+def create_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if not search.is_supported(conn):
+        return
+    search.create_index(conn)
+    Property = apps.get_model('properties', 'Property')
+    search.rebuild_index(Property.objects.using(conn.alias).all(), conn)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_alter_propertyimage_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
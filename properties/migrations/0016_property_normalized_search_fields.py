@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+from properties import search
+from properties.normalization import normalize_arabic
+
+NORMALIZED_FIELDS = {
+    'title': 'title_normalized',
+    'city': 'city_normalized',
+    'district': 'district_normalized',
+    'location_address': 'address_normalized',
+}
+
+
+def populate_normalized_fields(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    db_alias = schema_editor.connection.alias
+    properties = list(Property.objects.using(db_alias).all())
+    for prop in properties:
+        for source, target in NORMALIZED_FIELDS.items():
+            setattr(prop, target, normalize_arabic(getattr(prop, source)))
+    Property.objects.using(db_alias).bulk_update(properties, list(NORMALIZED_FIELDS.values()), batch_size=500)
+
+    # إعادة بناء فهرس FTS بالنص الموحد
+    search.rebuild_index(Property.objects.using(db_alias).all(), schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0015_property_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='address_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='city_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='district_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='title_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(populate_normalized_fields, migrations.RunPython.noop),
+    ]
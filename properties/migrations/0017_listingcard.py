@@ -0,0 +1,81 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_listing_cards(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    PropertyImage = apps.get_model('properties', 'PropertyImage')
+    ListingCard = apps.get_model('properties', 'ListingCard')
+    db_alias = schema_editor.connection.alias
+
+    covers = {}
+    for image in PropertyImage.objects.using(db_alias).order_by('property_id', '-is_main', 'id'):
+        covers.setdefault(image.property_id, image)
+
+    cards = []
+    properties = Property.objects.using(db_alias).annotate(
+        card_views_count=Count('viewed_by', distinct=True),
+        card_favorites_count=Count('favoriteproperty', distinct=True),
+    )
+    for prop in properties:
+        cover = covers.get(prop.pk)
+        cards.append(ListingCard(
+            property_id=prop.pk, owner_id=prop.owner_id, slug=prop.slug, title=prop.title,
+            property_type=prop.property_type, status=prop.status, price=prop.price, area=prop.area,
+            bedrooms=prop.bedrooms, bathrooms=prop.bathrooms, location_address=prop.location_address,
+            city=prop.city, district=prop.district, city_normalized=prop.city_normalized,
+            district_normalized=prop.district_normalized,
+            cover_image_url=cover.image.url if cover and cover.image else '',
+            views_count=prop.card_views_count, favorites_count=prop.card_favorites_count,
+            is_published=prop.is_published, published_date=prop.published_date,
+            updated_date=prop.updated_date,
+        ))
+    ListingCard.objects.using(db_alias).bulk_create(cards, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0016_property_normalized_search_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingCard',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='properties.property')),
+                ('slug', models.SlugField(max_length=255)),
+                ('title', models.CharField(max_length=200)),
+                ('property_type', models.CharField(choices=[('apartment', 'شقة'), ('villa', 'فيلا'), ('land', 'أرض'), ('commercial', 'محل/مكتب'), ('chalet', 'شاليه'), ('other', 'أخرى')], max_length=50)),
+                ('status', models.CharField(choices=[('for_sale', 'للبيع'), ('for_rent', 'للإيجار')], max_length=50)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('area', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('bedrooms', models.IntegerField(default=0)),
+                ('bathrooms', models.IntegerField(default=0)),
+                ('location_address', models.CharField(max_length=255)),
+                ('city', models.CharField(max_length=100)),
+                ('district', models.CharField(blank=True, max_length=100, null=True)),
+                ('city_normalized', models.CharField(blank=True, db_index=True, default='', max_length=100)),
+                ('district_normalized', models.CharField(blank=True, db_index=True, default='', max_length=100)),
+                ('cover_image_url', models.URLField(blank=True, default='', max_length=500)),
+                ('views_count', models.PositiveIntegerField(default=0)),
+                ('favorites_count', models.PositiveIntegerField(default=0)),
+                ('is_published', models.BooleanField(default=True)),
+                ('published_date', models.DateTimeField()),
+                ('updated_date', models.DateTimeField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'كارت عقار',
+                'verbose_name_plural': 'كروت العقارات',
+                'ordering': ['-published_date'],
+                'indexes': [models.Index(fields=['is_published', '-published_date'], name='card_published_idx'), models.Index(fields=['owner', 'is_published', '-published_date'], name='card_owner_idx')],
+            },
+        ),
+        migrations.RunPython(populate_listing_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+from properties.geo import encode_geohash
+
+
+def populate_card_locations(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    ListingCard = apps.get_model('properties', 'ListingCard')
+    db_alias = schema_editor.connection.alias
+    locations = dict(
+        (pk, (latitude, longitude))
+        for pk, latitude, longitude in Property.objects.using(db_alias)
+        .exclude(latitude=None).exclude(longitude=None)
+        .values_list('pk', 'latitude', 'longitude')
+    )
+    cards = list(ListingCard.objects.using(db_alias).filter(pk__in=list(locations)))
+    for card in cards:
+        latitude, longitude = locations[card.pk]
+        card.latitude, card.longitude = float(latitude), float(longitude)
+        card.geohash = encode_geohash(latitude, longitude)
+    ListingCard.objects.using(db_alias).bulk_update(cards, ['latitude', 'longitude', 'geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0017_listingcard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listingcard',
+            name='geohash',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='listingcard',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listingcard',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listingcard',
+            index=models.Index(fields=['is_published', 'geohash'], name='card_geohash_idx'),
+        ),
+        migrations.RunPython(populate_card_locations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:15
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from properties.clusters import point_cells
+
+
+def populate_map_clusters(apps, schema_editor):
+    ListingCard = apps.get_model('properties', 'ListingCard')
+    MapCluster = apps.get_model('properties', 'MapCluster')
+    db_alias = schema_editor.connection.alias
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    points = (
+        ListingCard.objects.using(db_alias).filter(is_published=True)
+        .exclude(latitude=None).exclude(longitude=None)
+        .values_list('latitude', 'longitude')
+    )
+    for latitude, longitude in points:
+        for cell in point_cells(latitude, longitude):
+            totals[cell][0] += 1
+            totals[cell][1] += latitude
+            totals[cell][2] += longitude
+    MapCluster.objects.using(db_alias).bulk_create([
+        MapCluster(zoom=zoom, cell_x=cell_x, cell_y=cell_y, count=count,
+                   latitude_sum=latitude_sum, longitude_sum=longitude_sum)
+        for (zoom, cell_x, cell_y), (count, latitude_sum, longitude_sum) in totals.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0018_listingcard_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MapCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('cell_x', models.PositiveIntegerField()),
+                ('cell_y', models.PositiveIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'تجمع خريطة',
+                'verbose_name_plural': 'تجمعات الخريطة',
+                'constraints': [models.UniqueConstraint(fields=('zoom', 'cell_x', 'cell_y'), name='map_cluster_cell_unique')],
+            },
+        ),
+        migrations.RunPython(populate_map_clusters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def copy_viewed_by(apps, schema_editor):
+    """نقل المشاهدات القديمة من viewed_by لجدول PropertyView، وحساب views_count."""
+    Property = apps.get_model('properties', 'Property')
+    PropertyView = apps.get_model('properties', 'PropertyView')
+    ListingCard = apps.get_model('properties', 'ListingCard')
+    db_alias = schema_editor.connection.alias
+    viewed_by = Property._meta.get_field('viewed_by')
+    through = viewed_by.remote_field.through
+    user_column = viewed_by.m2m_reverse_field_name()
+
+    PropertyView.objects.using(db_alias).bulk_create(
+        [
+            PropertyView(property_id=property_id, user_id=user_id)
+            for property_id, user_id in through.objects.using(db_alias).values_list('property_id', f'{user_column}_id')
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    counts = (
+        PropertyView.objects.using(db_alias).values('property_id')
+        .annotate(total=Count('pk')).values_list('property_id', 'total')
+    )
+    for property_id, total in counts:
+        Property.objects.using(db_alias).filter(pk=property_id).update(views_count=total)
+        ListingCard.objects.using(db_alias).filter(pk=property_id).update(views_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0019_mapcluster'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد المشاهدات'),
+        ),
+        migrations.CreateModel(
+            name='PropertyView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('viewed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='وقت المشاهدة')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='views', to='properties.property', verbose_name='العقار')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='property_views', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'مشاهدة عقار',
+                'verbose_name_plural': 'مشاهدات العقارات',
+                'constraints': [models.UniqueConstraint(fields=('property', 'user'), name='property_view_unique')],
+            },
+        ),
+        migrations.RunPython(copy_viewed_by, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='property',
+            name='viewed_by',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0020_property_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyDailyVisitors',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('sketch', models.BinaryField(verbose_name='HyperLogLog sketch')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_visitors', to='properties.property', verbose_name='العقار')),
+            ],
+            options={
+                'verbose_name': 'زوار عقار في يوم',
+                'verbose_name_plural': 'زوار العقارات اليومي',
+                'constraints': [models.UniqueConstraint(fields=('property', 'day'), name='property_daily_visitors_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0021_property_daily_visitors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PropertyDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='المشاهدات')),
+                ('favorites', models.PositiveIntegerField(default=0, verbose_name='الإضافات للمفضلة')),
+                ('inquiries', models.PositiveIntegerField(default=0, verbose_name='الاستفسارات')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='properties.property', verbose_name='العقار')),
+            ],
+            options={
+                'verbose_name': 'إحصائيات عقار يومية',
+                'verbose_name_plural': 'إحصائيات العقارات اليومية',
+                'constraints': [models.UniqueConstraint(fields=('property', 'day'), name='property_daily_stats_unique')],
+            },
+        ),
+    ]
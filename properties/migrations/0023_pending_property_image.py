@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0022_property_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingPropertyImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(max_length=32, unique=True)),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='اسم الملف')),
+                ('is_main', models.BooleanField(default=False, verbose_name='الصورة الرئيسية')),
+                ('status', models.CharField(choices=[('pending', 'جاري الرفع'), ('failed', 'فشل الرفع')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('error', models.TextField(blank=True, verbose_name='سبب الفشل')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_images', to='properties.property', verbose_name='العقار')),
+            ],
+            options={
+                'verbose_name': 'صورة قيد الرفع',
+                'verbose_name_plural': 'صور قيد الرفع',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+from properties import image_storage
+
+
+def populate_delivery_urls(apps, schema_editor):
+    """روابط العرض للصور الموجودة (التمبلت بيقرأ delivery_urls على طول)."""
+    PropertyImage = apps.get_model('properties', 'PropertyImage')
+    db_alias = schema_editor.connection.alias
+    field = PropertyImage._meta.get_field('image')
+
+    batch = []
+    for image in PropertyImage.objects.using(db_alias).exclude(image='').only('pk', 'image').iterator():
+        image.delivery_urls = image_storage.delivery_urls(field.to_python(image.image))
+        batch.append(image)
+        if len(batch) >= 500:
+            PropertyImage.objects.using(db_alias).bulk_update(batch, ['delivery_urls'])
+            batch = []
+    PropertyImage.objects.using(db_alias).bulk_update(batch, ['delivery_urls'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0024_property_image_phash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyimage',
+            name='delivery_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(populate_delivery_urls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+from properties.normalization import normalize_arabic
+
+
+def populate_name_normalized(apps, schema_editor):
+    """
+    توحيد أسماء المميزات، والمميزات اللي اسمها الموحد واحد (أمن / امن) بتتدمج في الأقدم
+    قبل ما العمود يبقى unique: العقارات بتتربط بالأقدم والباقي بيتحذف.
+    """
+    Feature = apps.get_model('properties', 'Feature')
+    Through = apps.get_model('properties', 'Property').features.through
+    db_alias = schema_editor.connection.alias
+
+    kept = {}
+    for feature in Feature.objects.using(db_alias).order_by('pk'):
+        key = normalize_arabic(feature.name)[:100]
+        original = kept.get(key)
+        if original is None:
+            feature.name_normalized = key
+            feature.save(update_fields=['name_normalized'])
+            kept[key] = feature
+            continue
+        property_ids = Through.objects.using(db_alias).filter(feature_id=feature.pk).values_list('property_id', flat=True)
+        Through.objects.using(db_alias).bulk_create(
+            [Through(property_id=property_id, feature_id=original.pk) for property_id in property_ids],
+            ignore_conflicts=True,
+        )
+        feature.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0026_image_display_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feature',
+            name='name_normalized',
+            field=models.CharField(default='', editable=False, max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_name_normalized, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='feature',
+            name='name_normalized',
+            field=models.CharField(editable=False, max_length=100, unique=True),
+        ),
+    ]
@@ -3,9 +3,18 @@
 from django.db import models
 from django.contrib.auth import get_user_model # عشان نجيب نموذج المستخدم الافتراضي
 from django.utils import timezone # عشان نستخدم الوقت الحالي في التاريخ
-from django.template.defaultfilters import slugify # تأكد من استيراد slugify
 from django.urls import reverse # تأكد من استيراد reverse
 import uuid
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from .normalization import normalize_arabic
+from .slugs import allocate_slug
+from django.core.files.uploadedfile import UploadedFile
+from . import image_storage
+from .image_storage import DELIVERY_URLS_VERSION, backend_for
+
+# عدد محاولات الحفظ لو الـ slug اتاخد من عقار تاني في نفس اللحظة
+SLUG_SAVE_ATTEMPTS = 3
 
 User = get_user_model() # ده بيجيب نموذج المستخدم اللي Django بيستخدمه (سواء الافتراضي أو المخصص)
 
@@ -57,65 +66,127 @@ class Property(models.Model):
     # حقل slug محسن لإنشاء روابط لطيفة (SEO-friendly URLs)
     slug = models.SlugField(unique=True, max_length=255, blank=True, verbose_name='الرابط المخصص')
 
-    # 🌟🌟 الحقل الجديد لتتبع المستخدمين الذين شاهدوا العقار 🌟🌟
-    viewed_by = models.ManyToManyField(User, related_name='viewed_properties', blank=True, verbose_name='شاهده المستخدمون')
+    # نسخ موحدة (normalized) من حقول البحث، بتتحسب تلقائياً في save()
+    # عشان البحث بالمساواة/البادئة يستخدم الفهرس بدل icontains/iexact
+    title_normalized = models.CharField(max_length=200, blank=True, default='', editable=False, db_index=True)
+    city_normalized = models.CharField(max_length=100, blank=True, default='', editable=False, db_index=True)
+    district_normalized = models.CharField(max_length=100, blank=True, default='', editable=False, db_index=True)
+    address_normalized = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True)
 
-    # 🌟🌟 لا داعي لحقل views_count كحقل منفصل بعد الآن 🌟🌟
-    # views_count = models.PositiveIntegerField(default=0, verbose_name='عدد المشاهدات')
+    # عدد المستخدمين اللي شافوا العقار (من جدول PropertyView)، بيتحدث على دفعات
+    # من properties/view_counter.py بـ UPDATE مباشر، فمحدش بيكتبه من save()
+    views_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد المشاهدات')
 
     def __str__(self):
         return self.title
 
     def generate_unique_slug(self):
         """
-        إنشاء slug فريد يحتوي على معلومات مفيدة للـ SEO
+        إنشاء slug فريد يحتوي على معلومات مفيدة للـ SEO (استعلام واحد، راجع properties/slugs.py)
         """
-        property_type_map = {
-            'apartment': 'apartment',
-            'villa': 'villa',
-            'land': 'land',
-            'commercial': 'commercial',
-            'chalet': 'chalet',
-            'other': 'property'
-        }
-        
-        status_map = {
-            'for_sale': 'for-sale',
-            'for_rent': 'for-rent'
-        }
-        
-        base_slug = slugify(self.title)
-        if not base_slug:
-            # استخدام المدينة ونوع العقار والسعر لتوليد slug أساسي إذا كان العنوان فارغًا
-            base_slug = f"{property_type_map.get(self.property_type, 'property')}-{status_map.get(self.status, 'property')}-{slugify(self.city) if self.city else 'egypt'}-{int(self.price)}"
-        
-        slug_parts = [
-            base_slug,
-            property_type_map.get(self.property_type, 'property'),
-            slugify(self.city) if self.city else 'egypt',
-            f"{int(self.area)}m" if self.area else None
-        ]
-        
-        slug_parts = [part for part in slug_parts if part]
-        base_final_slug = '-'.join(slug_parts)
-        
-        slug = base_final_slug
-        counter = 1
-        
-        while Property.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-            slug = f"{base_final_slug}-{counter}"
-            counter += 1
-            
-        return slug
+        return allocate_slug(self)
+
+    # تتبع الحقول المتغيرة: القيم زي ما اتقرت من قاعدة البيانات، عشان save() مايحتاجش
+    # يجيب العقار تاني، ويكتب الأعمدة اللي اتغيرت بس
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # القيم اللي اتقرت تاني هي المرجع الجديد للمقارنة
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is not None:
+            loaded.update(
+                (field.attname, getattr(self, field.attname)) for field in self._meta.concrete_fields
+                if field.attname in self.__dict__ and (fields is None or field.attname in fields or field.name in fields)
+            )
+
+    def get_dirty_fields(self):
+        """{اسم الحقل: القيمة القديمة} للحقول اللي اتغيرت من ساعة القراءة من قاعدة البيانات."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        dirty = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in loaded:
+                if getattr(self, field.attname) != loaded[field.attname]:
+                    dirty[field.name] = loaded[field.attname]
+            elif field.attname in self.__dict__:
+                # حقل ماتقراش (.only()/.defer()) واتحطت له قيمة: قيمته القديمة مش معروفة فبيتكتب
+                dirty[field.name] = None
+        return dirty
+
+    # الحقول الأصلية ونسخها الموحدة
+    NORMALIZED_FIELDS = {
+        'title': 'title_normalized',
+        'city': 'city_normalized',
+        'district': 'district_normalized',
+        'location_address': 'address_normalized',
+    }
+
+    # عدادات بتتحدث بـ UPDATE مباشر من برة الموديل، فالحفظ العادي لعقار موجود مايكتبش فوقها
+    COUNTER_FIELDS = ('views_count',)
+
+    def update_normalized_fields(self):
+        for source, target in self.NORMALIZED_FIELDS.items():
+            setattr(self, target, normalize_arabic(getattr(self, source)))
 
     # دالة save() المدمجة والمصححة
     def save(self, *args, **kwargs):
+        adding = self._state.adding
+        loaded = getattr(self, '_loaded_values', None)
+
         # جزء الـ slug: إنشاء/تحديث الـ slug فقط لو مش موجود أو لو العنوان اتغير
-        if not self.slug or (self.pk and Property.objects.get(pk=self.pk).title != self.title):
+        # (العنوان القديم من القيم المحفوظة وقت القراءة، من غير استعلام إضافي)
+        if not self.slug:
+            title_changed = True
+        elif adding or not self.pk:
+            title_changed = False
+        elif loaded is not None and 'title' in loaded:
+            title_changed = loaded['title'] != self.title
+        else:
+            title_changed = Property.objects.filter(pk=self.pk).values_list('title', flat=True).first() != self.title
+        slug_generated = title_changed
+        if slug_generated:
             self.slug = self.generate_unique_slug()
-            
+
+        self.update_normalized_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            update_fields.update(
+                target for source, target in self.NORMALIZED_FIELDS.items() if source in update_fields
+            )
+            if slug_generated:
+                update_fields.add('slug')
+            kwargs['update_fields'] = update_fields
+        elif not adding and not kwargs.get('force_insert'):
+            # الأعمدة اللي اتغيرت بس (ولو مش معروف، كل الأعمدة)، ومن غير العدادات
+            dirty = self.get_dirty_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                and (dirty is None or field.name in dirty or field.name == 'updated_date')
+            ]
+
         # استدعاء دالة save الأصلية للموديل
-        super().save(*args, **kwargs)
+        # لو عقارين اتضافوا في نفس اللحظة بنفس الـ slug، قيد التفرد بيرفض التاني فبنخصص رقم جديد
+        for attempt in range(SLUG_SAVE_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                break
+            except IntegrityError:
+                if not slug_generated or attempt == SLUG_SAVE_ATTEMPTS - 1 or not (
+                    Property.objects.filter(slug=self.slug).exclude(pk=self.pk).exists()
+                ):
+                    raise
+                self.slug = self.generate_unique_slug()
+
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
 
     # دالة للحصول على رابط العقار (موصى بها للـ SEO)
     def get_absolute_url(self):
@@ -127,14 +198,6 @@ class Property(models.Model):
         # تأكد إن عندك URL pattern باسم 'property_detail_by_id' بيقبل 'pk'
         return reverse('properties:property_detail_by_id', kwargs={'pk': self.pk})
 
-    @property
-    def views_count(self):
-        """
-        خاصية لحساب عدد المشاهدات بناءً على عدد المستخدمين في حقل viewed_by.
-        هذا أفضل من حقل views_count منفصل لأنه يضمن الدقة دائمًا.
-        """
-        return self.viewed_by.count()
-
     class Meta:
         verbose_name = 'عقار'
         verbose_name_plural = 'عقارات'
@@ -143,44 +206,150 @@ class Property(models.Model):
 from cloudinary.models import CloudinaryField  # 👈 هذا السطر الجديد والمهم
 from django.db import models
 from cloudinary.models import CloudinaryField
-from cloudinary.utils import cloudinary_url
+
+
+def _image_key(value):
+    """قيمة حقل الصورة كنص للمقارنة (None لو ملف لسه مترفعش)."""
+    if not value or isinstance(value, UploadedFile):
+        return None
+    return value.get_prep_value() if hasattr(value, 'get_prep_value') else str(value)
+
 
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images', verbose_name='العقار')
     image = CloudinaryField('صورة')
     is_main = models.BooleanField(default=False, verbose_name='الصورة الرئيسية')
+    # perceptual hash (dHash) للصورة وأجزاءه الأربعة للبحث بالمسافة (properties/dedupe.py)
+    phash = models.BigIntegerField(null=True, blank=True, editable=False)
+    phash_band_0 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    phash_band_1 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    phash_band_2 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    phash_band_3 = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # روابط العرض المحسوبة مرة واحدة (card / gallery / thumbnail / og / original / srcset)
+    # وبتتحسب تاني بس لما الصورة تتغير (image_storage.delivery_urls)
+    delivery_urls = models.JSONField(default=dict, blank=True, editable=False)
+    # بيانات العرض المحسوبة وقت الرفع (properties/image_metadata.py): المقاس واللون الغالب وصورة LQIP
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    dominant_color = models.CharField(max_length=7, blank=True, default='', editable=False)
+    placeholder = models.TextField(blank=True, default='', editable=False)
 
     def __str__(self):
         return f"صورة لـ {self.property.title}"
 
-    def get_optimized_url(self):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'image' in field_names:
+            instance._loaded_image = _image_key(instance.image)
+        return instance
+
+    def delivery_urls_stale(self):
+        """هل الروابط المحفوظة محتاجة تتحسب (صورة جديدة أو اتغيرت أو التحويلات اتغيرت)؟"""
+        if not self.image or isinstance(self.image, UploadedFile):
+            return False
+        return (
+            self.delivery_urls.get('v') != DELIVERY_URLS_VERSION
+            or _image_key(self.image) != getattr(self, '_loaded_image', None)
+        )
+
+    def refresh_delivery_urls(self):
+        resource = self._meta.get_field('image').to_python(self.image)
+        self.delivery_urls = image_storage.delivery_urls(resource)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.delivery_urls_stale():
+            self.refresh_delivery_urls()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'delivery_urls'}
+        super().save(*args, **kwargs)
+        # ملف اترفع من الأدمن: قيمة الحقل بتتعرف بعد الرفع (جوه save)
+        if not self.delivery_urls and self.image and not isinstance(self.image, UploadedFile):
+            self.refresh_delivery_urls()
+            type(self).objects.filter(pk=self.pk).update(delivery_urls=self.delivery_urls)
+        self._loaded_image = _image_key(self.image)
+
+    def get_delivery_url(self, name):
+        """رابط تحويل مسمى من المحفوظ، ولو الصورة لسه ماتحسبتش روابطها بيتحسب."""
+        return self.delivery_urls.get(name) or image_storage.delivery_urls(self.image)[name]
+
+    # (الحقل اسمه property فمينفعش @property هنا، والتمبلت بينادي الدوال من غير أقواس)
+    def get_image_url(self):
+        """رابط الصورة الأصلية (Cloudinary أو التخزين المحلي حسب مكان الصورة)."""
+        return backend_for(self.image).url(self.image)
+
+    def get_optimized_url(self, width=400):
         """
-        تُعيد رابطًا آمنًا ومُحسنًا للصورة من Cloudinary.
+        تُعيد رابطًا مُحسنًا للصورة (عرض 400 بكسل افتراضيًا): من Cloudinary بـ crop/format/quality
+        تلقائي، أو نسخة WebP المحلية.
         """
         if self.image:
-            # هنا يتم تطبيق التحسينات:
-            # - c_fill: لملء المساحة المحددة.
-            # - q_auto: لضبط جودة الصورة تلقائيًا.
-            # - w_400: لضبط العرض إلى 400 بكسل.
-            'secure=True' 
-            return cloudinary_url(self.image.public_id,
-                                  crop="fill",
-                                  format="auto",
-                                  quality="auto",
-                                  width=400,
-                                  secure=True)[0]
+            return backend_for(self.image).optimized_url(self.image, width)
         return None
 
+    def get_srcset(self, fmt=None):
+        """قيمة srcset بكل العروض الثابتة (derivatives.WIDTHS)."""
+        if not self.image:
+            return ''
+        backend = backend_for(self.image)
+        return backend.srcset(self.image, fmt) if fmt else backend.srcset(self.image)
+
     class Meta:
         verbose_name = 'صورة عقار'
         verbose_name_plural = 'صور عقارات'
+        indexes = [
+            models.Index(fields=['phash_band_0'], name='image_phash_band0_idx'),
+            models.Index(fields=['phash_band_1'], name='image_phash_band1_idx'),
+            models.Index(fields=['phash_band_2'], name='image_phash_band2_idx'),
+            models.Index(fields=['phash_band_3'], name='image_phash_band3_idx'),
+        ]
+
+class PendingPropertyImage(models.Model):
+    """
+    صورة اتبعتت من فورم العقار ولسه بتترفع على Cloudinary في الخلفية (properties/image_queue.py).
+    الصف بيتمسح لما الرفع ينجح (وبيتعمل PropertyImage مكانه)، ولو فشل بيفضل بحالة failed وسبب الفشل.
+    """
+    PENDING = 'pending'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'جاري الرفع'),
+        (FAILED, 'فشل الرفع'),
+    )
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='pending_images', verbose_name='العقار')
+    job_id = models.CharField(max_length=32, unique=True)
+    file_name = models.CharField(max_length=255, blank=True, verbose_name='اسم الملف')
+    is_main = models.BooleanField(default=False, verbose_name='الصورة الرئيسية')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name='الحالة')
+    error = models.TextField(blank=True, verbose_name='سبب الفشل')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = 'صورة قيد الرفع'
+        verbose_name_plural = 'صور قيد الرفع'
+
 
 class Feature(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name='اسم الميزة')
+    # الاسم بعد التوحيد (أمن / امن / أمن  = نفس الميزة)، والتكرار بيتمنع عليه هو
+    name_normalized = models.CharField(max_length=100, unique=True, editable=False)
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        duplicate = Feature.objects.filter(name_normalized=normalize_arabic(self.name)[:100]).exclude(pk=self.pk).first()
+        if duplicate is not None:
+            raise ValidationError({'name': f"الميزة موجودة بالفعل باسم '{duplicate.name}'."})
+
+    def save(self, *args, **kwargs):
+        self.name_normalized = normalize_arabic(self.name)[:100]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'ميزة'
         verbose_name_plural = 'مميزات'
@@ -199,4 +368,175 @@ class FavoriteProperty(models.Model):
         verbose_name_plural = 'عقارات مفضلة'
 
     def __str__(self):
-        return f'{self.user.username} - {self.property.title}'
\ No newline at end of file
+        return f'{self.user.username} - {self.property.title}'
+
+
+class ListingCard(models.Model):
+    """
+    جدول قراءة مختصر (projection) فيه كل اللي كارت العقار محتاجه في صفحات القوائم،
+    عشان صفحات القوائم تقرأ من جدول واحد من غير joins مع الصور والمالك.
+    بيتحدث من إشارات Property و PropertyImage و FavoriteProperty،
+    وبيتبني بالكامل بأمر ``manage.py rebuild_listing_cards``.
+    """
+    property = models.OneToOneField(Property, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    slug = models.SlugField(max_length=255)
+    title = models.CharField(max_length=200)
+    property_type = models.CharField(max_length=50, choices=Property.PROPERTY_TYPES)
+    status = models.CharField(max_length=50, choices=Property.PROPERTY_STATUS)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    area = models.DecimalField(max_digits=10, decimal_places=2)
+    bedrooms = models.IntegerField(default=0)
+    bathrooms = models.IntegerField(default=0)
+    location_address = models.CharField(max_length=255)
+    city = models.CharField(max_length=100)
+    district = models.CharField(max_length=100, blank=True, null=True)
+    city_normalized = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    district_normalized = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    # geohash للموقع (فاضي لو مفيش إحداثيات)، عليه فهرس للبحث الجغرافي (properties/geo.py)
+    geohash = models.CharField(max_length=12, blank=True, default='')
+    cover_image_url = models.URLField(max_length=500, blank=True, default='')
+    cover_placeholder = models.TextField(blank=True, default='')
+    cover_color = models.CharField(max_length=7, blank=True, default='')
+    views_count = models.PositiveIntegerField(default=0)
+    favorites_count = models.PositiveIntegerField(default=0)
+    is_published = models.BooleanField(default=True)
+    published_date = models.DateTimeField()
+    updated_date = models.DateTimeField()
+
+    # الحقول اللي بتتنسخ زي ما هي من Property
+    COPIED_FIELDS = (
+        'owner_id', 'slug', 'title', 'property_type', 'status', 'price', 'area',
+        'bedrooms', 'bathrooms', 'location_address', 'city', 'district',
+        'city_normalized', 'district_normalized', 'latitude', 'longitude',
+        'is_published', 'published_date', 'updated_date',
+    )
+
+    def __str__(self):
+        return self.title
+
+    def get_absolute_url(self):
+        return reverse('properties:property_detail', kwargs={'slug': self.slug})
+
+    class Meta:
+        verbose_name = 'كارت عقار'
+        verbose_name_plural = 'كروت العقارات'
+        ordering = ['-published_date']
+        indexes = [
+            models.Index(fields=['is_published', '-published_date'], name='card_published_idx'),
+            models.Index(fields=['owner', 'is_published', '-published_date'], name='card_owner_idx'),
+            models.Index(fields=['is_published', 'geohash'], name='card_geohash_idx'),
+        ]
+
+
+class PropertyView(models.Model):
+    """
+    مشاهدة مستخدم مسجل لعقار (صف واحد لكل مستخدم وعقار) بدل علاقة viewed_by.
+    الصفوف بتتكتب على دفعات من properties/view_counter.py مش في طلب صفحة العقار.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='views', verbose_name='العقار')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='property_views', verbose_name='المستخدم')
+    viewed_at = models.DateTimeField(default=timezone.now, verbose_name='وقت المشاهدة')
+
+    def __str__(self):
+        return f'{self.user_id} - {self.property_id}'
+
+    class Meta:
+        verbose_name = 'مشاهدة عقار'
+        verbose_name_plural = 'مشاهدات العقارات'
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'user'], name='property_view_unique'),
+        ]
+
+
+class MapCluster(models.Model):
+    """
+    تجميعات علامات الخريطة المحسوبة مسبقاً: لكل مستوى تكبير (zoom) الخريطة مقسومة لشبكة
+    خلايا (Web Mercator)، وكل صف = عدد العقارات المنشورة في الخلية ومجموع إحداثياتها
+    (عشان نحسب مركز التجمع). بيتحدث تزايدياً من إشارات Property
+    وبيتبني بالكامل بأمر ``manage.py rebuild_map_clusters``.
+    """
+    zoom = models.PositiveSmallIntegerField()
+    cell_x = models.PositiveIntegerField()
+    cell_y = models.PositiveIntegerField()
+    count = models.IntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.zoom}/{self.cell_x}/{self.cell_y} ({self.count})"
+
+    class Meta:
+        verbose_name = 'تجمع خريطة'
+        verbose_name_plural = 'تجمعات الخريطة'
+        constraints = [
+            models.UniqueConstraint(fields=['zoom', 'cell_x', 'cell_y'], name='map_cluster_cell_unique'),
+        ]
+
+
+class PropertyDailyVisitors(models.Model):
+    """
+    تقدير الزوار الفريدين لعقار في يوم (مستخدمين مسجلين + زوار مجهولين بالكوكي)
+    كـ HyperLogLog sketch مضغوط (properties/hyperloglog.py) بدل جدول لكل زائر.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='daily_visitors', verbose_name='العقار')
+    day = models.DateField(verbose_name='اليوم')
+    sketch = models.BinaryField(verbose_name='HyperLogLog sketch')
+
+    def __str__(self):
+        return f'{self.property_id} - {self.day}'
+
+    class Meta:
+        verbose_name = 'زوار عقار في يوم'
+        verbose_name_plural = 'زوار العقارات اليومي'
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'day'], name='property_daily_visitors_unique'),
+        ]
+
+
+class PropertyDailyStats(models.Model):
+    """
+    إحصائيات يومية مجمعة لكل عقار (مشاهدات جديدة، إضافات للمفضلة، استفسارات).
+    بيتملى تزايدياً بأمر ``manage.py rollup_property_stats`` (properties/rollups.py)
+    ولوحة الوسيط بتقرأ منه بدل ما تعد من الجداول الأصلية.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='daily_stats', verbose_name='العقار')
+    day = models.DateField(verbose_name='اليوم')
+    views = models.PositiveIntegerField(default=0, verbose_name='المشاهدات')
+    favorites = models.PositiveIntegerField(default=0, verbose_name='الإضافات للمفضلة')
+    inquiries = models.PositiveIntegerField(default=0, verbose_name='الاستفسارات')
+
+    def __str__(self):
+        return f'{self.property_id} - {self.day}'
+
+    class Meta:
+        verbose_name = 'إحصائيات عقار يومية'
+        verbose_name_plural = 'إحصائيات العقارات اليومية'
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'day'], name='property_daily_stats_unique'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """آخر id اتعالج من كل جدول مصدر في التجميع اليومي (عشان كل تشغيل يعالج الجديد بس)."""
+    source = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.source}: {self.last_id}'
+
+
+class ImportCheckpoint(models.Model):
+    """تقدم استيراد بالجملة (properties/importer.py)، بيتحدث في نفس transaction كل دفعة."""
+    key = models.CharField(max_length=255, unique=True)
+    rows_done = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    invalid = models.PositiveIntegerField(default=0)
+    images_queued = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.key}: {self.rows_done}'
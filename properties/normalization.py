@@ -0,0 +1,51 @@
+# properties/normalization.py
+
+"""
+توحيد النص العربي (Normalization) قبل التخزين والبحث.
+
+نفس الدالة بتتطبق على النص وقت الحفظ (الحقول *_normalized في Property وفهرس FTS)
+وعلى نص البحث القادم من المستخدم، فالمقارنة بتبقى مساواة/بادئة عادية على عمود مفهرس.
+"""
+
+import re
+
+# التشكيل: الفتحة والضمة والكسرة والتنوين والشدة والسكون والألف الخنجرية
+_DIACRITICS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]')
+_TATWEEL = '\u0640'
+_WHITESPACE_RE = re.compile(r'\s+')
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_CHAR_MAP = str.maketrans({
+    # أشكال الألف والهمزة
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    'ئ': 'ي',
+    # التاء المربوطة والألف المقصورة
+    'ة': 'ه',
+    'ى': 'ي',
+    # الأرقام العربية والفارسية
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+    '۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4',
+    '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9',
+})
+
+
+def normalize_arabic(text):
+    """
+    توحيد النص: حذف التشكيل والتطويل، توحيد الألف/الهمزة والتاء المربوطة
+    والألف المقصورة والأرقام، تحويل الحروف اللاتينية لحروف صغيرة، وضغط المسافات.
+    """
+    if not text:
+        return ''
+    text = _DIACRITICS_RE.sub('', text).replace(_TATWEEL, '')
+    text = text.translate(_CHAR_MAP).casefold()
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def tokenize(text):
+    """تقسيم النص (بعد التوحيد) لكلمات من حروف وأرقام فقط."""
+    return _TOKEN_RE.findall(normalize_arabic(text))
@@ -0,0 +1,260 @@
+# properties/pagination.py
+
+"""
+ترقيم صفحات بالمؤشر (Keyset / Cursor Pagination) لقوائم العقارات.
+
+بدل OFFSET (اللي بيبطأ كل ما الصفحة تبعد) بنرتب بـ (published_date, pk) تنازلياً
+وبنجيب الصفحة التالية بشرط "أقدم من آخر عنصر في الصفحة الحالية".
+المؤشر (cursor) نص base64 مغلق مش المفروض العميل يفهمه أو يعدله.
+
+كمان فيه capped_count عشان نعرض "1000+" بدل ما ندفع تمن COUNT(*) كامل.
+
+لو أرقام النتائج متخزنة في كاش النتائج (result_cache) الترقيم بيتم على القائمة دي،
+والصفحة بتجيب من قاعدة البيانات العناصر اللي هتتعرض بس.
+"""
+
+import base64
+import json
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# أقصى عدد بنعده بالظبط، بعده بنعرض "+"
+COUNT_CAP = 1000
+
+
+def encode_cursor(obj, direction):
+    payload = json.dumps([obj.published_date.isoformat(), obj.pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """بيرجع (published_date, pk, direction) أو None لو المؤشر مش صالح."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        published, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        published = parse_datetime(published)
+        pk = int(pk)
+    except (ValueError, TypeError):
+        return None
+    if published is None or direction not in (NEXT, PREVIOUS):
+        return None
+    return published, pk, direction
+
+
+def capped_count(queryset, cap=COUNT_CAP):
+    """
+    عدد النتائج لحد cap بس: ``SELECT COUNT(*) FROM (... LIMIT cap+1)``.
+    بيرجع (العدد، هل العدد مقصوص؟).
+    """
+    count = queryset.order_by()[:cap + 1].count()
+    if count > cap:
+        return cap, True
+    return count, False
+
+
+def format_count(count, is_capped):
+    return f"{count}+" if is_capped else str(count)
+
+
+def hydrate_ids(model, ids):
+    """العناصر بأرقامها بنفس الترتيب (استعلام واحد)، والمحذوف بيتشال."""
+    objects = model._default_manager.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    ترقيم بالمؤشر على (published_date, pk) تنازلياً.
+    كل صفحة = استعلام واحد بـ LIMIT per_page + 1 (العنصر الزيادة بيقول لو فيه صفحة بعدها).
+    """
+
+    def __init__(self, queryset, per_page, count_cap=COUNT_CAP):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count_cap = count_cap
+
+    @cached_property
+    def capped_count(self):
+        return capped_count(self.queryset, self.count_cap)
+
+    @property
+    def count_display(self):
+        return format_count(*self.capped_count)
+
+    def page(self, cursor=None):
+        position = decode_cursor(cursor)
+        queryset = self.queryset
+
+        if position is None:
+            rows = list(queryset.order_by('-published_date', '-pk')[:self.per_page + 1])
+            has_more, has_before = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        else:
+            published, pk, direction = position
+            if direction == NEXT:
+                rows = list(
+                    queryset.filter(Q(published_date__lt=published) | Q(published_date=published, pk__lt=pk))
+                    .order_by('-published_date', '-pk')[:self.per_page + 1]
+                )
+                has_more, has_before = len(rows) > self.per_page, True
+                rows = rows[:self.per_page]
+            else:
+                rows = list(
+                    queryset.filter(Q(published_date__gt=published) | Q(published_date=published, pk__gt=pk))
+                    .order_by('published_date', 'pk')[:self.per_page + 1]
+                )
+                has_before, has_more = len(rows) > self.per_page, True
+                rows = rows[:self.per_page][::-1]
+
+        next_cursor = encode_cursor(rows[-1], NEXT) if rows and has_more else None
+        previous_cursor = encode_cursor(rows[0], PREVIOUS) if rows and has_before else None
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+class CappedCountPaginator(Paginator):
+    """Paginator عادي (OFFSET) بس العدد الكلي مقصوص عند COUNT_CAP."""
+
+    count_cap = COUNT_CAP
+
+    @cached_property
+    def capped_count(self):
+        return capped_count(self.object_list, self.count_cap)
+
+    @cached_property
+    def count(self):
+        return self.capped_count[0]
+
+    @property
+    def count_display(self):
+        return format_count(*self.capped_count)
+
+
+def _capped_ids_count(ids, cap):
+    if len(ids) > cap:
+        return cap, True
+    return len(ids), False
+
+
+class CachedIdsPaginator(Paginator):
+    """ترقيم برقم الصفحة على قائمة أرقام متخزنة؛ كل صفحة بتجيب عناصرها بس."""
+
+    def __init__(self, ids, model, per_page, count_cap=COUNT_CAP):
+        super().__init__(ids, per_page)
+        self.model = model
+        self.count_cap = count_cap
+
+    @cached_property
+    def capped_count(self):
+        return _capped_ids_count(self.object_list, self.count_cap)
+
+    @cached_property
+    def count(self):
+        return self.capped_count[0]
+
+    @property
+    def count_display(self):
+        return format_count(*self.capped_count)
+
+    def _get_page(self, object_list, number, paginator):
+        return Page(hydrate_ids(self.model, object_list), number, paginator)
+
+
+class CachedIdsCursorPaginator(CursorPaginator):
+    """
+    نفس مؤشرات CursorPaginator بس على قائمة أرقام متخزنة (مرتبة بنفس الترتيب).
+    لو عنصر المؤشر مش في القائمة، أو الصفحة بتعدي آخر القائمة المقصوصة، بنرجع
+    للاستعلام العادي.
+    """
+
+    def __init__(self, queryset, ids, per_page, count_cap=COUNT_CAP):
+        super().__init__(queryset, per_page, count_cap)
+        self.ids = ids
+        # القائمة مقصوصة لو وصلت للحد: ساعتها مش عارفين فيه كام بعدها
+        self.is_truncated = len(ids) > count_cap
+
+    @cached_property
+    def capped_count(self):
+        return _capped_ids_count(self.ids, self.count_cap)
+
+    def page(self, cursor=None):
+        position = decode_cursor(cursor)
+        if position is None:
+            start, end = 0, self.per_page
+        else:
+            _published, pk, direction = position
+            try:
+                index = self.ids.index(pk)
+            except ValueError:
+                return super().page(cursor)
+            if direction == NEXT:
+                start, end = index + 1, index + 1 + self.per_page
+            else:
+                start, end = max(index - self.per_page, 0), index
+
+        if self.is_truncated and end >= len(self.ids):
+            return super().page(cursor)
+        page_ids = self.ids[start:end]
+        rows = hydrate_ids(self.queryset.model, page_ids)
+        if len(rows) != len(page_ids):
+            # فيه عناصر اتحذفت من ساعة ما القائمة اتخزنت
+            return super().page(cursor)
+
+        next_cursor = encode_cursor(rows[-1], NEXT) if rows and end < len(self.ids) else None
+        previous_cursor = encode_cursor(rows[0], PREVIOUS) if rows and start > 0 else None
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+def paginate_listings(queryset, params, per_page, ids=None):
+    """
+    اختيار طريقة الترقيم المناسبة وبيرجع (paginator, page).
+
+    - نتائج البحث النصي مرتبة بالصلة (search_rank) فبتستخدم OFFSET بعدد مقصوص.
+    - الروابط القديمة اللي فيها ?page= بتفضل شغالة بنفس الطريقة.
+    - غير كده: ترقيم بالمؤشر ?cursor= على (published_date, pk).
+
+    لو اتبعتت ids (أرقام النتائج من كاش النتائج بنفس ترتيب الـ queryset) الترقيم
+    بيتم عليها والصفحة بتجيب عناصرها بس.
+    """
+    offset = 'search_rank' in queryset.query.annotations or params.get('page')
+    if ids is not None:
+        ids = list(ids)
+        if offset:
+            paginator = CachedIdsPaginator(ids, queryset.model, per_page)
+            return paginator, paginator.get_page(params.get('page'))
+        paginator = CachedIdsCursorPaginator(queryset, ids, per_page)
+        return paginator, paginator.page(params.get('cursor'))
+    if offset:
+        paginator = CappedCountPaginator(queryset, per_page)
+        return paginator, paginator.get_page(params.get('page'))
+    paginator = CursorPaginator(queryset, per_page)
+    return paginator, paginator.page(params.get('cursor'))
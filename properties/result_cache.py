@@ -0,0 +1,108 @@
+# properties/result_cache.py
+
+"""
+كاش نتائج البحث في قائمة العقارات.
+
+نفس تركيبة الفلاتر (نفس المدينة والنوع وشريحة السعر) بتتطلب آلاف المرات في اليوم،
+فبدل ما نعيد الاستعلام كل مرة بنخزن القائمة المرتبة لأرقام العقارات (IDs) لكل مجموعة
+فلاتر بعد توحيدها، وكل صفحة بتجيب من قاعدة البيانات الكروت اللي هتعرضها بس.
+
+- الكاش في ذاكرة البروسيس (LRU بعدد أقصى للمدخلات + مدة صلاحية TTL).
+- الصلاحية بأرقام أجيال (generations) في كاش Django المشترك (Redis مع REDIS_URL، فالتعديل
+  في أي worker بيوصل للباقيين؛ LocMemCache محلياً لعملية واحدة بس): جيل عام وجيل لكل مدينة.
+  أي حفظ/حذف لعقار بيزود الجيل العام وجيل مدينته بس، فالبحث المحصور في مدينة تانية
+  بيفضل صالح، وأي بحث مش محصور في مدينة بيتحسب من جديد.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from .filters import canonical_params, scoped_city
+from .pagination import COUNT_CAP
+
+GLOBAL_GENERATION_KEY = 'properties:results:generation'
+CITY_GENERATION_KEY = 'properties:results:generation:city:{}'
+
+# بنخزن لحد COUNT_CAP + 1 رقم: ده كفاية للعدد المقصوص ("1000+") ولأول صفحات القائمة
+MAX_IDS = COUNT_CAP + 1
+
+
+def _city_key(city):
+    digest = hashlib.md5(city.encode()).hexdigest()
+    return CITY_GENERATION_KEY.format(digest)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate(cities=()):
+    """تعليم النتائج المتخزنة إنها قديمة: الجيل العام + جيل كل مدينة من المدن المذكورة."""
+    _bump(GLOBAL_GENERATION_KEY)
+    for city in set(cities):
+        if city:
+            _bump(_city_key(city))
+
+
+def current_generation(city=None):
+    """الجيل اللي النتيجة بتعتمد عليه: جيل المدينة لو البحث محصور فيها، وإلا الجيل العام."""
+    if city:
+        return ('city', cache.get(_city_key(city), 0))
+    return ('global', cache.get(GLOBAL_GENERATION_KEY, 0))
+
+
+class ResultCache:
+    """LRU بسيط في الذاكرة: key -> (وقت الانتهاء، الجيل، الأرقام)."""
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, params):
+        canonical = canonical_params(params)
+        return hashlib.md5(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+    def get_ids(self, queryset, params):
+        """
+        أرقام العقارات المطابقة بنفس ترتيب الـ queryset (لحد MAX_IDS).
+        من الكاش لو موجودة وصالحة، وإلا استعلام واحد ``values_list('pk')`` وبتتخزن.
+        """
+        key = self._key(params)
+        generation = current_generation(scoped_city(params))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_generation, ids = entry
+                if expires_at > now and entry_generation == generation:
+                    self._entries.move_to_end(key)
+                    return ids
+                del self._entries[key]
+
+        ids = tuple(queryset.values_list('pk', flat=True)[:MAX_IDS])
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, generation, ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return ids
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# نسخة واحدة لكل بروسيس
+result_cache = ResultCache()
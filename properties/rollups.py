@@ -0,0 +1,139 @@
+# properties/rollups.py
+
+"""
+تجميع الأحداث في جدول PropertyDailyStats (مشاهدات، مفضلة، استفسارات لكل عقار في اليوم).
+
+كل مصدر ليه علامة (RollupWatermark) بآخر id اتعالج، فكل تشغيل بيقرا الصفوف الجديدة بس
+(id > العلامة) على دفعات، ويجمعها بـ GROUP BY (العقار، اليوم) في قاعدة البيانات،
+ويزودها على الصفوف الموجودة. تحديث الإحصائيات والعلامة بيتم في نفس الـ transaction.
+
+الـ ids مش بتتعمل commit بالترتيب (في Postgres الـ id بيتحجز من الـ sequence قبل الـ commit)،
+فصف برقم صغير ممكن يظهر بعد ما العلامة عدّته. عشان كده العلامة مابتعديش أي صف أحدث من
+SETTLE_DELAY (وقته من الصف نفسه): الصفوف دي وكل اللي بعدها بتستنى التشغيل الجاي، ولحد ما
+يعدي SETTLE_DELAY أي transaction كانت شايلة رقم أصغر تكون خلصت.
+
+بيشغله أمر ``manage.py rollup_property_stats`` (مرة واحدة أو كل فترة بـ --loop).
+"""
+
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from inquiries.models import Inquiry
+
+from .models import FavoriteProperty, PropertyDailyStats, PropertyView, RollupWatermark
+
+# المصدر -> (الموديل، حقل الوقت، العمود في PropertyDailyStats)
+SOURCES = {
+    'views': (PropertyView, 'viewed_at', 'views'),
+    'favorites': (FavoriteProperty, 'created_at', 'favorites'),
+    'inquiries': (Inquiry, 'created_at', 'inquiries'),
+}
+
+STAT_FIELDS = ('views', 'favorites', 'inquiries')
+
+# أطول من أي transaction بتكتب في المصادر (ومن فترة تفريغ بافر المشاهدات)
+SETTLE_DELAY = datetime.timedelta(minutes=5)
+
+
+def _apply(totals):
+    """totals = {(property_id, day): {عمود: زيادة}} -> زيادة على PropertyDailyStats."""
+    if not totals:
+        return
+    existing = {
+        (row.property_id, row.day): row
+        for row in PropertyDailyStats.objects.select_for_update().filter(
+            property_id__in={property_id for property_id, _day in totals},
+            day__in={day for _property_id, day in totals},
+        )
+    }
+    to_update, to_create = [], []
+    for (property_id, day), increments in totals.items():
+        row = existing.get((property_id, day))
+        if row is None:
+            to_create.append(PropertyDailyStats(property_id=property_id, day=day, **increments))
+            continue
+        for field, value in increments.items():
+            setattr(row, field, getattr(row, field) + value)
+        to_update.append(row)
+    if to_update:
+        PropertyDailyStats.objects.bulk_update(to_update, STAT_FIELDS, batch_size=500)
+    if to_create:
+        PropertyDailyStats.objects.bulk_create(to_create, batch_size=500)
+
+
+def rollup_source(source, batch_size=10000, settle_delay=SETTLE_DELAY):
+    """معالجة الصفوف الجديدة من مصدر واحد. بيرجع عدد الصفوف اللي اتعالجت."""
+    model, time_field, stat_field = SOURCES[source]
+    processed = 0
+    while True:
+        with transaction.atomic():
+            watermark, _created = RollupWatermark.objects.select_for_update().get_or_create(source=source)
+            new_rows = model.objects.filter(pk__gt=watermark.last_id)
+            # أول صف لسه جديد: هو واللي بعده (حتى لو أقدم) بيستنوا
+            first_recent = new_rows.filter(
+                **{f'{time_field}__gte': timezone.now() - settle_delay}
+            ).aggregate(first=Min('pk'))['first']
+            if first_recent is not None:
+                new_rows = new_rows.filter(pk__lt=first_recent)
+            new_rows = new_rows.order_by('pk')
+            upper = new_rows[batch_size - 1:batch_size].values_list('pk', flat=True).first()
+            if upper is None:
+                upper = new_rows.aggregate(last=Max('pk'))['last']
+            if upper is None:
+                return processed
+
+            batch = model.objects.filter(pk__gt=watermark.last_id, pk__lte=upper)
+            grouped = (
+                batch.order_by()
+                .annotate(day=TruncDate(time_field))
+                .values('property_id', 'day')
+                .annotate(total=Count('pk'))
+            )
+            totals = {}
+            count = 0
+            for row in grouped:
+                totals[(row['property_id'], row['day'])] = {stat_field: row['total']}
+                count += row['total']
+            _apply(totals)
+
+            watermark.last_id = upper
+            watermark.save(update_fields=['last_id', 'updated_at'])
+        processed += count
+
+
+def rollup_all(batch_size=10000, settle_delay=SETTLE_DELAY):
+    """تشغيل التجميع لكل المصادر. بيرجع {المصدر: عدد الصفوف الجديدة}."""
+    return {source: rollup_source(source, batch_size, settle_delay) for source in SOURCES}
+
+
+def time_series(owner, days=30, property_id=None, today=None):
+    """
+    سلسلة يومية (آخر days يوم) لعقارات الوسيط كلها أو لعقار واحد، من جدول التجميع بس.
+    الأيام اللي مفيهاش أحداث بترجع أصفار.
+    """
+    today = today or timezone.localdate()
+    start = today - datetime.timedelta(days=days - 1)
+    rows = PropertyDailyStats.objects.filter(property__owner=owner, day__range=(start, today))
+    if property_id is not None:
+        rows = rows.filter(property_id=property_id)
+    totals = {
+        row['day']: row
+        for row in rows.values('day').annotate(
+            views_total=Sum('views'), favorites_total=Sum('favorites'), inquiries_total=Sum('inquiries'),
+        )
+    }
+    series = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        row = totals.get(day, {})
+        series.append({
+            'day': day.isoformat(),
+            'views': row.get('views_total', 0),
+            'favorites': row.get('favorites_total', 0),
+            'inquiries': row.get('inquiries_total', 0),
+        })
+    return series
@@ -0,0 +1,225 @@
+# properties/search.py
+
+"""
+محرك البحث النصي الكامل (Full-Text Search) للعقارات المنشورة.
+
+- على SQLite نستخدم جدول FTS5 افتراضي.
+- على PostgreSQL نستخدم جدول مساعد فيه عمود tsvector عليه فهرس GIN.
+
+في الحالتين الجدول اسمه ``properties_property_fts`` ومفتاحه هو id العقار،
+ويتم تحديثه من إشارات الحفظ والحذف في ``properties/signals.py``.
+"""
+
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from .normalization import normalize_arabic, tokenize
+
+FTS_TABLE = 'properties_property_fts'
+
+# الحقول اللي بتدخل في الفهرس (بنفس ترتيب أعمدة جدول FTS)
+SEARCH_FIELDS = ('title', 'description', 'location_address', 'city', 'district')
+
+
+def is_supported(conn=None):
+    """هل قاعدة البيانات الحالية تدعم الفهرس النصي؟"""
+    conn = conn or connection
+    return conn.vendor in ('sqlite', 'postgresql')
+
+
+def _document(instance):
+    # النص بيتخزن في الفهرس بعد التوحيد، ونص البحث بيتوحد بنفس الطريقة في tokenize()
+    return [normalize_arabic(getattr(instance, field)) for field in SEARCH_FIELDS]
+
+
+# ---------------------------------------------------------------------------
+# إنشاء الفهرس (بيتنادى من الـ migration)
+# ---------------------------------------------------------------------------
+
+def create_index(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2')"
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+                "property_id bigint PRIMARY KEY REFERENCES properties_property(id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_gin "
+                f"ON {FTS_TABLE} USING gin(document)"
+            )
+
+
+def drop_index(conn):
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+# ---------------------------------------------------------------------------
+# تحديث الفهرس
+# ---------------------------------------------------------------------------
+
+def index_property(instance, conn=None):
+    """
+    إضافة/تحديث عقار في الفهرس. العقار غير المنشور بيتشال من الفهرس.
+    """
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    if not instance.is_published:
+        remove_property(instance.pk, conn)
+        return
+
+    values = _document(instance)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [instance.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(SEARCH_FIELDS))})",
+                [instance.pk, *values],
+            )
+        else:
+            # العنوان له الوزن الأعلى، ثم المدينة/الحي، ثم الوصف والعنوان التفصيلي
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (property_id, document) VALUES (%s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'B')) "
+                "ON CONFLICT (property_id) DO UPDATE SET document = EXCLUDED.document",
+                [instance.pk, *values],
+            )
+
+
+def index_properties(instances, conn=None):
+    """إضافة دفعة عقارات (جديدة) للفهرس بـ executemany بدل استعلام لكل عقار."""
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    rows = [[instance.pk, *_document(instance)] for instance in instances if instance.is_published]
+    if not rows:
+        return
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [[row[0]] for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(SEARCH_FIELDS))})",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (property_id, document) VALUES (%s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'B')) "
+                "ON CONFLICT (property_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def remove_property(pk, conn=None):
+    conn = conn or connection
+    if not is_supported(conn):
+        return
+    key = 'rowid' if conn.vendor == 'sqlite' else 'property_id'
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE {key} = %s", [pk])
+
+
+def rebuild_index(queryset, conn=None):
+    """إعادة بناء الفهرس بالكامل من queryset للعقارات."""
+    conn = conn or connection
+    if not is_supported(conn):
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    count = 0
+    for prop in queryset.filter(is_published=True).only('pk', 'is_published', *SEARCH_FIELDS).iterator():
+        index_property(prop, conn)
+        count += 1
+    return count
+
+
+# ---------------------------------------------------------------------------
+# الاستعلام
+# ---------------------------------------------------------------------------
+
+def build_match_expression(query, vendor=None):
+    """
+    تحويل نص البحث (بعد التوحيد) لاستعلام FTS: كل كلمة لازم تظهر (AND) ومطابقة بالبادئة.
+    بيرجع None لو مفيش كلمات صالحة.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    vendor = vendor or connection.vendor
+    if vendor == 'sqlite':
+        return ' '.join(f'"{token}"*' for token in tokens)
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def _fallback_filter(queryset, query):
+    from .models import Property
+
+    normalized = normalize_arabic(query)
+    matches = Property.objects.filter(
+        Q(title_normalized__contains=normalized)
+        | Q(description__icontains=query)
+        | Q(address_normalized__contains=normalized)
+        | Q(city_normalized__contains=normalized)
+        | Q(district_normalized__contains=normalized)
+    )
+    return queryset.filter(pk__in=matches.values('pk'))
+
+
+def search(queryset, query):
+    """
+    فلترة queryset بنتيجة البحث النصي مع ترتيب حسب الصلة (relevance).
+
+    الفلترة بتتم كـ ``id IN (SELECT ... MATCH ...)`` فبتتركب مع باقي الفلاتر
+    (السعر، المساحة، الغرف، النوع، الحالة) في نفس الاستعلام.
+    الـ queryset الناتج فيه annotation اسمه ``search_rank`` (الأكبر = الأنسب).
+    """
+    expression = build_match_expression(query)
+    if expression is None:
+        return queryset
+    if not is_supported():
+        return _fallback_filter(queryset, query)
+
+    # الـ queryset ممكن يكون على Property أو ListingCard (المفتاح في الحالتين هو id العقار)
+    opts = queryset.model._meta
+    outer_pk = f"{connection.ops.quote_name(opts.db_table)}.{connection.ops.quote_name(opts.pk.column)}"
+
+    if connection.vendor == 'sqlite':
+        ids_sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        # bm25 بيرجع قيمة سالبة (الأصغر = الأنسب) فبنعكس الإشارة
+        rank_sql = (
+            f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0, 2.0, 5.0, 5.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {outer_pk}"
+        )
+    else:
+        ids_sql = f"SELECT property_id FROM {FTS_TABLE} WHERE document @@ to_tsquery('simple', %s)"
+        rank_sql = (
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {FTS_TABLE} "
+            f"WHERE property_id = {outer_pk}"
+        )
+
+    return (
+        queryset.filter(pk__in=RawSQL(ids_sql, (expression,)))
+        .annotate(search_rank=RawSQL(rank_sql, (expression,)))
+        .order_by(F('search_rank').desc(nulls_last=True), '-published_date')
+    )
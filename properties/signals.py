@@ -1,10 +1,12 @@
 # properties/signals.py
 
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
 from django.dispatch import receiver
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from .models import Property
+from .models import Property, PropertyImage, FavoriteProperty, ListingCard, Feature
+from . import search, cards, facets, result_cache, clusters, favorites, feature_index
+from .gazetteer import gazetteer
 from notifications.models import Notification
 
 @receiver(post_save, sender=Property)
@@ -33,4 +35,128 @@ def property_added_notification(sender, instance, created, **kwargs):
                 'link': instance.get_absolute_url(),
                 'notification_count': notification_count
             }
-        )
\ No newline at end of file
+        )
+
+
+@receiver(post_save, sender=Property)
+def update_search_index(sender, instance, **kwargs):
+    """
+    تحديث الفهرس النصي للعقار بعد أي حفظ (العقار غير المنشور بيتشال من الفهرس)،
+    وتعليم قاموس المدن/الأحياء إنه محتاج إعادة تحميل.
+    """
+    search.index_property(instance)
+    gazetteer.invalidate()
+
+
+@receiver(post_delete, sender=Property)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_property(instance.pk)
+    gazetteer.invalidate()
+
+
+# ---------------------------------------------------------------------------
+# تحديث جدول كروت العقارات (ListingCard)
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=Property)
+def update_listing_card(sender, instance, **kwargs):
+    cards.refresh_card(instance.pk)
+    facets.invalidate()
+
+
+@receiver(post_delete, sender=Property)
+def invalidate_listing_facets(sender, instance, **kwargs):
+    facets.invalidate()
+
+
+# ---------------------------------------------------------------------------
+# كاش نتائج البحث وتجمعات الخريطة: محتاجين حالة العقار قبل الحفظ (من الكارت)
+# ---------------------------------------------------------------------------
+
+@receiver(pre_save, sender=Property)
+def remember_listing_card(sender, instance, **kwargs):
+    """
+    المدينة والموقع اللي العقار كان ظاهر بيهم قبل الحفظ، عشان نحدّث القديم والجديد.
+    لو العقار مقري من قاعدة البيانات القيم القديمة محفوظة فيه (تتبع الحقول المتغيرة)،
+    وإلا بنقراها من الكارت.
+    """
+    instance._previous_card = None
+    if instance._state.adding or not instance.pk:
+        return
+    fields = ('city_normalized', 'latitude', 'longitude', 'is_published')
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and all(field in loaded for field in fields):
+        instance._previous_card = {field: loaded[field] for field in fields}
+    else:
+        instance._previous_card = (
+            ListingCard.objects.filter(pk=instance.pk).values(*fields).first()
+        )
+
+
+def _map_point(is_published, latitude, longitude):
+    if is_published and latitude is not None and longitude is not None:
+        return latitude, longitude
+    return None
+
+
+@receiver(post_save, sender=Property)
+def invalidate_listing_results(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_card', None) or {}
+    result_cache.invalidate(cities=[instance.city_normalized, previous.get('city_normalized')])
+    clusters.move_point(
+        _map_point(previous.get('is_published'), previous.get('latitude'), previous.get('longitude')),
+        _map_point(instance.is_published, instance.latitude, instance.longitude),
+    )
+
+
+@receiver(post_delete, sender=Property)
+def invalidate_deleted_listing_results(sender, instance, **kwargs):
+    result_cache.invalidate(cities=[instance.city_normalized])
+    clusters.move_point(_map_point(instance.is_published, instance.latitude, instance.longitude), None)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+def update_listing_card_cover(sender, instance, **kwargs):
+    cards.refresh_cover(instance.property_id)
+
+
+@receiver(post_save, sender=FavoriteProperty)
+@receiver(post_delete, sender=FavoriteProperty)
+def update_listing_card_favorites(sender, instance, **kwargs):
+    # تعديل من برة favorites.toggle (لوحة الإدارة أو حذف عقار/مستخدم)
+    cards.refresh_favorites_count(instance.property_id)
+    favorites.invalidate(instance.user_id)
+
+
+# ---------------------------------------------------------------------------
+# فهرس المميزات (كتالوج المميزات + bitmap العقارات لكل ميزة)
+# ---------------------------------------------------------------------------
+
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+def invalidate_feature_catalogue(sender, instance, **kwargs):
+    feature_index.invalidate_catalogue()
+    feature_index.invalidate_features([instance.pk])
+
+
+@receiver(m2m_changed, sender=Property.features.through)
+def update_feature_index(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    مسح bitmaps المميزات اللي ربطها اتغير. في clear مفيش pk_set، فالمميزات بتتقرا
+    قبل المسح (pre_clear). من ناحية الميزة (feature.properties.add) الميزة هي instance.
+    """
+    if action == 'pre_clear':
+        instance._cleared_feature_ids = (
+            [instance.pk] if reverse else list(instance.features.values_list('pk', flat=True))
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        feature_ids = getattr(instance, '_cleared_feature_ids', [])
+    else:
+        feature_ids = [instance.pk] if reverse else pk_set
+    feature_index.invalidate_features(feature_ids)
+    result_cache.invalidate(cities=[] if reverse else [instance.city_normalized])
+    facets.invalidate()
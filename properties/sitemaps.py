@@ -1,13 +1,14 @@
 from django.contrib.sitemaps import Sitemap
 from django.urls import reverse
-from .models import Property
+from .models import ListingCard
 
 class PropertySitemap(Sitemap):
     changefreq = "daily"
     priority = 0.9
 
     def items(self):
-        return Property.objects.filter(is_published=True)
+        # جدول الكروت فيه الـ slug وتاريخ التحديث، فمش محتاجين نقرأ Property كله
+        return ListingCard.objects.filter(is_published=True).only('property_id', 'slug', 'updated_date')
 
     def lastmod(self, obj):
         return obj.updated_date
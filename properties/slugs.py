@@ -0,0 +1,109 @@
+# properties/slugs.py
+
+"""
+توليد روابط (slugs) فريدة للعقارات.
+
+الـ slug الأساسي من العنوان ونوع العقار والمدينة والمساحة، ولو مستخدم بنضيف رقم (-1، -2 ...).
+بدل ما نجرب كل رقم باستعلام exists() لوحده، بنجيب كل الـ slugs اللي بتبدأ بنفس الأساس
+في استعلام واحد ونختار الرقم الفاضي اللي بعد أكبر رقم مستخدم.
+
+- allocate_slug: slug لعقار واحد (استعلام واحد).
+- allocate_slugs: slugs لمجموعة عقارات مرة واحدة (استعلام لكل SLUGS_PER_QUERY أساس)،
+  ومن غير تكرار بين عقارات الدفعة نفسها (بيستخدمها الاستيراد بالجملة).
+
+التعارض وقت الإدخال المتزامن بيتحل في Property.save (إعادة المحاولة بعد IntegrityError).
+"""
+
+from django.db.models import Q
+from django.template.defaultfilters import slugify
+
+SLUG_MAX_LENGTH = 255
+# مساحة محجوزة للرقم في الآخر ("-123456")
+SUFFIX_RESERVE = 8
+SLUGS_PER_QUERY = 200
+
+PROPERTY_TYPE_SLUGS = {
+    'apartment': 'apartment',
+    'villa': 'villa',
+    'land': 'land',
+    'commercial': 'commercial',
+    'chalet': 'chalet',
+    'other': 'property',
+}
+
+STATUS_SLUGS = {
+    'for_sale': 'for-sale',
+    'for_rent': 'for-rent',
+}
+
+
+def base_slug(prop):
+    """الـ slug الأساسي (من غير رقم) يحتوي على معلومات مفيدة للـ SEO."""
+    property_type = PROPERTY_TYPE_SLUGS.get(prop.property_type, 'property')
+    city = slugify(prop.city) if prop.city else 'egypt'
+
+    title = slugify(prop.title)
+    if not title:
+        # استخدام المدينة ونوع العقار والسعر لتوليد slug أساسي إذا كان العنوان فارغًا
+        title = f"{property_type}-{STATUS_SLUGS.get(prop.status, 'property')}-{city}-{int(prop.price)}"
+
+    parts = [title, property_type, city, f"{int(prop.area)}m" if prop.area else None]
+    slug = '-'.join(part for part in parts if part)
+    return slug[:SLUG_MAX_LENGTH - SUFFIX_RESERVE].strip('-')
+
+
+def _prefix_condition(bases):
+    condition = Q()
+    for base in bases:
+        condition |= Q(slug=base) | Q(slug__startswith=f'{base}-')
+    return condition
+
+
+def _next_free(base, taken):
+    """أول slug فاضي: الأساس نفسه، أو الأساس + (أكبر رقم مستخدم + 1)."""
+    if base not in taken:
+        return base
+    highest = 0
+    prefix = f'{base}-'
+    for slug in taken:
+        suffix = slug[len(prefix):] if slug.startswith(prefix) else ''
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return f'{base}-{highest + 1}'
+
+
+def allocate_slug(prop):
+    """slug فريد لعقار واحد باستعلام واحد على البادئة."""
+    base = base_slug(prop)
+    taken = set(
+        type(prop)._default_manager.filter(_prefix_condition([base]))
+        .exclude(pk=prop.pk).values_list('slug', flat=True)
+    )
+    return _next_free(base, taken)
+
+
+def allocate_slugs(properties):
+    """
+    slugs فريدة لمجموعة عقارات (بتتحط في prop.slug) بعدد ثابت من الاستعلامات،
+    والعقارات اللي ليها نفس الأساس في الدفعة بتاخد أرقام متتالية.
+    """
+    properties = list(properties)
+    if not properties:
+        return properties
+    model = type(properties[0])
+    bases = [base_slug(prop) for prop in properties]
+
+    unique_bases = sorted(set(bases))
+    taken_by_base = {base: set() for base in unique_bases}
+    for start in range(0, len(unique_bases), SLUGS_PER_QUERY):
+        chunk = unique_bases[start:start + SLUGS_PER_QUERY]
+        for slug in model._default_manager.filter(_prefix_condition(chunk)).values_list('slug', flat=True):
+            for base in chunk:
+                if slug == base or slug.startswith(f'{base}-'):
+                    taken_by_base[base].add(slug)
+
+    for prop, base in zip(properties, bases):
+        slug = _next_free(base, taken_by_base[base])
+        taken_by_base[base].add(slug)
+        prop.slug = slug
+    return properties
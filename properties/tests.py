@@ -1,3 +1,1186 @@
-from django.test import TestCase
+import json
+import csv
+import importlib
+import io
+import os
+import sys
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from inquiries.models import Inquiry
+from PIL import Image
+
+from . import cards, clusters, dedupe, favorites, derivatives, feature_index, image_metadata, image_queue
+from .exporter import export_queryset, iter_rows as export_rows
+from .facets import compute_facets
+from .features import add_features, clean_names, resolve_features
+from .filters import filter_listings
+from .geo import covering_cells, encode_geohash, within_bbox, within_radius
+from .hyperloglog import HyperLogLog
+from .image_storage import DELIVERY_URLS_VERSION, local_backend
+from . import importer as importer_module
+from .importer import ListingImporter, iter_rows
+from .result_cache import ResultCache
+from .slugs import allocate_slugs
+from .rollups import rollup_source, time_series
+from .view_counter import ViewBuffer
+from .visitors import merge_visitors, reach
+from .pagination import CachedIdsCursorPaginator, CursorPaginator, capped_count, decode_cursor, format_count
+from .models import FavoriteProperty, Feature, ImportCheckpoint, PendingPropertyImage, ListingCard, MapCluster, Property, PropertyDailyStats, PropertyDailyVisitors, PropertyImage, PropertyView, RollupWatermark
+from .utils import PLACEHOLDER_IMAGE_URL, attach_display_images
+
+User = get_user_model()
+
+
+def make_image(path, size=(64, 48), color=(200, 40, 40), **save_options):
+    """صورة فيها تدرج (عشان الـ dHash مايطلعش صفر) على نص منها لون ثابت."""
+    image = Image.new('RGB', size, color)
+    for x in range(size[0] // 2):
+        for y in range(size[1]):
+            image.putpixel((x, y), (x * 255 // size[0], y * 255 // size[1], 120))
+    image.save(path, **save_options)
+    return path
+
+
+def create_property(owner, title='شقة', **fields):
+    values = dict(
+        description='وصف', property_type='apartment', status='for_sale', price=1000000,
+        area=120, location_address='شارع 9', city='القاهرة',
+    )
+    values.update(fields)
+    return Property.objects.create(owner=owner, title=title, **values)
+
+
+class DisplayImageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+
+    def create_property(self, title, images=()):
+        prop = Property.objects.create(
+            owner=self.owner, title=title, description='وصف', property_type='apartment',
+            status='for_sale', price=1000000, area=120, location_address='شارع 9', city='القاهرة',
+        )
+        for public_id, is_main in images:
+            PropertyImage.objects.create(property=prop, image=public_id, is_main=is_main)
+        return prop
+
+    def test_main_image_preferred_over_first_image(self):
+        with_main = self.create_property('شقة 1', [('first', False), ('main', True)])
+        without_main = self.create_property('شقة 2', [('only', False), ('second', False)])
+        no_images = self.create_property('شقة 3')
+
+        properties = attach_display_images([with_main, without_main, no_images])
+
+        self.assertIn('main', properties[0].display_image_url)
+        self.assertIn('only', properties[1].display_image_url)
+        self.assertEqual(properties[2].display_image_url, PLACEHOLDER_IMAGE_URL)
+
+    def test_query_count_is_constant_regardless_of_page_size(self):
+        small_page = [self.create_property(f'صغير {i}', [(f'small{i}', i % 2 == 0)]) for i in range(2)]
+        large_page = [self.create_property(f'كبير {i}', [(f'large{i}', False), (f'main{i}', True)]) for i in range(12)]
+
+        with self.assertNumQueries(1):
+            attach_display_images(small_page)
+        with self.assertNumQueries(1):
+            attach_display_images(large_page)
+
+
+class ListingCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.buyer = User.objects.create_user(username='buyer', password='pass12345')
+
+    def test_card_follows_property_images_and_favorites(self):
+        prop = create_property(self.owner, 'شقة الكارت', price=750000)
+        card = ListingCard.objects.get(pk=prop.pk)
+        self.assertEqual((card.title, card.price, card.cover_image_url), ('شقة الكارت', 750000, ''))
+
+        PropertyImage.objects.create(property=prop, image='cover', is_main=True)
+        FavoriteProperty.objects.create(user=self.buyer, property=prop)
+        prop.price = 800000
+        prop.save()
+
+        card.refresh_from_db()
+        self.assertEqual(card.price, 800000)
+        self.assertIn('cover', card.cover_image_url)
+        self.assertEqual(card.favorites_count, 1)
+
+    def test_rebuild_cards_matches_incremental_cards(self):
+        first = create_property(self.owner, 'أولى')
+        create_property(self.owner, 'تانية', is_published=False)
+        PropertyImage.objects.create(property=first, image='first', is_main=False)
+        FavoriteProperty.objects.create(user=self.buyer, property=first)
+        expected = {card.pk: cards.serialize_card(card) for card in ListingCard.objects.all()}
+
+        self.assertEqual(cards.rebuild_cards(batch_size=1), 2)
+
+        rebuilt = {card.pk: cards.serialize_card(card) for card in ListingCard.objects.all()}
+        self.assertEqual(rebuilt, expected)
+        self.assertFalse(ListingCard.objects.get(title='تانية').is_published)
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        same_time = timezone.now()
+        for index in range(7):
+            create_property(owner, f'عقار {index}')
+        # نفس تاريخ النشر لكله عشان الترتيب يعتمد على pk كمان
+        Property.objects.update(published_date=same_time)
+        ListingCard.objects.update(published_date=same_time)
+        cls.expected = list(ListingCard.objects.order_by('-published_date', '-pk').values_list('pk', flat=True))
+
+    def walk(self, paginator):
+        pages, page = [], paginator.page()
+        while True:
+            pages.append([card.pk for card in page])
+            if not page.has_next():
+                return pages, page
+            page = paginator.page(page.next_cursor)
+
+    def test_cursor_walks_forward_and_back_without_gaps(self):
+        paginator = CursorPaginator(ListingCard.objects.all(), per_page=3)
+        pages, last = self.walk(paginator)
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+        previous = paginator.page(last.previous_cursor)
+        self.assertEqual([card.pk for card in previous], pages[1])
+
+    def test_cached_ids_paginator_matches_queryset_paginator(self):
+        paginator = CachedIdsCursorPaginator(ListingCard.objects.all(), self.expected, per_page=3)
+        pages, _last = self.walk(paginator)
+        self.assertEqual(pages, self.walk(CursorPaginator(ListingCard.objects.all(), per_page=3))[0])
+
+    def test_capped_count(self):
+        self.assertEqual(capped_count(ListingCard.objects.all(), cap=5), (5, True))
+        self.assertEqual(capped_count(ListingCard.objects.all(), cap=7), (7, False))
+        self.assertEqual(format_count(5, True), '5+')
+
+    def test_invalid_cursor_starts_from_first_page(self):
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        page = CursorPaginator(ListingCard.objects.all(), per_page=3).page('not-a-cursor')
+        self.assertEqual([card.pk for card in page], self.expected[:3])
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        # أسعار على حدود الشرائح بالظبط (10000 و 500000) وجنبها
+        for price, status in ((10000, 'for_sale'), (499999, 'for_sale'), (500000, 'for_rent'), (2000000, 'for_sale')):
+            create_property(owner, f'عقار {price}', price=price, status=status, area=150)
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, facets, name):
+        return {(bucket.get('value') or bucket['min']): bucket['count'] for bucket in facets[name]}
+
+    def test_each_facet_ignores_its_own_filter(self):
+        facets = compute_facets({'status': 'for_sale'})
+        self.assertEqual(self.counts(facets, 'status')['for_rent'], 1)
+        self.assertEqual(self.counts(facets, 'status')['for_sale'], 3)
+        self.assertEqual(self.counts(facets, 'property_type')['apartment'], 3)
+
+    def test_price_buckets_are_half_open(self):
+        prices = self.counts(compute_facets({}), 'price')
+        self.assertEqual(prices[0], 0)
+        self.assertEqual(prices[10000], 2)
+        self.assertEqual(prices[500000], 1)
+
+    def test_histogram_links_show_exactly_the_counted_listings(self):
+        # رابط كل شريحة لازم يرجع نفس العدد اللي الشريحة معروض عليها (حتى على الحدود)
+        response = self.client.get('/')
+        for bucket in response.context['price_histogram']:
+            bucket_page = self.client.get('/' + bucket['url'])
+            titles = [item['property'].title for item in bucket_page.context['properties']]
+            self.assertEqual(len(titles), bucket['count'], (bucket, titles))
+
+
+class ResultCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.cairo = create_property(cls.owner, 'شقة القاهرة', city='القاهرة')
+        cls.giza = create_property(cls.owner, 'شقة الجيزة', city='الجيزة')
+
+    def setUp(self):
+        cache.clear()
+        self.results = ResultCache()
+
+    def ids(self, params):
+        queryset = ListingCard.objects.filter(is_published=True).order_by('-published_date', '-pk')
+        return self.results.get_ids(filter_listings(queryset, params), params)
+
+    def test_repeated_search_is_served_from_cache(self):
+        self.assertEqual(self.ids({'q': 'القاهرة'}), (self.cairo.pk,))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.ids({'q': '  القاهره '}), (self.cairo.pk,))
+
+    def test_save_invalidates_only_its_city_and_unscoped_searches(self):
+        self.ids({'q': 'القاهرة'})
+        self.ids({})
+        self.giza.price = 1
+        self.giza.save()
+
+        # الجيزة اتغيرت بس، فبحث القاهرة مابيتنفذش تاني (قاموس الأماكن بس بيتحمل من جديد)
+        with CaptureQueriesContext(connection) as queries:
+            self.ids({'q': 'القاهرة'})
+        self.assertFalse([query for query in queries if 'properties_listingcard' in query['sql']])
+        newer = create_property(self.owner, 'شقة تانية', city='القاهرة')
+        self.assertEqual(set(self.ids({'q': 'القاهرة'})), {self.cairo.pk, newer.pk})
+        self.assertEqual(set(self.ids({})), {self.cairo.pk, self.giza.pk, newer.pk})
+
+
+class GeoSearchTests(TestCase):
+    # نقط على خط عرض القاهرة بمسافات معروفة من ميدان التحرير
+    CENTER = (30.0444, 31.2357)
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        now = timezone.now()
+        cls.places = {}
+        # الأبعد هو الأحدث نشراً، عشان ترتيب النشر يبقى عكس ترتيب المسافة
+        for index, (name, offset) in enumerate((('near', 0.01), ('middle', 0.03), ('far', 0.06))):
+            prop = create_property(
+                owner, name, latitude=cls.CENTER[0], longitude=cls.CENTER[1] + offset,
+            )
+            Property.objects.filter(pk=prop.pk).update(published_date=now + timedelta(minutes=index))
+            ListingCard.objects.filter(pk=prop.pk).update(published_date=now + timedelta(minutes=index))
+            cls.places[name] = prop
+        cls.outside = create_property(owner, 'الإسكندرية', latitude=31.2001, longitude=29.9187)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_encode_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(encode_geohash(None, 10), '')
+
+    def test_covering_cells_contain_every_point_of_the_box(self):
+        box = (29.9, 31.1, 30.2, 31.5)
+        cells = covering_cells(*box)
+        self.assertLessEqual(len(cells), 24)
+        for latitude in (29.9, 30.05, 30.2):
+            for longitude in (31.1, 31.3, 31.5):
+                geohash = encode_geohash(latitude, longitude)
+                self.assertTrue(any(geohash.startswith(cell) for cell in cells), (latitude, longitude))
+
+    def test_bbox_and_radius_filters(self):
+        cards = ListingCard.objects.all()
+        in_box = within_bbox(cards, 29.9, 31.1, 30.2, 31.5)
+        self.assertEqual(set(in_box.values_list('title', flat=True)), {'near', 'middle', 'far'})
+
+        queryset = within_radius(cards, *self.CENTER, 4)
+        distances = dict(queryset.values_list('title', 'distance_km'))
+        self.assertEqual(set(distances), {'near', 'middle'})
+        # 0.03 درجة طول على خط عرض 30 ≈ 2.89 كم
+        self.assertAlmostEqual(distances['middle'], 2.887, places=2)
+
+    def test_radius_filter_stays_in_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            titles = list(filter_listings(ListingCard.objects.all(), {
+                'lat': self.CENTER[0], 'lng': self.CENTER[1], 'radius': 200,
+            }).values_list('title', flat=True))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(set(titles), {'near', 'middle', 'far', 'الإسكندرية'})
+        facets = compute_facets({'lat': self.CENTER[0], 'lng': self.CENTER[1], 'radius': 4})
+        self.assertEqual(sum(bucket['count'] for bucket in facets['price']), 2)
+
+    def test_truncated_radius_results_keep_the_nearest(self):
+        params = {'lat': self.CENTER[0], 'lng': self.CENTER[1], 'radius': 20}
+        with mock.patch('properties.views.MAP_MARKERS_LIMIT', 2):
+            data = self.client.get('/api/map/listings/', params).json()
+        self.assertEqual([marker['title'] for marker in data['results']], ['near', 'middle'])
+        self.assertEqual(data['results'][0]['distance_km'], 0.96)
+        self.assertTrue(data['truncated'])
+
+
+class MapClusterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.cairo = create_property(cls.owner, 'القاهرة', latitude=30.0444, longitude=31.2357)
+        cls.giza = create_property(cls.owner, 'الجيزة', latitude=30.0131, longitude=31.2089)
+        cls.alexandria = create_property(cls.owner, 'الإسكندرية', latitude=31.2001, longitude=29.9187)
+
+    def setUp(self):
+        cache.clear()
+
+    def egypt(self, zoom):
+        tiles = clusters.bbox_tiles(zoom, 22, 25, 32, 35)
+        return [cluster for clusters_ in clusters.get_tiles(zoom, tiles).values() for cluster in clusters_]
+
+    def test_clusters_merge_nearby_points_at_low_zoom(self):
+        self.assertEqual([cluster['count'] for cluster in self.egypt(0)], [3])
+        self.assertEqual(sorted(cluster['count'] for cluster in self.egypt(7)), [1, 2])
+
+    def test_incremental_updates_match_rebuild(self):
+        self.giza.latitude = 24.0889
+        self.giza.longitude = 32.8998
+        self.giza.save()
+        self.alexandria.is_published = False
+        self.alexandria.save()
+        incremental = sorted(MapCluster.objects.values_list('zoom', 'cell_x', 'cell_y', 'count'))
+
+        self.assertEqual(clusters.rebuild_clusters(), 2)
+        self.assertEqual(sorted(MapCluster.objects.values_list('zoom', 'cell_x', 'cell_y', 'count')), incremental)
+
+    def test_huge_bbox_is_rejected_before_building_tiles(self):
+        # العالم كله على أعلى مستوى = 4.3 مليار بلاطة؛ لازم يترفض من الحدود بس
+        self.assertIsNone(clusters.bbox_tiles(clusters.MAX_ZOOM, -85, -180, 85, 180))
+        response = self.client.get('/map/clusters/', {'zoom': clusters.MAX_ZOOM, 'bbox': '-85,-180,85,180'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/map/clusters/', {'zoom': 2, 'bbox': '-85,-180,85,180'})
+        self.assertEqual(len(response.json()['tiles']), 16)
+
+
+class ViewBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.viewers = [User.objects.create_user(username=f'viewer{i}', password='pass12345') for i in range(2)]
+        cls.prop = create_property(owner)
+
+    def setUp(self):
+        # من غير thread الخلفية: الاختبار بيفضي البافر بنفسه
+        patcher = mock.patch.object(ViewBuffer, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = ViewBuffer()
+
+    def test_flush_counts_each_user_once(self):
+        for viewer in (*self.viewers, self.viewers[0]):
+            self.buffer.record(self.prop.pk, viewer.pk)
+        self.assertEqual(self.buffer.flush(), 2)
+
+        self.buffer.record(self.prop.pk, self.viewers[1].pk)
+        self.buffer.flush()
+        self.assertEqual(Property.objects.get(pk=self.prop.pk).views_count, 2)
+        self.assertEqual(ListingCard.objects.get(pk=self.prop.pk).views_count, 2)
+
+    def test_views_of_deleted_properties_are_dropped(self):
+        self.buffer.record(self.prop.pk, self.viewers[0].pk)
+        Property.objects.filter(pk=self.prop.pk).delete()
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.flush(), 0)
+
+
+class UniqueVisitorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.prop = create_property(owner)
+        cls.today = timezone.localdate()
+
+    def test_estimate_is_close_and_merge_is_a_union(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        first.update(f'visitor-{i}' for i in range(0, 6000))
+        second.update(f'visitor-{i}' for i in range(4000, 10000))
+        self.assertAlmostEqual(first.count(), 6000, delta=6000 * 0.05)
+
+        restored = HyperLogLog.from_bytes(first.to_bytes())
+        self.assertEqual(restored.registers, first.registers)
+        self.assertAlmostEqual(restored.merge(second).count(), 10000, delta=10000 * 0.05)
+
+    def test_batches_and_days_merge_without_double_counting(self):
+        yesterday = self.today - timedelta(days=1)
+        merge_visitors({(self.prop.pk, yesterday): {'a', 'b'}})
+        merge_visitors({(self.prop.pk, self.today): {'a', 'c'}})
+        merge_visitors({(self.prop.pk, self.today): {'c', 'd'}})
+        self.assertEqual(reach(self.prop.pk, days=1, today=self.today), 3)
+        self.assertEqual(reach(self.prop.pk, days=2, today=self.today), 4)
+
+    def test_concurrently_created_row_keeps_both_sketches(self):
+        # flusher تاني بيعمل صف نفس اليوم بين القراءة والـ INSERT بتاعنا
+        original_bulk_create = PropertyDailyVisitors.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            other = HyperLogLog()
+            other.update({'x', 'y'})
+            PropertyDailyVisitors.objects.create(property=self.prop, day=self.today, sketch=other.to_bytes())
+            return original_bulk_create(objs, **kwargs)
+
+        with mock.patch.object(PropertyDailyVisitors.objects, 'bulk_create', side_effect=racing_bulk_create):
+            merge_visitors({(self.prop.pk, self.today): {'a', 'b', 'c'}})
+        self.assertEqual(reach(self.prop.pk, today=self.today), 5)
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.viewers = [User.objects.create_user(username=f'viewer{i}', password='pass12345') for i in range(4)]
+        cls.prop = create_property(cls.owner)
+
+    def view(self, viewer, days_ago=0):
+        return PropertyView.objects.create(
+            property=self.prop, user=viewer, viewed_at=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def test_each_row_is_counted_once_across_runs_and_batches(self):
+        self.view(self.viewers[0], days_ago=1)
+        self.view(self.viewers[1])
+        last = self.view(self.viewers[2])
+
+        settled = timedelta(0)
+        self.assertEqual(rollup_source('views', batch_size=2, settle_delay=settled), 3)
+        self.assertEqual(RollupWatermark.objects.get(source='views').last_id, last.pk)
+        self.assertEqual(rollup_source('views', settle_delay=settled), 0)
+
+        self.view(self.viewers[3])
+        self.assertEqual(rollup_source('views', settle_delay=settled), 1)
+        stats = dict(PropertyDailyStats.objects.values_list('day', 'views'))
+        self.assertEqual(sorted(stats.values()), [1, 3])
+
+    def test_watermark_waits_behind_rows_that_may_still_be_committing(self):
+        old = self.view(self.viewers[0], days_ago=1)
+        self.view(self.viewers[1])  # لسه جديد: ممكن رقم قبله لسه ماتعملوش commit
+        self.view(self.viewers[2], days_ago=1)  # قديم بس رقمه بعد الجديد
+
+        self.assertEqual(rollup_source('views'), 1)
+        self.assertEqual(RollupWatermark.objects.get(source='views').last_id, old.pk)
+
+        later = timezone.now() + timedelta(minutes=10)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(rollup_source('views'), 2)
+        self.assertEqual(sum(PropertyDailyStats.objects.values_list('views', flat=True)), 3)
+
+    def test_time_series_fills_missing_days_with_zeros(self):
+        self.view(self.viewers[0], days_ago=2)
+        rollup_source('views')
+        series = time_series(self.owner, days=3)
+        self.assertEqual([day['views'] for day in series], [1, 0, 0])
+        self.assertEqual(series[-1]['day'], timezone.localdate().isoformat())
+
+
+class RealtorDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        other = User.objects.create_user(username='other', password='pass12345', is_realtor=True)
+        buyer = User.objects.create_user(username='buyer', password='pass12345')
+        cls.quiet = create_property(cls.owner, 'من غير استفسارات')
+        cls.busy = create_property(cls.owner, 'عليه استفسارات')
+        create_property(other, 'عقار وسيط تاني')
+        Inquiry.objects.create(inquirer=buyer, property=cls.busy, message='متاح؟')
+        Inquiry.objects.create(inquirer=buyer, property=cls.busy, message='السعر؟', reply_message='نهائي')
+
+    def test_dashboard_lists_own_listings_sorted_by_unanswered_inquiries(self):
+        self.client.force_login(self.owner)
+        with self.assertNumQueries(4):  # الجلسة + المستخدم + العدد + الصفحة
+            response = self.client.get('/my-properties/', {'sort': 'unanswered'})
+        rows = [item['property'] for item in response.context['my_properties_with_images']]
+        self.assertEqual([card.title for card in rows], ['عليه استفسارات', 'من غير استفسارات'])
+        self.assertEqual([card.unanswered_inquiries for card in rows], [1, 0])
+        self.assertIsNotNone(rows[0].last_inquiry_at)
+
+
+class DirtyFieldSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.prop = create_property(cls.owner, 'شقة للتعديل')
+
+    def test_save_writes_only_changed_columns(self):
+        prop = Property.objects.get(pk=self.prop.pk)
+        Property.objects.filter(pk=prop.pk).update(views_count=40, description='وصف من مكان تاني')
+        prop.price = 900000
+        self.assertEqual(set(prop.get_dirty_fields()), {'price'})
+        prop.save()
+
+        prop.refresh_from_db()
+        self.assertEqual(prop.price, 900000)
+        self.assertEqual(prop.views_count, 40)
+        self.assertEqual(prop.description, 'وصف من مكان تاني')
+        self.assertEqual(prop.get_dirty_fields(), {})
+
+    def test_assigned_deferred_field_is_saved(self):
+        prop = Property.objects.only('pk', 'slug').get(pk=self.prop.pk)
+        prop.city = 'الإسكندرية'
+        prop.save()
+
+        self.assertEqual(Property.objects.get(pk=self.prop.pk).city, 'الإسكندرية')
+        self.assertEqual(ListingCard.objects.get(property_id=self.prop.pk).city, 'الإسكندرية')
+
+    def test_title_change_regenerates_slug(self):
+        prop = Property.objects.get(pk=self.prop.pk)
+        old_slug = prop.slug
+        prop.title = 'New Villa'
+        prop.save()
+        self.assertNotEqual(prop.slug, old_slug)
+        self.assertEqual(Property.objects.get(pk=prop.pk).slug, prop.slug)
+
+
+class SlugAllocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+
+    def test_same_title_gets_next_free_suffix(self):
+        first = create_property(self.owner, 'Sea View')
+        second = create_property(self.owner, 'Sea View')
+        Property.objects.filter(pk=second.pk).update(slug=f'{first.slug}-7')
+        third = create_property(self.owner, 'Sea View')
+
+        self.assertEqual(third.slug, f'{first.slug}-8')
+
+    def test_batch_allocation_is_unique_with_constant_queries(self):
+        existing = create_property(self.owner, 'Garden')
+        batch = [
+            Property(owner=self.owner, title=title, property_type='apartment', status='for_sale',
+                     price=1000000, area=120, city='القاهرة')
+            for title in ['Garden', 'Garden', 'Roof', 'Roof', 'Garden']
+        ]
+        with self.assertNumQueries(1):
+            allocate_slugs(batch)
+        slugs = [prop.slug for prop in batch]
+        self.assertEqual(len(set(slugs) | {existing.slug}), 6)
+        self.assertEqual(slugs[:2], [f'{existing.slug}-1', f'{existing.slug}-2'])
+
+
+class ListingImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'listings.jsonl')
+        self.checkpoint = 'listings.jsonl'
+        self.errors = f'{self.path}.errors.jsonl'
+
+    def row(self, title, **fields):
+        values = dict(
+            title=title, description='وصف', property_type='apartment', status='for_sale',
+            price=1000000, area=120, bedrooms=3, bathrooms=2, location_address='شارع 9', city='القاهرة',
+        )
+        values.update(fields)
+        return json.dumps(values, ensure_ascii=False)
+
+    def run_import(self, lines, batch_size=2):
+        with open(self.path, 'w', encoding='utf-8') as handle:
+            handle.write('\n'.join(lines) + '\n')
+        importer = ListingImporter(
+            owner=self.owner, batch_size=batch_size, checkpoint_key=self.checkpoint, errors_path=self.errors,
+        )
+        importer.run(iter_rows(self.path))
+        return importer
+
+    def error_lines(self):
+        with open(self.errors, encoding='utf-8') as handle:
+            return [json.loads(line) for line in handle]
+
+    def test_malformed_and_non_object_lines_are_recorded_and_skipped(self):
+        importer = self.run_import([
+            self.row('Row 1'), '{"title": "broken', '[1, 2]', self.row('Row 4'), self.row('Row 5', price=''),
+        ])
+
+        self.assertEqual(importer.imported, 2)
+        self.assertEqual(importer.invalid, 3)
+        self.assertEqual(importer.rows_done, 5)
+        self.assertEqual(sorted(Property.objects.values_list('title', flat=True)), ['Row 1', 'Row 4'])
+        errors = self.error_lines()
+        self.assertEqual([error['line'] for error in errors], [2, 3, 5])
+        self.assertEqual(errors[0]['text'], '{"title": "broken')
+        self.assertEqual(errors[1]['errors']['__all__'][0]['code'], 'type')
+        self.assertIn('price', errors[2]['errors'])
+
+    def test_resumes_after_checkpoint(self):
+        lines = [self.row(f'Row {number}') for number in range(1, 6)]
+        ImportCheckpoint.objects.create(key=self.checkpoint, rows_done=2, imported=2)
+
+        importer = self.run_import(lines)
+
+        self.assertEqual(sorted(Property.objects.values_list('title', flat=True)), ['Row 3', 'Row 4', 'Row 5'])
+        self.assertEqual((importer.imported, importer.resumed_imported), (5, 2))
+        self.assertEqual(ImportCheckpoint.objects.get(key=self.checkpoint).rows_done, 5)
+        self.assertEqual(ListingCard.objects.count(), 3)
+        self.assertEqual(len({slug for slug in Property.objects.values_list('slug', flat=True)}), 3)
+
+    def test_crashed_batch_is_rolled_back_with_its_progress(self):
+        lines = [self.row(f'Row {number}', images='https://example.com/a.jpg') for number in range(1, 6)]
+        index_properties = importer_module.search.index_properties
+        calls = []
+
+        def crash_on_second_batch(properties):
+            calls.append(len(properties))
+            if len(calls) == 2:
+                raise OSError('killed')
+            return index_properties(properties)
+
+        with mock.patch.object(importer_module, 'enqueue_image') as enqueue_image:
+            with mock.patch.object(importer_module.search, 'index_properties', side_effect=crash_on_second_batch):
+                with self.assertRaises(OSError):
+                    self.run_import(lines)
+            self.assertEqual(ImportCheckpoint.objects.get(key=self.checkpoint).rows_done, 2)
+            self.assertEqual(Property.objects.count(), 2)
+
+            importer = self.run_import(lines)
+
+        self.assertEqual(importer.imported, 5)
+        self.assertEqual(Property.objects.count(), 5)
+        self.assertEqual(enqueue_image.call_count, 5)
+        self.assertEqual(ImportCheckpoint.objects.get(key=self.checkpoint).images_queued, 5)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        other = User.objects.create_user(username='other', password='pass12345', is_realtor=True)
+        garden = Feature.objects.create(name='حديقة')
+        pool = Feature.objects.create(name='مسبح')
+        cls.published = create_property(cls.owner, 'شقة منشورة', price=500000)
+        cls.published.features.add(garden, pool)
+        cls.draft = create_property(cls.owner, 'شقة مسودة', is_published=False)
+        create_property(other, 'عقار وسيط تاني')
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def download(self, fmt, **params):
+        response = self.client.get('/api/export/listings/', {'format': fmt, **params})
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_has_bom_header_and_only_own_listings(self):
+        response, content = self.download('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.DictReader(io.StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual([row['title'] for row in rows], ['شقة منشورة', 'شقة مسودة'])
+        self.assertEqual(rows[0]['features'], 'حديقة, مسبح')
+        self.assertEqual(rows[1]['is_published'], 'False')
+
+    def test_jsonl_follows_listing_filters(self):
+        response, content = self.download('jsonl', max_price=600000)
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.published.pk])
+        self.assertEqual(rows[0]['price'], '500000.00')
+        self.assertEqual(sorted(rows[0]['features']), ['حديقة', 'مسبح'])
+
+    def test_parquet_without_pyarrow_is_a_bad_request(self):
+        with mock.patch.dict(sys.modules, {'pyarrow': None}):
+            response = self.client.get('/api/export/listings/', {'format': 'parquet'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pyarrow', response.json()['error'])
+
+    def test_rows_use_constant_queries(self):
+        for number in range(5):
+            prop = create_property(self.owner, f'إضافي {number}')
+            PropertyImage.objects.create(property=prop, image=f'extra{number}', is_main=True)
+        queryset = export_queryset({}, owner=self.owner)
+        with self.assertNumQueries(3):  # العقارات + المميزات + الصور
+            rows = list(export_rows(queryset))
+        self.assertEqual(len(rows), 7)
+
+
+class ImageQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.prop = create_property(cls.owner)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        spool = override_settings(PROPERTY_IMAGE_SPOOL_DIR=os.path.join(self.directory, 'spool'))
+        spool.enable()
+        self.addCleanup(spool.disable)
+
+    def enqueue(self, source=None, **extra):
+        source = source or make_image(os.path.join(self.directory, 'photo.png'))
+        job_id = image_queue.enqueue_image(self.prop.pk, source, is_main=True, **extra)
+        return job_id, image_queue.job_path(job_id)
+
+    def test_job_is_claimed_once(self):
+        _job_id, path = self.enqueue()
+        claimed = image_queue.claim_job(path)
+        self.assertEqual(os.path.dirname(claimed), image_queue.spool_dir(image_queue.UPLOADING))
+        self.assertIsNone(image_queue.claim_job(path))
+        self.assertEqual(image_queue.pending_jobs(), [])
+
+    def test_requeue_stale_returns_only_old_claims(self):
+        _job_id, old = self.enqueue()
+        _job_id, fresh = self.enqueue()
+        old_claim = image_queue.claim_job(old)
+        image_queue.claim_job(fresh)
+        hour_ago = timezone.now().timestamp() - 7200
+        os.utime(old_claim, (hour_ago, hour_ago))
+
+        self.assertEqual(image_queue.requeue_stale(max_age=3600), 1)
+        self.assertEqual(image_queue.pending_jobs(), [old])
+
+    def test_uploader_start_recovers_stale_and_pending_jobs(self):
+        _job_id, stale = self.enqueue()
+        _job_id, waiting = self.enqueue()
+        _job_id, active = self.enqueue()
+        stale_claim = image_queue.claim_job(stale)
+        active_claim = image_queue.claim_job(active)
+        hour_ago = timezone.now().timestamp() - 3600
+        os.utime(stale_claim, (hour_ago, hour_ago))
+
+        uploader = image_queue.ImageUploader(max_workers=1)
+        with mock.patch.object(uploader, 'submit') as submit, override_settings(PROPERTY_IMAGE_STALE_AFTER=600):
+            uploader.start()
+            uploader._executor.shutdown(wait=True)
+
+        self.assertEqual(sorted(call.args[0] for call in submit.call_args_list), sorted([stale, waiting]))
+        self.assertTrue(os.path.exists(active_claim))
+
+    def test_successful_job_creates_image_with_metadata(self):
+        job_id, path = self.enqueue()
+        PendingPropertyImage.objects.create(property=self.prop, job_id=job_id, file_name='photo.png', is_main=True)
+        with mock.patch.object(image_queue, 'upload', return_value='sample/photo') as upload:
+            image = image_queue.process_job(image_queue.claim_job(path))
+
+        upload.assert_called_once()
+        image.refresh_from_db()
+        self.assertEqual((image.image.public_id, image.width, image.height), ('sample/photo', 64, 48))
+        self.assertIsNotNone(image.phash)
+        self.assertTrue(image.placeholder.startswith('data:image/webp;base64,'))
+        self.assertFalse(PendingPropertyImage.objects.exists())
+        self.assertEqual(os.listdir(image_queue.spool_dir(image_queue.UPLOADING)), [])
+
+    def test_failed_upload_moves_job_to_failed(self):
+        job_id, path = self.enqueue()
+        PendingPropertyImage.objects.create(property=self.prop, job_id=job_id, file_name='photo.png')
+        with mock.patch.object(image_queue, 'upload', side_effect=OSError('connection reset')), \
+                self.assertLogs('properties.image_queue', 'WARNING'):
+            self.assertEqual(image_queue.drain(), (0, 1))
+
+        pending = PendingPropertyImage.objects.get(job_id=job_id)
+        self.assertEqual((pending.status, pending.error), (PendingPropertyImage.FAILED, 'connection reset'))
+        with open(image_queue.job_path(job_id, image_queue.FAILED), encoding='utf-8') as handle:
+            self.assertEqual(json.load(handle)['error'], 'connection reset')
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(PropertyImage.objects.exists())
+
+
+class DerivativeTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        storage = override_settings(
+            PROPERTY_IMAGE_BACKEND='local', PROPERTY_IMAGE_LOCAL_ROOT=os.path.join(self.directory, 'images'),
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+    def test_generate_downscales_but_never_upscales(self):
+        original = make_image(os.path.join(self.directory, 'wide.jpg'), size=(1000, 500))
+        output = os.path.join(self.directory, 'derived')
+        written = derivatives.generate(original, output, widths=(400, 1200), formats=('webp',))
+
+        self.assertEqual(sorted(written), ['1200.webp', '400.webp'])
+        with Image.open(os.path.join(output, '400.webp')) as image:
+            self.assertEqual(image.size, (400, 200))
+        with Image.open(os.path.join(output, '1200.webp')) as image:
+            self.assertEqual(image.size, (1000, 500))
+        self.assertFalse([name for name in os.listdir(output) if name.endswith('.tmp')])
+
+    def test_local_save_is_content_addressed(self):
+        first = make_image(os.path.join(self.directory, 'a.png'))
+        copy = os.path.join(self.directory, 'b.png')
+        with open(first, 'rb') as source, open(copy, 'wb') as target:
+            target.write(source.read())
+        with mock.patch.object(local_backend, 'generate_async') as generate_async:
+            value = local_backend.save(first)
+            self.assertEqual(local_backend.save(copy), value)
+
+        generate_async.assert_called_once()
+        self.assertTrue(value.startswith('local/') and value.endswith('.png'))
+        digest, extension = local_backend.split(value)
+        self.assertTrue(os.path.exists(local_backend.path(local_backend.original_name(digest, extension))))
+
+    def test_missing_derivative_is_generated_on_request(self):
+        with mock.patch.object(local_backend, 'generate_async'):
+            value = local_backend.save(make_image(os.path.join(self.directory, 'photo.png'), size=(900, 600)))
+        url = local_backend.optimized_url(value, 400)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (400, 267))
+        self.assertEqual(self.client.get(url.replace('/400.webp', '/401.webp')).status_code, 404)
+
+
+class DuplicateImageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.prop = create_property(cls.owner)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        spool = override_settings(PROPERTY_IMAGE_SPOOL_DIR=os.path.join(self.directory, 'spool'))
+        spool.enable()
+        self.addCleanup(spool.disable)
+
+    def stored_image(self, value, prop=None, **fields):
+        return PropertyImage.objects.create(
+            property=prop or self.prop, image='stored/photo', **dedupe.hash_fields(value), **fields,
+        )
+
+    def process(self, path):
+        job_id = image_queue.enqueue_image(self.prop.pk, path)
+        with mock.patch.object(image_queue, 'upload', return_value='uploaded/photo') as upload:
+            image = image_queue.process_job(image_queue.claim_job(image_queue.job_path(job_id)))
+        return image, upload
+
+    def test_find_duplicate_respects_max_distance(self):
+        value = 0x0123456789ABCDEF
+        original = self.stored_image(value, width=320, height=240)
+        near = value ^ 0b111  # 3 بت مختلفين
+        far = value ^ 0b1111
+
+        self.assertEqual(dedupe.hamming(value, near), 3)
+        self.assertEqual(dedupe.find_duplicate(near, self.owner.pk), original)
+        self.assertEqual(dedupe.find_duplicate(near, self.owner.pk, size=(160, 120)), original)
+        self.assertIsNone(dedupe.find_duplicate(near, self.owner.pk, size=(320, 320)))
+        self.assertIsNone(dedupe.find_duplicate(far, self.owner.pk))
+        self.assertIsNone(dedupe.find_duplicate(value, self.owner.pk, before=original.pk))
+        self.assertEqual(dedupe.to_unsigned(dedupe.to_signed(1 << 63 | 5)), 1 << 63 | 5)
+
+    def test_low_entropy_hashes_are_never_matched(self):
+        self.stored_image(0b1)
+        self.assertFalse(dedupe.informative(0b1))
+        self.assertIsNone(dedupe.find_duplicate(0b1, self.owner.pk))
+
+    def test_different_near_uniform_images_do_not_collapse(self):
+        paths = []
+        for name, box in (('first.png', (10, 10, 20, 20)), ('second.png', (150, 100, 158, 106))):
+            image = Image.new('RGB', (320, 240), (255, 255, 255))
+            image.paste((0, 0, 0), box)
+            image.save(os.path.join(self.directory, name))
+            paths.append(os.path.join(self.directory, name))
+        self.stored_image(dedupe.hash_source(paths[0]), width=320, height=240)
+
+        image, upload = self.process(paths[1])
+        upload.assert_called_once()
+        self.assertEqual(str(image.image), 'uploaded/photo')
+
+    def test_other_owners_image_is_not_reused(self):
+        other = User.objects.create_user(username='other', password='pass12345', is_realtor=True)
+        path = make_image(os.path.join(self.directory, 'photo.png'), size=(320, 240))
+        self.stored_image(dedupe.hash_source(path), prop=create_property(other), width=320, height=240)
+
+        image, upload = self.process(path)
+        upload.assert_called_once()
+        self.assertEqual(str(image.image), 'uploaded/photo')
+
+    def test_recompressed_upload_reuses_file_and_metadata(self):
+        png = make_image(os.path.join(self.directory, 'photo.png'), size=(320, 240))
+        jpeg = os.path.join(self.directory, 'download_2.jfif')
+        with Image.open(png) as image:
+            image.resize((160, 120)).save(jpeg, 'JPEG', quality=60)
+        original = self.stored_image(
+            dedupe.hash_source(png), width=320, height=240, dominant_color='#c82828', placeholder='data:image/webp;base64,AA',
+        )
+
+        job_id = image_queue.enqueue_image(self.prop.pk, jpeg)
+        with mock.patch.object(image_queue, 'upload') as upload, \
+                mock.patch.object(image_queue, 'open_source', wraps=image_queue.open_source) as open_source:
+            image = image_queue.process_job(image_queue.claim_job(image_queue.job_path(job_id)))
+
+        upload.assert_not_called()
+        open_source.assert_called_once_with(jpeg)
+        self.assertEqual(str(image.image), str(original.image))
+        self.assertEqual(
+            (image.width, image.height, image.dominant_color, image.placeholder),
+            (320, 240, '#c82828', 'data:image/webp;base64,AA'),
+        )
+
+
+class DeliveryUrlTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.prop = create_property(cls.owner)
+
+    def test_urls_are_computed_once_and_refreshed_when_image_changes(self):
+        image = PropertyImage.objects.create(property=self.prop, image='sample/first')
+        self.assertEqual(image.delivery_urls['v'], DELIVERY_URLS_VERSION)
+        self.assertIn('sample/first', image.delivery_urls['card'])
+
+        image = PropertyImage.objects.get(pk=image.pk)
+        with mock.patch('properties.image_storage.delivery_urls') as delivery_urls:
+            image.is_main = True
+            image.save()
+            self.assertIn('sample/first', image.get_delivery_url('gallery'))
+        delivery_urls.assert_not_called()
+
+        image.image = 'sample/second'
+        image.save(update_fields=['image'])
+        stored = PropertyImage.objects.get(pk=image.pk).delivery_urls
+        self.assertIn('sample/second', stored['card'])
+        self.assertNotIn('sample/first', stored['srcset'])
+
+    def test_outdated_version_is_recomputed_on_save(self):
+        image = PropertyImage.objects.create(property=self.prop, image='sample/photo')
+        PropertyImage.objects.filter(pk=image.pk).update(delivery_urls={'v': DELIVERY_URLS_VERSION - 1})
+        image = PropertyImage.objects.get(pk=image.pk)
+        self.assertTrue(image.delivery_urls_stale())
+        image.save(update_fields=['is_main'])
+        self.assertEqual(PropertyImage.objects.get(pk=image.pk).delivery_urls['v'], DELIVERY_URLS_VERSION)
+
+    def test_migration_backfills_existing_images(self):
+        migration = importlib.import_module('properties.migrations.0025_property_image_delivery_urls')
+        image = PropertyImage.objects.create(property=self.prop, image='sample/photo', is_main=True)
+        PropertyImage.objects.filter(pk=image.pk).update(delivery_urls={})
+
+        migration.populate_delivery_urls(apps, mock.Mock(connection=connection))
+
+        self.assertIn('sample/photo', PropertyImage.objects.get(pk=image.pk).delivery_urls['gallery'])
+        response = self.client.get(self.prop.get_absolute_url())
+        self.assertNotContains(response, 'src=""')
+        self.assertNotIn('main_image', response.context)
+
+    def test_local_images_use_derivative_urls(self):
+        digest = 'ab' * 32
+        image = PropertyImage.objects.create(property=self.prop, image=f'local/{digest}.jpg')
+        self.assertEqual(image.delivery_urls['original'], f'/images/originals/ab/{digest}.jpg')
+        self.assertEqual(image.delivery_urls['card'], f'/images/derived/ab/{digest}/800.webp')
+        self.assertEqual(image.delivery_urls['og'], image.delivery_urls['original'])
+
+
+class ImageMetadataTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_rotated_photo_reports_display_size(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # متلفة 90 درجة
+        path = make_image(os.path.join(self.directory, 'portrait.jpg'), size=(300, 200), exif=exif)
+        metadata = image_metadata.analyze(path)
+        self.assertEqual((metadata['width'], metadata['height']), (200, 300))
+
+    def test_dominant_color_and_tiny_placeholder(self):
+        path = os.path.join(self.directory, 'flat.png')
+        image = Image.new('RGB', (400, 300), (20, 90, 200))
+        image.paste((250, 250, 250), (0, 0, 80, 60))
+        image.save(path)
+
+        metadata = image_metadata.analyze(path)
+        self.assertEqual(metadata['dominant_color'], '#145ac8')
+        self.assertTrue(metadata['placeholder'].startswith('data:image/webp;base64,'))
+        self.assertLess(len(metadata['placeholder']), 1000)
+
+    def test_unreadable_source_has_no_metadata(self):
+        path = os.path.join(self.directory, 'notes.jpg')
+        with open(path, 'w') as handle:
+            handle.write('not an image')
+        self.assertEqual(image_metadata.analyze(path), {})
+
+    def test_card_carries_cover_placeholder(self):
+        owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        prop = create_property(owner)
+        PropertyImage.objects.create(
+            property=prop, image='sample/photo', is_main=True, width=800, height=600,
+            dominant_color='#145ac8', placeholder='data:image/webp;base64,AA',
+        )
+        card = ListingCard.objects.get(property_id=prop.pk)
+        self.assertEqual((card.cover_color, card.cover_placeholder), ('#145ac8', 'data:image/webp;base64,AA'))
+
+
+class FeatureFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.garden = Feature.objects.create(name='حديقة')
+        cls.pool = Feature.objects.create(name='مسبح')
+        cls.both = create_property(cls.owner, 'فيها الاتنين')
+        cls.both.features.add(cls.garden, cls.pool)
+        cls.garden_only = create_property(cls.owner, 'حديقة بس')
+        cls.garden_only.features.add(cls.garden)
+        create_property(cls.owner, 'من غير مميزات')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bitmap_round_trip(self):
+        ids = [1, 7, 8, 63, 64, 1000]
+        self.assertEqual(feature_index.bitmap_ids(feature_index.ids_bitmap(ids)), ids)
+        self.assertEqual(feature_index.ids_bitmap([]), 0)
+        self.assertEqual(feature_index.parse_feature_ids({'features': '5, 2,x,5'}), [2, 5])
+
+    def test_and_of_features_uses_cached_bitmaps(self):
+        ids = [self.garden.pk, self.pool.pk]
+        self.assertEqual(feature_index.matching_property_ids(ids), [self.both.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                feature_index.matching_property_ids([self.garden.pk]), [self.both.pk, self.garden_only.pk],
+            )
+
+    def test_m2m_change_invalidates_bitmap(self):
+        ids = [self.garden.pk, self.pool.pk]
+        feature_index.matching_property_ids(ids)
+        self.garden_only.features.add(self.pool)
+        self.assertEqual(feature_index.matching_property_ids(ids), [self.both.pk, self.garden_only.pk])
+        self.both.features.remove(self.garden)
+        self.assertEqual(feature_index.matching_property_ids(ids), [self.garden_only.pk])
+
+    def test_list_view_filters_by_all_selected_features(self):
+        response = self.client.get('/', {'features': [self.garden.pk, self.pool.pk]})
+        titles = [item['property'].title for item in response.context['properties']]
+        self.assertEqual(titles, ['فيها الاتنين'])
+        self.assertEqual(response.context['selected_features'], [self.garden.pk, self.pool.pk])
+        self.assertContains(response, f'value="{self.pool.pk}" checked')
+
+
+    def test_common_features_filter_through_a_subquery(self):
+        params = {'features': [self.garden.pk, self.pool.pk]}
+        with mock.patch.object(feature_index, 'MAX_PK_IN', 0):
+            queryset = filter_listings(ListingCard.objects.all(), params)
+            self.assertIn('COUNT', str(queryset.query).upper())
+            self.assertEqual([card.title for card in queryset], ['فيها الاتنين'])
+        with mock.patch.object(feature_index, 'MAX_PK_IN', 1):
+            queryset = filter_listings(ListingCard.objects.all(), {'features': [self.garden.pk]})
+            self.assertEqual(sorted(card.title for card in queryset), ['حديقة بس', 'فيها الاتنين'])
+
+
+class FeatureNameTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.security = Feature.objects.create(name='أمن 24 ساعة')
+
+    def test_spelling_variants_collapse_to_one_name(self):
+        cleaned = clean_names('أمن  24 ساعة، امن 24 ساعه,Pool , pool,')
+        self.assertEqual(list(cleaned.values()), ['أمن 24 ساعة', 'Pool'])
+
+    def test_resolve_reuses_existing_features_with_constant_queries(self):
+        with self.assertNumQueries(2):
+            few = resolve_features(['امن 24 ساعه', 'مسبح'])
+        with self.assertNumQueries(2):
+            many = resolve_features([f'ميزة {number}' for number in range(30)] + ['مسبح'])
+
+        self.assertEqual(few['امن 24 ساعه'], self.security)
+        self.assertEqual(many['مسبح'], few['مسبح'])
+        self.assertEqual(Feature.objects.count(), 32)
+
+    def test_model_validation_rejects_normalized_duplicate(self):
+        with self.assertRaises(ValidationError):
+            Feature(name='امن 24 ساعه').full_clean()
+
+    def test_add_features_links_and_invalidates_bitmaps(self):
+        prop = create_property(self.owner)
+        self.assertEqual(feature_index.matching_property_ids([self.security.pk]), [])
+        with mock.patch('properties.result_cache.invalidate') as invalidate_results, \
+                mock.patch('properties.facets.invalidate') as invalidate_facets:
+            with self.captureOnCommitCallbacks() as callbacks:
+                add_features(prop, 'امن 24 ساعه، جراج')
+            invalidate_results.assert_not_called()
+            invalidate_facets.assert_not_called()
+            for callback in callbacks:
+                callback()
+        invalidate_results.assert_called_once_with(cities=[prop.city_normalized])
+        invalidate_facets.assert_called_once_with()
+        self.assertEqual(feature_index.matching_property_ids([self.security.pk]), [prop.pk])
+        self.assertEqual(sorted(prop.features.values_list('name', flat=True)), ['أمن 24 ساعة', 'جراج'])
+
+    def test_migration_merges_variants_into_oldest_feature(self):
+        migration = importlib.import_module('properties.migrations.0027_feature_name_normalized')
+        variant = Feature.objects.bulk_create([Feature(name='امن 24 ساعه', name_normalized='قديم')])[0]
+        Feature.objects.filter(pk=self.security.pk).update(name_normalized='')
+        first = create_property(self.owner, 'أول')
+        second = create_property(self.owner, 'تاني')
+        first.features.add(variant)
+        second.features.add(self.security, variant)
+
+        migration.populate_name_normalized(apps, mock.Mock(connection=connection))
+
+        self.assertEqual(list(Feature.objects.values_list('pk', flat=True)), [self.security.pk])
+        self.assertEqual(Feature.objects.get().name_normalized, 'امن 24 ساعه')
+        self.assertEqual(sorted(self.security.properties.values_list('title', flat=True)), ['أول', 'تاني'])
+
+
+class FavoriteToggleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='realtor', password='pass12345', is_realtor=True)
+        cls.buyer = User.objects.create_user(username='buyer', password='pass12345')
+        cls.prop = create_property(cls.owner)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.buyer)
+
+    def toggle(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/favorite/{self.prop.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['is_favorite']
+
+    def favorites_count(self):
+        return ListingCard.objects.get(property_id=self.prop.pk).favorites_count
+
+    def test_toggle_updates_row_card_and_cached_set(self):
+        self.assertTrue(self.toggle())
+        self.assertTrue(FavoriteProperty.objects.filter(user=self.buyer, property=self.prop).exists())
+        self.assertEqual(self.favorites_count(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(favorites.favorite_ids(self.buyer), {self.prop.pk})
+
+        self.assertFalse(self.toggle())
+        self.assertFalse(FavoriteProperty.objects.exists())
+        self.assertEqual(self.favorites_count(), 0)
+        self.assertEqual(favorites.favorite_ids(self.buyer), frozenset())
+
+    def test_stale_cached_set_falls_back_to_the_other_statement(self):
+        favorites.favorite_ids(self.buyer)  # set فاضي في الكاش
+        FavoriteProperty.objects.bulk_create([FavoriteProperty(user=self.buyer, property=self.prop)])
+
+        self.assertFalse(self.toggle())
+        self.assertFalse(FavoriteProperty.objects.exists())
+        self.assertEqual(favorites.favorite_ids(self.buyer), frozenset())
+        self.assertEqual(self.favorites_count(), 0)
+
+        cache.set(favorites.FAVORITES_CACHE_KEY.format(self.buyer.pk), frozenset({self.prop.pk}))
+        self.assertTrue(self.toggle())
+        self.assertTrue(FavoriteProperty.objects.exists())
+
+    def test_realtor_is_rejected_before_any_query(self):
+        self.client.force_login(self.owner)
+        with self.assertNumQueries(2):  # الجلسة + المستخدم
+            response = self.client.post(f'/favorite/{self.prop.pk}/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_list_marks_favorites_from_cached_set(self):
+        FavoriteProperty.objects.create(user=self.buyer, property=self.prop)
+        response = self.client.get('/')
+        self.assertEqual([item['is_favorite'] for item in response.context['properties']], [True])
+
+
+class FavoriteMissingPropertyTests(TransactionTestCase):
+    def test_missing_property_is_not_found(self):
+        buyer = User.objects.create_user(username='buyer', password='pass12345')
+        self.client.force_login(buyer)
+        response = self.client.post('/favorite/999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(FavoriteProperty.objects.exists())
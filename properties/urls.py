@@ -30,6 +30,14 @@ urlpatterns = [
     path('favorites/', views.favorite_list, name='favorite_list'),
     path('favorite/<int:pk>/', views.add_remove_favorite, name='add_remove_favorite'),
     path('owner/<str:username>/', views.OwnerPropertyListView.as_view(), name='owner_properties'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
+    path('api/listings/', views.listings_api, name='listings_api'),
+    path('api/map/listings/', views.map_listings_api, name='map_listings_api'),
+    path('map/clusters/', views.map_clusters, name='map_clusters'),
+    path('api/properties/<int:pk>/reach/', views.property_reach_api, name='property_reach_api'),
+    path('api/dashboard/stats/', views.dashboard_stats_api, name='dashboard_stats_api'),
+    path('api/export/listings/', views.export_listings, name='export_listings'),
+    path('images/<path:path>', views.local_image, name='local_image'),
 
     # الروابط القديمة بالـ ID
     path('id/<int:pk>/', PropertyDetailView.as_view(), name='property_detail_by_id'),
@@ -0,0 +1,43 @@
+# properties/utils.py
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import PropertyImage
+
+# الصورة الافتراضية لو العقار مفيهوش صور
+PLACEHOLDER_IMAGE_URL = "https://placehold.co/600x336/E5E7EB/4B5563?text=لا+توجد+صورة"
+
+
+def get_cover_images(properties):
+    """
+    بيرجع dict من id العقار لصورة الغلاف بتاعته (الصورة الرئيسية، ولو مفيش فأول صورة).
+    كل الصور بتتجاب في استعلام واحد مهما كان عدد العقارات.
+    """
+    property_ids = [prop.pk for prop in properties]
+    if not property_ids:
+        return {}
+
+    cover_images = (
+        PropertyImage.objects.filter(property_id__in=property_ids)
+        .annotate(cover_rank=Window(
+            RowNumber(),
+            partition_by=F('property_id'),
+            order_by=[F('is_main').desc(), F('id').asc()],
+        ))
+        .filter(cover_rank=1)
+    )
+    return {image.property_id: image for image in cover_images}
+
+
+def attach_display_images(properties, placeholder=PLACEHOLDER_IMAGE_URL):
+    """
+    بيحط على كل عقار خاصية ``display_image_url`` (رابط صورة الغلاف أو الصورة الافتراضية)
+    وبيرجع نفس العقارات في list.
+    """
+    properties = list(properties)
+    cover_images = get_cover_images(properties)
+    for prop in properties:
+        cover = cover_images.get(prop.pk)
+        prop.display_image_url = cover.get_delivery_url('card') if cover else placeholder
+    return properties
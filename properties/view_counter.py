@@ -0,0 +1,139 @@
+# properties/view_counter.py
+
+"""
+عد مشاهدات العقارات على دفعات.
+
+صفحة العقار مابتكتبش في قاعدة البيانات: record_view بتضيف (العقار، المستخدم) ومفتاح الزائر
+لبافر في الذاكرة وبس. thread في الخلفية (flusher) بيفضي البافر كل FLUSH_INTERVAL ثانية (أو أول ما
+يوصل MAX_BUFFER) في خطوات ثابتة العدد مهما كان حجم الدفعة:
+
+1. bulk_create لصفوف PropertyView (الصف المكرر بيتهمل، فالمستخدم بيتعد مرة واحدة).
+2. UPDATE واحد لعمود Property.views_count للعقارات اللي اتشافت = عدد صفوفها في PropertyView.
+3. UPDATE واحد لنفس العمود في ListingCard.
+4. دمج الزوار (مسجلين ومجهولين) في sketches الزوار الفريدين لكل يوم (visitors.py).
+
+البافر بيتفضى كمان عند قفل البروسيس (atexit).
+"""
+
+import atexit
+import logging
+import threading
+
+from django.db import connections, transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ListingCard, Property, PropertyView
+from .visitors import merge_visitors
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 5
+MAX_BUFFER = 1000
+
+
+def _views_count_subquery():
+    return Coalesce(Subquery(
+        PropertyView.objects.filter(property_id=OuterRef('pk'))
+        .values('property_id').annotate(total=Count('pk')).values('total')[:1]
+    ), Value(0))
+
+
+def refresh_views_counts(property_ids):
+    """إعادة حساب views_count للعقارات دي (وكروتها) من PropertyView."""
+    property_ids = list(property_ids)
+    if not property_ids:
+        return
+    Property.objects.filter(pk__in=property_ids).update(views_count=_views_count_subquery())
+    ListingCard.objects.filter(pk__in=property_ids).update(
+        views_count=Subquery(Property.objects.filter(pk=OuterRef('pk')).values('views_count')[:1])
+    )
+
+
+class ViewBuffer:
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_buffer=MAX_BUFFER):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        # (property_id, user_id) -> أول وقت مشاهدة في الدفعة
+        self._pending = {}
+        # (property_id, day) -> مفاتيح الزوار
+        self._visitors = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def record(self, property_id, user_id=None, visitor=None):
+        now = timezone.now()
+        with self._lock:
+            if user_id:
+                self._pending.setdefault((property_id, user_id), now)
+            if visitor:
+                self._visitors.setdefault((property_id, timezone.localdate(now)), set()).add(visitor)
+            size = len(self._pending) + len(self._visitors)
+            self._ensure_thread()
+        if size >= self.max_buffer:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='property-view-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush property views")
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """كتابة المشاهدات المتجمعة. بيرجع عدد المشاهدات اللي اتكتبت في الدفعة."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            visitors, self._visitors = self._visitors, {}
+        if not pending and not visitors:
+            return 0
+        # العقارات اللي اتحذفت من ساعة المشاهدة بتتشال من الدفعة
+        existing = set(
+            Property.objects.filter(pk__in={key[0] for key in [*pending, *visitors]})
+            .values_list('pk', flat=True)
+        )
+        pending = {key: viewed_at for key, viewed_at in pending.items() if key[0] in existing}
+        visitors = {key: keys for key, keys in visitors.items() if key[0] in existing}
+        try:
+            with transaction.atomic():
+                PropertyView.objects.bulk_create(
+                    [
+                        PropertyView(property_id=property_id, user_id=user_id, viewed_at=viewed_at)
+                        for (property_id, user_id), viewed_at in pending.items()
+                    ],
+                    ignore_conflicts=True,
+                )
+                refresh_views_counts({property_id for property_id, _user_id in pending})
+                merge_visitors(visitors)
+        except Exception:
+            # نرجع الدفعة للبافر عشان تتكتب في المحاولة الجاية
+            with self._lock:
+                for key, viewed_at in pending.items():
+                    self._pending.setdefault(key, viewed_at)
+                for key, keys in visitors.items():
+                    self._visitors.setdefault(key, set()).update(keys)
+            raise
+        return len(pending)
+
+
+view_buffer = ViewBuffer()
+atexit.register(view_buffer.flush)
+
+
+def record_view(property_id, user_id=None, visitor=None):
+    """
+    تسجيل مشاهدة: user_id للمستخدم المسجل (عداد المشاهدات)، و visitor مفتاح الزائر
+    (visitors.visitor_key) لتقدير الزوار الفريدين شامل المجهولين.
+    """
+    view_buffer.record(property_id, user_id, visitor)
@@ -2,13 +2,40 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Q
+from django.db import IntegrityError
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.core.paginator import Paginator
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse, HttpResponsePermanentRedirect
-from decimal import Decimal, InvalidOperation
-from .models import Property, PropertyImage, Feature, FavoriteProperty
+import os
+import re
+
+from django.http import FileResponse, Http404, JsonResponse, HttpResponsePermanentRedirect, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from .models import Property, PropertyImage, FavoriteProperty, ListingCard
+from inquiries.models import Inquiry
 from .forms import PropertyForm
+from .gazetteer import gazetteer, CITY, DISTRICT
+from .filters import filter_listings
+from .facets import get_facets
+from . import clusters, favorites, feature_index
+from .features import add_features
+from .geo import parse_bbox, parse_radius, within_radius
+from .pagination import CursorPage, paginate_listings
+from .result_cache import result_cache
+from .utils import attach_display_images, PLACEHOLDER_IMAGE_URL
+from .cards import serialize_card
+from .view_counter import record_view
+from .rollups import time_series
+from .image_queue import enqueue_upload
+from .image_storage import local_backend
+from . import derivatives
+from .exporter import CONTENT_TYPES, ExportError, export_queryset, stream_export
+from .visitors import VISITOR_COOKIE, VISITOR_COOKIE_MAX_AGE, new_visitor_id, visitor_key, reach
+
+# الصورة الافتراضية لكروت صفحة المالك والمفضلة (بمقاس مختلف عن صفحة القائمة)
+OWNER_CARD_PLACEHOLDER_URL = "https://placehold.co/600x400/E5E7EB/4B5563?text=لا+توجد+صورة"
 
 
 class PropertyListView(ListView):
@@ -18,82 +45,36 @@ class PropertyListView(ListView):
     paginate_by = 6
 
     def get_queryset(self):
-        queryset = Property.objects.filter(is_published=True).order_by('-published_date')
-
-        # فلترة بالمدينة بشكل صريح
-        city_search = self.request.GET.get('city_search')
-        query = self.request.GET.get('q')
-        if city_search:
-            city_value = city_search.strip()
-            if city_value:
-                queryset = queryset.filter(city__icontains=city_value)
-        elif query:
-            # لو البحث يساوي اسم مدينة أو حي بالضبط، فلتر بالمدينة/الحي فقط لتجنب ظهور مدن أخرى
-            query_value = query.strip()
-            if queryset.filter(city__iexact=query_value).exists():
-                queryset = queryset.filter(city__iexact=query_value)
-            elif queryset.filter(district__iexact=query_value).exists():
-                queryset = queryset.filter(district__iexact=query_value)
-            else:
-                # بحث عام على العنوان والوصف والعنوان التفصيلي والمدينة والحي
-                queryset = queryset.filter(
-                    Q(title__icontains=query)
-                    | Q(description__icontains=query)
-                    | Q(location_address__icontains=query)
-                    | Q(city__icontains=query)
-                    | Q(district__icontains=query)
-                )
-
-        # فلترة نوع العقار
-        property_type = self.request.GET.get('property_type')
-        if property_type:
-            queryset = queryset.filter(property_type=property_type)
-
-        # فلترة حالة العقار (للبيع أو للإيجار)
-        status = self.request.GET.get('status')
-        if status:
-            queryset = queryset.filter(status=status)
-
-        # فلترة السعر الأدنى والأقصى
-        min_price = self.request.GET.get('min_price')
-        if min_price:
-            try:
-                queryset = queryset.filter(price__gte=Decimal(min_price))
-            except (InvalidOperation, ValueError):
-                pass
-
-        max_price = self.request.GET.get('max_price')
-        if max_price:
-            try:
-                queryset = queryset.filter(price__lte=Decimal(max_price))
-            except (InvalidOperation, ValueError):
-                pass
-
-        # فلترة عدد غرف النوم
-        bedrooms = self.request.GET.get('bedrooms')
-        if bedrooms and bedrooms.isdigit():
-            bedrooms_num = int(bedrooms)
-            if bedrooms_num >= 4:
-                queryset = queryset.filter(bedrooms__gte=4)
+        # القراءة من جدول الكروت المجهز (ListingCard) بدل Property + الصور
+        queryset = ListingCard.objects.filter(is_published=True).order_by('-published_date', '-pk')
+        return filter_listings(queryset, self.request.GET)
+
+    def paginate_queryset(self, queryset, page_size):
+        # أرقام النتائج من كاش النتائج، والصفحة بتجيب كروتها بس
+        ids = result_cache.get_ids(queryset, self.request.GET)
+        paginator, page = paginate_listings(queryset, self.request.GET, page_size, ids=ids)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def _page_url(self, **params):
+        """رابط بنفس الفلاتر الحالية مع تغيير باراميترات معينة (None = حذف الباراميتر)."""
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        query.pop('cursor', None)
+        for key, value in params.items():
+            if value is None:
+                query.pop(key, None)
             else:
-                queryset = queryset.filter(bedrooms=bedrooms_num)
-
-        # فلترة المساحة
-        min_area = self.request.GET.get('min_area')
-        if min_area:
-            try:
-                queryset = queryset.filter(area__gte=Decimal(min_area))
-            except (InvalidOperation, ValueError):
-                pass
-
-        max_area = self.request.GET.get('max_area')
-        if max_area:
-            try:
-                queryset = queryset.filter(area__lte=Decimal(max_area))
-            except (InvalidOperation, ValueError):
-                pass
-
-        return queryset
+                query[key] = value
+        return f"?{query.urlencode()}"
+
+    def _histogram(self, buckets, min_param, max_param, below_param):
+        # الشريحة [min, max) زي العد في facets.py، فالحد الأعلى في الرابط مش شامل (below)
+        return [
+            dict(bucket, url=self._page_url(**{
+                min_param: bucket['min'], max_param: None, below_param: bucket['max'],
+            }))
+            for bucket in buckets
+        ]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -101,25 +82,41 @@ class PropertyListView(ListView):
         # إضافة خيارات الفلترة إلى السياق
         context['property_type_choices'] = Property.PROPERTY_TYPES
         context['property_status_choices'] = Property.PROPERTY_STATUS
+        # فلتر المميزات من الكتالوج المتخزن (من غير استعلام)
+        context['feature_choices'] = feature_index.catalogue()
+        context['selected_features'] = feature_index.parse_feature_ids(self.request.GET)
         
-        # تجهيز العقارات مع مسار الصورة المعروضة لتجنب أخطاء القالب
-        properties_with_display_image = []
-        for prop in context['object_list']: # object_list يحتوي على العقارات للصفحة الحالية
-            display_image_url = "https://placehold.co/600x336/E5E7EB/4B5563?text=لا+توجد+صورة" # صورة افتراضية
-
-            # حاول الحصول على الصورة الرئيسية أولاً
-            main_image = prop.images.filter(is_main=True).first()
-            if main_image:
-                display_image_url = main_image.image.url
-            elif prop.images.first(): # إذا لم توجد صورة رئيسية، احصل على أول صورة متاحة
-                display_image_url = prop.images.first().image.url
-            
-            properties_with_display_image.append({
-                'property': prop,
-                'display_image_url': display_image_url
-            })
+        # رابط صورة الغلاف متخزن في الكارت نفسه، فمفيش أي استعلام إضافي للصور،
+        # وحالة المفضلة من الـ set المتخزن للمستخدم
+        favorite_ids = favorites.favorite_ids(self.request.user)
+        properties_with_display_image = [
+            {
+                'property': card,
+                'display_image_url': card.cover_image_url or PLACEHOLDER_IMAGE_URL,
+                'is_favorite': card.pk in favorite_ids,
+            }
+            for card in context['object_list']
+        ]
+        context['can_favorite'] = favorites.can_favorite(self.request.user)
         
         context['properties'] = properties_with_display_image # استبدال properties بالقائمة الجديدة
+
+        # روابط الصفحة التالية/السابقة (بالمؤشر أو برقم الصفحة) مع الحفاظ على الفلاتر
+        page = context['page_obj']
+        if isinstance(page, CursorPage):
+            next_params = {'cursor': page.next_cursor} if page.has_next() else None
+            previous_params = {'cursor': page.previous_cursor} if page.has_previous() else None
+        else:
+            next_params = {'page': page.next_page_number()} if page.has_next() else None
+            previous_params = {'page': page.previous_page_number()} if page.has_previous() else None
+        context['next_page_url'] = self._page_url(**next_params) if next_params else None
+        context['previous_page_url'] = self._page_url(**previous_params) if previous_params else None
+
+        # عدادات الفلاتر للسياق الحالي (استعلام تجميعي واحد، ومتخزنة في الكاش)
+        facets = get_facets(self.request.GET)
+        context['facets'] = facets
+        context['price_histogram'] = self._histogram(facets['price'], 'min_price', 'max_price', 'price_below')
+        context['area_histogram'] = self._histogram(facets['area'], 'min_area', 'max_area', 'area_below')
         
         return context
 
@@ -143,9 +140,11 @@ class PropertyDetailView(DetailView):
         if 'slug' in self.kwargs:
             obj = get_object_or_404(self.model, slug=self.kwargs['slug'], is_published=True)
 
-            if self.request.user.is_authenticated:
-                if not obj.viewed_by.filter(id=self.request.user.id).exists():
-                    obj.viewed_by.add(self.request.user)
+            # المشاهدة بتتسجل في بافر في الذاكرة وبتتكتب على دفعات (view_counter.py)
+            # الزائر المجهول بيتعرف بكوكي، ولو مش موجودة بتتحط في get()
+            user_id = self.request.user.id if self.request.user.is_authenticated else None
+            self.visitor_id = self.request.COOKIES.get(VISITOR_COOKIE, '')[:64] or new_visitor_id()
+            record_view(obj.pk, user_id, visitor_key(user_id, self.visitor_id))
             return obj
         elif 'pk' in self.kwargs:
             property_obj = get_object_or_404(self.model, pk=self.kwargs['pk'], is_published=True)
@@ -158,31 +157,22 @@ class PropertyDetailView(DetailView):
         if 'pk' in self.kwargs:
             property_obj = get_object_or_404(self.model, pk=self.kwargs['pk'], is_published=True)
             return HttpResponsePermanentRedirect(property_obj.get_absolute_url())
-        return super().get(request, *args, **kwargs)
+        response = super().get(request, *args, **kwargs)
+        if VISITOR_COOKIE not in request.COOKIES:
+            response.set_cookie(
+                VISITOR_COOKIE, self.visitor_id, max_age=VISITOR_COOKIE_MAX_AGE, httponly=True, samesite='Lax'
+            )
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        context['main_image'] = self.object.images.filter(is_main=True).first()
-        context['extra_images'] = self.object.images.filter(is_main=False)
-        
-        is_favorite = False
+        # كل الصور في استعلام واحد (الرئيسية الأول)، وروابطها محسوبة مسبقاً في delivery_urls
+        context['property_images'] = list(self.object.images.order_by('-is_main', 'pk'))
+        context['cover_image'] = context['property_images'][0] if context['property_images'] else None
         
-        # 🌟🌟 CORRECTED LOGIC HERE 🌟🌟
-        # First, check if the user is authenticated.
-        # Only THEN check for the 'is_realtor' attribute.
-        if self.request.user.is_authenticated:
-            # Check if the user is *not* a realtor.
-            # Use hasattr defensively if 'is_realtor' might not always exist on User model extensions.
-            # If your User model *always* has 'is_realtor', you can simplify.
-            if not hasattr(self.request.user, 'is_realtor') or not self.request.user.is_realtor:
-                is_favorite = FavoriteProperty.objects.filter(
-                    user=self.request.user, 
-                    property=self.object
-                ).exists()
-            # If the user *is* a realtor, is_favorite remains False, which is the default.
-        
-        context['is_favorite'] = is_favorite
+        # من الـ set المتخزن للمستخدم (فاضي للزائر والمسوق العقاري)
+        context['is_favorite'] = self.object.pk in favorites.favorite_ids(self.request.user)
         
         return context
     
@@ -197,7 +187,7 @@ class PropertyCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['all_features'] = Feature.objects.all()
+        context['all_features'] = feature_index.catalogue()
         return context
 
     def form_valid(self, form):
@@ -206,21 +196,20 @@ class PropertyCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 
         property_obj = self.object
 
+        # الصور بتترفع في الخلفية (image_queue.py) عشان الطلب مايستناش Cloudinary
         main_image_file = self.request.FILES.get('main_image')
         if main_image_file:
-            PropertyImage.objects.create(property=property_obj, image=main_image_file, is_main=True)
+            enqueue_upload(property_obj, main_image_file, is_main=True, user_id=self.request.user.id)
 
         for image_file in self.request.FILES.getlist('images'):
-            PropertyImage.objects.create(property=property_obj, image=image_file)
-
-        new_features_str = form.cleaned_data.get('new_features')
-        if new_features_str:
-            new_features_list = [f.strip() for f in new_features_str.split(',') if f.strip()]
-            for feature_name in new_features_list:
-                feature, created = Feature.objects.get_or_create(name=feature_name)
-                property_obj.features.add(feature)
+            enqueue_upload(property_obj, image_file, user_id=self.request.user.id)
+
+        # المميزات الجديدة كلها بتتعمل وتتربط في عدد ثابت من الاستعلامات
+        add_features(property_obj, form.cleaned_data.get('new_features'))
         
         messages.success(self.request, 'تم إضافة العقار بنجاح!')
+        if main_image_file or self.request.FILES.getlist('images'):
+            messages.info(self.request, 'جاري رفع الصور في الخلفية، وهيوصلك إشعار لما تخلص.')
         return response
 
 
@@ -245,29 +234,24 @@ class PropertyUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['main_image'] = self.object.images.filter(is_main=True).first()
-        context['extra_images'] = self.object.images.filter(is_main=False)
+        context['pending_images'] = self.object.pending_images.order_by('created_at')
         return context
 
     def form_valid(self, form):
         response = super().form_valid(form)
         property_obj = self.object
 
+        # الصورة الرئيسية القديمة بتتمسح لما الجديدة تخلص رفع في الخلفية
         main_image_file = self.request.FILES.get('main_image')
         if main_image_file:
-            PropertyImage.objects.filter(property=property_obj, is_main=True).delete()
-            PropertyImage.objects.create(property=property_obj, image=main_image_file, is_main=True)
-            messages.info(self.request, 'تم تحديث الصورة الرئيسية بنجاح.')
+            enqueue_upload(property_obj, main_image_file, is_main=True, replace_main=True, user_id=self.request.user.id)
+            messages.info(self.request, 'جاري رفع الصورة الرئيسية الجديدة.')
 
         for image_file in self.request.FILES.getlist('images'):
-            PropertyImage.objects.create(property=property_obj, image=image_file)
-
-        new_features_str = form.cleaned_data.get('new_features')
-        if new_features_str:
-            new_features_list = [f.strip() for f in new_features_str.split(',') if f.strip()]
-            for feature_name in new_features_list:
-                feature, created = Feature.objects.get_or_create(name=feature_name)
-                property_obj.features.add(feature)
+            enqueue_upload(property_obj, image_file, user_id=self.request.user.id)
+
+        # المميزات الجديدة كلها بتتعمل وتتربط في عدد ثابت من الاستعلامات
+        add_features(property_obj, form.cleaned_data.get('new_features'))
         
         messages.success(self.request, 'تم تحديث العقار بنجاح!')
         return response
@@ -312,59 +296,299 @@ class PropertyDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+# ترتيب لوحة الوسيط: قيمة ?sort= -> ترتيب الـ queryset
+MY_PROPERTIES_SORTS = {
+    'newest': ('-published_date', '-pk'),
+    'oldest': ('published_date', 'pk'),
+    'views': ('-views_count', '-pk'),
+    'favorites': ('-favorites_count', '-pk'),
+    'unanswered': ('-unanswered_inquiries', '-pk'),
+    'last_inquiry': (F('last_inquiry_at').desc(nulls_last=True), '-pk'),
+    'price': ('-price', '-pk'),
+}
+MY_PROPERTIES_PER_PAGE = 12
+
+
 @login_required
 @user_passes_test(lambda u: u.is_realtor)
 def my_properties_view(request):
-    my_properties = Property.objects.filter(owner=request.user).prefetch_related('images')
-
-    properties_with_display_image = []
-    for prop in my_properties:
-        display_image_url = "https://placehold.co/600x336/E5E7EB/4B5563?text=لا+توجد+صورة"
-
-        main_image = prop.images.filter(is_main=True).first()
-        if main_image:
-            display_image_url = main_image.image.url
-        elif prop.images.first():
-            display_image_url = prop.images.first().image.url
-        
-        properties_with_display_image.append({
-            'property': prop,
-            'display_image_url': display_image_url
-        })
-
-    context = {'my_properties_with_images': properties_with_display_image}
+    """
+    لوحة الوسيط: عقاراته مع المشاهدات والمفضلة والاستفسارات اللي لسه من غير رد وآخر استفسار،
+    مرتبة بأي مقياس (?sort=) ومقسمة صفحات. الصفحة كلها = استعلام للعدد + استعلام للصفحة
+    (الكروت فيها الصورة والعدادات، والاستفسارات subqueries في نفس الاستعلام).
+    """
+    sort = request.GET.get('sort')
+    if sort not in MY_PROPERTIES_SORTS:
+        sort = 'newest'
+
+    inquiries = Inquiry.objects.filter(property_id=OuterRef('pk')).order_by()
+    unanswered = inquiries.filter(Q(reply_message__isnull=True) | Q(reply_message=''))
+    my_properties = ListingCard.objects.filter(owner=request.user).annotate(
+        unanswered_inquiries=Coalesce(
+            Subquery(unanswered.values('property_id').annotate(total=Count('pk')).values('total')[:1]),
+            Value(0),
+        ),
+        last_inquiry_at=Subquery(inquiries.values('property_id').annotate(last=Max('created_at')).values('last')[:1]),
+    ).order_by(*MY_PROPERTIES_SORTS[sort])
+
+    paginator = Paginator(my_properties, MY_PROPERTIES_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    properties_with_display_image = [
+        {'property': card, 'display_image_url': card.cover_image_url or PLACEHOLDER_IMAGE_URL}
+        for card in page_obj.object_list
+    ]
+
+    context = {
+        'my_properties_with_images': properties_with_display_image,
+        'page_obj': page_obj,
+        'sort': sort,
+        'sort_choices': (
+            ('newest', 'الأحدث'),
+            ('oldest', 'الأقدم'),
+            ('views', 'الأكثر مشاهدة'),
+            ('favorites', 'الأكثر تفضيلاً'),
+            ('unanswered', 'استفسارات بدون رد'),
+            ('last_inquiry', 'آخر استفسار'),
+            ('price', 'الأعلى سعراً'),
+        ),
+    }
     return render(request, 'properties/my_properties.html', context)
 
 
 @login_required
 def add_remove_favorite(request, pk):
     if request.method == 'POST':
-        property = get_object_or_404(Property, pk=pk)
-        
         if request.user.is_realtor:
             return JsonResponse({'status': 'error', 'message': 'المسوقون العقاريون لا يمكنهم إضافة مفضلة.'}, status=403)
 
-        favorite_exists = FavoriteProperty.objects.filter(user=request.user, property=property).exists()
-        
-        if favorite_exists:
-            FavoriteProperty.objects.filter(user=request.user, property=property).delete()
-            is_favorite = False
-        else:
-            FavoriteProperty.objects.create(user=request.user, property=property)
-            is_favorite = True
+        # أمر SQL واحد (إضافة أو حذف) والـ set المتخزن بيتعدل بعده؛
+        # العقار لو مش موجود الـ foreign key بيرفض الإضافة
+        try:
+            is_favorite = favorites.toggle(request.user, pk)
+        except IntegrityError:
+            raise Http404
             
         return JsonResponse({'status': 'success', 'is_favorite': is_favorite})
     
     return JsonResponse({'status': 'error', 'message': 'طريقة الطلب غير صالحة'}, status=400)
 
 
+def autocomplete(request):
+    """
+    اقتراحات أسماء المدن والأحياء لمربع البحث (من قاموس الأماكن في الذاكرة).
+    ?q=النص &type=city|district (اختياري)
+    """
+    query = request.GET.get('q', '')
+    kind = request.GET.get('type')
+    if kind not in (CITY, DISTRICT):
+        kind = None
+    suggestions = gazetteer.suggest(query, limit=10, kind=kind)
+    return JsonResponse({'suggestions': suggestions})
+
+
+def listings_api(request):
+    """
+    نفس فلاتر صفحة العقارات بس بترجع JSON، مع ترقيم بالمؤشر (?cursor=).
+    العدد الكلي اختياري (?count=1) ومقصوص عند 1000.
+    """
+    queryset = ListingCard.objects.filter(is_published=True).order_by('-published_date', '-pk')
+    queryset = filter_listings(queryset, request.GET)
+    ids = result_cache.get_ids(queryset, request.GET)
+    paginator, page = paginate_listings(queryset, request.GET, PropertyListView.paginate_by, ids=ids)
+
+    favorite_ids = favorites.favorite_ids(request.user)
+    data = {
+        'results': [
+            dict(serialize_card(card), is_favorite=card.pk in favorite_ids) for card in page.object_list
+        ]
+    }
+    if isinstance(page, CursorPage):
+        data['next'] = page.next_cursor
+        data['previous'] = page.previous_cursor
+    else:
+        data['next'] = page.next_page_number() if page.has_next() else None
+        data['previous'] = page.previous_page_number() if page.has_previous() else None
+    if request.GET.get('count'):
+        count, is_capped = paginator.capped_count
+        data['count'] = count
+        data['count_is_capped'] = is_capped
+    return JsonResponse(data)
+
+
+@login_required
+def property_reach_api(request, pk):
+    """
+    عدد الزوار الفريدين التقريبي (مسجلين ومجهولين) لعقار يملكه المستخدم:
+    النهارده وآخر 7 و 30 يوم (دمج sketches الأيام، من غير ما حد يتعد مرتين).
+    """
+    property_obj = get_object_or_404(Property.objects.only('pk', 'owner_id'), pk=pk, owner=request.user)
+    return JsonResponse({
+        'property': property_obj.pk,
+        'today': reach(property_obj.pk, days=1),
+        'last_7_days': reach(property_obj.pk, days=7),
+        'last_30_days': reach(property_obj.pk, days=30),
+    })
+
+
+@login_required
+@user_passes_test(lambda u: u.is_realtor)
+def dashboard_stats_api(request):
+    """
+    سلسلة يومية (مشاهدات، مفضلة، استفسارات) لعقارات الوسيط، أو لعقار واحد (?property=)،
+    لآخر ?days= يوم (افتراضي 30، أقصى 365). من جدول PropertyDailyStats بس.
+    """
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
+    property_id = request.GET.get('property')
+    if property_id is not None:
+        property_id = get_object_or_404(
+            Property.objects.only('pk', 'owner_id'), pk=property_id if property_id.isdigit() else 0, owner=request.user
+        ).pk
+    return JsonResponse({
+        'days': days,
+        'property': property_id,
+        'series': time_series(request.user, days=days, property_id=property_id),
+    })
+
+
+@login_required
+@user_passes_test(lambda u: u.is_realtor or u.is_staff)
+def export_listings(request):
+    """
+    تصدير العقارات كملف (?format=csv|jsonl|parquet) بنفس فلاتر صفحة العقارات.
+    الوسيط بيصدّر عقاراته بس (شامل غير المنشورة)، والأدمن بيصدّر الكل.
+    الملف بيتبعت stream من غير ما يتحمل كله في الذاكرة.
+    """
+    fmt = request.GET.get('format', 'csv')
+    owner = None if request.user.is_staff else request.user
+    try:
+        content = stream_export(export_queryset(request.GET, owner=owner), fmt)
+    except ExportError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="listings.{fmt}"'
+    return response
+
+
+# مسارات التخزين المحلي للصور (image_storage.LocalImageBackend)
+LOCAL_ORIGINAL_RE = re.compile(r'^originals/([0-9a-f]{2})/([0-9a-f]{64})\.[a-z0-9]{1,10}$')
+LOCAL_DERIVATIVE_RE = re.compile(r'^derived/([0-9a-f]{2})/([0-9a-f]{64})/(\d+)\.(webp|avif)$')
+DERIVATIVE_CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+
+def local_image(request, path):
+    """
+    صور التخزين المحلي (/images/...). الويب سيرفر المفروض يخدم الملفات الموجودة بنفسه
+    ويحوّل الناقص بس هنا؛ النسخة (WebP/AVIF) الناقصة بتتولد من الأصل وبتتحفظ.
+    الأسماء content-addressed فالرد بيتخزن في الكاش للأبد.
+    """
+    content_type = None
+    match = LOCAL_DERIVATIVE_RE.match(path)
+    if match:
+        shard, digest, width, fmt = match.groups()
+        width = int(width)
+        if shard != digest[:2] or width not in derivatives.WIDTHS or fmt not in derivatives.output_formats():
+            raise Http404
+        file_path = local_backend.ensure_derivative(digest, width, fmt)
+        content_type = DERIVATIVE_CONTENT_TYPES[fmt]
+    else:
+        match = LOCAL_ORIGINAL_RE.match(path)
+        if not match or match.group(1) != match.group(2)[:2]:
+            raise Http404
+        file_path = local_backend.path(path)
+    if not file_path or not os.path.exists(file_path):
+        raise Http404
+    response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
+
+
+# أقصى عدد علامات في رد واحد لصفحة الخريطة
+MAP_MARKERS_LIMIT = 500
+
+
+def map_listings_api(request):
+    """
+    علامات الخريطة (JSON) للعقارات جوه حدود الخريطة (?bbox=south,west,north,east)
+    أو في نطاق مسافة (?lat=&lng=&radius= بالكيلو)، مع نفس باقي فلاتر صفحة العقارات.
+    """
+    bbox = parse_bbox(request.GET.get('bbox'))
+    radius = parse_radius(request.GET)
+    if not bbox and not radius:
+        return JsonResponse({'error': 'bbox أو lat/lng/radius مطلوبين'}, status=400)
+
+    queryset = ListingCard.objects.filter(is_published=True).order_by('-published_date', '-pk')
+    params = request.GET.copy()
+    params.pop('lat', None)
+    params.pop('lng', None)
+    params.pop('radius', None)
+    queryset = filter_listings(queryset, params)
+    if radius:
+        # الأقرب الأول قبل القص، عشان العلامات اللي بتتشال تبقى الأبعد مش الأقدم
+        queryset = within_radius(queryset, *radius).order_by('distance_km', 'pk')
+    cards = list(queryset[:MAP_MARKERS_LIMIT + 1])
+    truncated = len(cards) > MAP_MARKERS_LIMIT
+    cards = cards[:MAP_MARKERS_LIMIT]
+
+    markers = []
+    for card in cards:
+        marker = serialize_card(card)
+        if radius:
+            marker['distance_km'] = round(card.distance_km, 2)
+        markers.append(marker)
+    return JsonResponse({'results': markers, 'truncated': truncated})
+
+
+def map_clusters(request):
+    """
+    تجمعات علامات الخريطة (محسوبة مسبقاً) لمستوى تكبير معين (?zoom=):
+    لبلاطة واحدة (?x=&y=) أو لكل البلاطات اللي بتغطي حدود الخريطة (?bbox=south,west,north,east).
+    كل بلاطة متخزنة في الكاش بمفتاح z/x/y، والرد نفسه ممكن يتكاش عند المتصفح/الـ CDN.
+    """
+    try:
+        zoom = int(request.GET.get('zoom', ''))
+    except ValueError:
+        zoom = -1
+    if not 0 <= zoom <= clusters.MAX_ZOOM:
+        return JsonResponse({'error': f'zoom لازم يكون من 0 لـ {clusters.MAX_ZOOM}'}, status=400)
+
+    size = 1 << zoom
+    bbox = parse_bbox(request.GET.get('bbox'))
+    if bbox:
+        tiles = clusters.bbox_tiles(zoom, *bbox)
+        if tiles is None:
+            return JsonResponse({'error': 'حدود الخريطة كبيرة على المستوى ده'}, status=400)
+    else:
+        try:
+            tiles = [(int(request.GET['x']), int(request.GET['y']))]
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'bbox أو x/y مطلوبين'}, status=400)
+        if not all(0 <= value < size for value in tiles[0]):
+            return JsonResponse({'error': 'البلاطة برة حدود المستوى ده'}, status=400)
+
+    tile_clusters = clusters.get_tiles(zoom, tiles)
+    response = JsonResponse({
+        'zoom': zoom,
+        'tiles': [
+            {'key': f'{zoom}/{tile_x}/{tile_y}', 'clusters': tile_clusters[(tile_x, tile_y)]}
+            for tile_x, tile_y in tiles
+        ],
+    })
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
 @login_required
 def favorite_list(request):
     if request.user.is_realtor:
         messages.error(request, 'لا يمكنك الوصول إلى هذه الصفحة كمسوق عقاري.')
         return redirect('home')
     
-    favorites = FavoriteProperty.objects.filter(user=request.user).select_related('property')
+    favorites = list(FavoriteProperty.objects.filter(user=request.user).select_related('property'))
+    attach_display_images([favorite.property for favorite in favorites], placeholder=OWNER_CARD_PLACEHOLDER_URL)
     return render(request, 'properties/favorite_list.html', {'favorites': favorites})
 
 from django.conf import settings
@@ -391,11 +615,13 @@ class OwnerPropertyListView(ListView):
 
     def get_queryset(self):
         # Get the owner based on the username from the URL
-        owner = get_object_or_404(User, username=self.kwargs['username'])
-        # Filter properties published by this owner and order by 'published_date'
-        return Property.objects.filter(owner=owner, is_published=True).order_by('-published_date') # FIXED LINE
+        self.owner = get_object_or_404(User, username=self.kwargs['username'])
+        # Read the owner's published listings from the ListingCard read model
+        return ListingCard.objects.filter(owner=self.owner, is_published=True).order_by('-published_date')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['owner'] = get_object_or_404(User, username=self.kwargs['username'])
+        context['owner'] = self.owner
+        for card in context['owner_properties']:
+            card.display_image_url = card.cover_image_url or OWNER_CARD_PLACEHOLDER_URL
         return context
\ No newline at end of file
@@ -0,0 +1,104 @@
+# properties/visitors.py
+
+"""
+الزوار الفريدين لكل عقار في اليوم (HyperLogLog في جدول PropertyDailyVisitors).
+
+- visitor_key: مفتاح الزائر: رقم المستخدم لو مسجل، أو hash لكوكي الزائر المجهول.
+- merge_visitors: دمج دفعة زوار في الـ sketches (بيستخدمها flusher المشاهدات).
+- reach: عدد الزوار الفريدين التقريبي لعقار في آخر N يوم (دمج sketches الأيام).
+"""
+
+import datetime
+import hashlib
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from .hyperloglog import HyperLogLog
+from .models import PropertyDailyVisitors
+
+VISITOR_COOKIE = 'visitor_id'
+VISITOR_COOKIE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def new_visitor_id():
+    return uuid.uuid4().hex
+
+
+def visitor_key(user_id=None, visitor_id=None):
+    """مفتاح ثابت للزائر؛ الكوكي نفسها مش بتتخزن، بس hash ليها."""
+    if user_id:
+        return f'u:{user_id}'
+    if visitor_id:
+        return 'a:' + hashlib.sha256(visitor_id.encode()).hexdigest()[:32]
+    return None
+
+
+def merge_visitors(batch):
+    """
+    batch = {(property_id, day): {مفاتيح الزوار}}.
+    استعلام لقراءة الـ sketches الموجودة + bulk_update + bulk_create، مهما كان حجم الدفعة
+    (+ قراءة الصفوف الجديدة تاني عشان التعارض مع flusher تاني، _merge_conflicts).
+    """
+    if not batch:
+        return
+    property_ids = {property_id for property_id, _day in batch}
+    days = {day for _property_id, day in batch}
+    with transaction.atomic():
+        existing = {
+            (row.property_id, row.day): row
+            for row in PropertyDailyVisitors.objects.select_for_update()
+            .filter(property_id__in=property_ids, day__in=days)
+        }
+        to_update, to_create = [], []
+        for (property_id, day), keys in batch.items():
+            row = existing.get((property_id, day))
+            sketch = HyperLogLog.from_bytes(row.sketch) if row else HyperLogLog()
+            sketch.update(keys)
+            if row:
+                row.sketch = sketch.to_bytes()
+                to_update.append(row)
+            else:
+                to_create.append(PropertyDailyVisitors(property_id=property_id, day=day, sketch=sketch.to_bytes()))
+        if to_update:
+            PropertyDailyVisitors.objects.bulk_update(to_update, ['sketch'], batch_size=500)
+        if to_create:
+            PropertyDailyVisitors.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+            _merge_conflicts(to_create)
+
+
+def _merge_conflicts(created):
+    """
+    لو flusher تاني عمل نفس الصف (العقار، اليوم) في نفس اللحظة، الـ INSERT بتاعنا اتهمل
+    والـ sketch بتاعه هو اللي اتحفظ. بنقرا الصفوف دي تاني تحت قفل وندمج الـ sketch بتاعنا
+    فيها؛ الدمج (max لكل خانة) مابيغيرش حاجة لو الصف هو اللي احنا كتبناه.
+    """
+    ours = {(row.property_id, row.day): row.sketch for row in created}
+    to_update = []
+    for row in PropertyDailyVisitors.objects.select_for_update().filter(
+        property_id__in={key[0] for key in ours}, day__in={key[1] for key in ours}
+    ):
+        sketch = ours.get((row.property_id, row.day))
+        if sketch is None or bytes(row.sketch) == sketch:
+            continue
+        merged = HyperLogLog.from_bytes(row.sketch).merge(HyperLogLog.from_bytes(sketch)).to_bytes()
+        if merged != bytes(row.sketch):
+            row.sketch = merged
+            to_update.append(row)
+    if to_update:
+        PropertyDailyVisitors.objects.bulk_update(to_update, ['sketch'], batch_size=500)
+
+
+def merged_sketch(property_id, start, end):
+    rows = PropertyDailyVisitors.objects.filter(
+        property_id=property_id, day__range=(start, end)
+    ).values_list('sketch', flat=True)
+    return HyperLogLog.merged(HyperLogLog.from_bytes(sketch) for sketch in rows)
+
+
+def reach(property_id, days=1, today=None):
+    """عدد الزوار الفريدين التقريبي في آخر days يوم (شامل النهارده)."""
+    today = today or timezone.localdate()
+    start = today - datetime.timedelta(days=days - 1)
+    return merged_sketch(property_id, start, today).count()
@@ -10,6 +10,9 @@ from django.urls import reverse_lazy
 from django.views.generic import UpdateView
 from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm, PasswordResetForm, SetPasswordForm
 from django.contrib.auth.views import PasswordResetConfirmView # لاستخدام View إعادة تعيين كلمة المرور
+from django.templatetags.static import static
+
+from properties.utils import attach_display_images
 
 # استيراد النماذج والفورمات المخصصة
 from .forms import CustomUserCreationForm, UserProfileUpdateForm # تأكد من استيراد UserProfileUpdateForm هنا
@@ -75,7 +78,10 @@ def logout_view(request):
 @login_required
 def profile_view(request):
     # يمكنك هنا جلب عقارات المستخدم التي قام بنشرها
-    user_properties = request.user.properties_owned.all()
+    # صور الغلاف لكل العقارات بتتجاب في استعلام واحد
+    user_properties = attach_display_images(
+        request.user.properties_owned.all(), placeholder=static('images/placeholder.jpg')
+    )
     return render(request, 'users/profile.html', {
         'user_obj': request.user,
         'user_properties': user_properties,